@@ -11,13 +11,18 @@ This implements the Claude Code-like experience where:
 
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 from typing import Dict, Any, List, Optional
 import uuid
+import anthropic
 
 from src.app.config import Settings
-from src.app.dependencies import get_settings
-from src.app.tools import ToolExecutor, ToolType, ToolProposal, ToolResult
+from src.app.dependencies import get_settings, get_pooled_client, get_session_store, get_tool_engine
+from src.app.tools import ToolEngine, ToolProposal, ToolResult
 from src.app.services.agentic_client import AgenticAnthropicClient
+from src.app.services.anthropic_client import create_pooled_http_client
+from src.app.services.session_store import SessionStore, session_call
+from src.app.api.unified import execute_approved_tools
 
 
 router = APIRouter(prefix="/api/agent", tags=["agent"])
@@ -56,10 +61,6 @@ class ToolExecutionResult(BaseModel):
     requires_confirmation: bool = False
 
 
-# In-memory session storage (use Redis in production)
-_sessions: Dict[str, Dict[str, Any]] = {}
-
-
 def get_agentic_client(settings: Settings = Depends(get_settings)) -> AgenticAnthropicClient:
     """Get the agentic client."""
     if settings.USE_MOCK_CLIENT or not settings.ANTHROPIC_API_KEY:
@@ -74,7 +75,8 @@ def get_agentic_client(settings: Settings = Depends(get_settings)) -> AgenticAnt
 @router.post("/chat", response_model=AgentResponse)
 async def agent_chat(
     request: AgentRequest,
-    settings: Settings = Depends(get_settings)
+    settings: Settings = Depends(get_settings),
+    sessions: SessionStore = Depends(get_session_store)
 ):
     """
     Start or continue an agentic conversation.
@@ -112,11 +114,11 @@ async def agent_chat(
             })
         
         # Store session
-        _sessions[session_id] = {
+        await session_call(sessions, sessions.set, session_id, {
             "prompt": request.prompt,
             "tool_proposals": mock_proposals,
             "working_directory": request.working_directory
-        }
+        })
         
         return AgentResponse(
             session_id=session_id,
@@ -127,23 +129,41 @@ async def agent_chat(
         )
     
     # Real client - use hardcoded valid model to avoid .env issues
-    client = AgenticAnthropicClient(
-        api_key=settings.ANTHROPIC_API_KEY,
-        model="claude-3-haiku-20240307"  # Use valid model name
-    )
-    
-    result = client.generate_with_tools(
-        prompt=request.prompt,
-        max_tokens=request.max_tokens
-    )
+    model = "claude-3-haiku-20240307"  # Use valid model name
+    if settings.PROVIDER_ASYNC_CLIENT:
+        client = get_pooled_client(
+            ("agentic", settings.ANTHROPIC_API_KEY, model),
+            lambda: AgenticAnthropicClient(
+                api_key=settings.ANTHROPIC_API_KEY,
+                model=model,
+                async_http_client=create_pooled_http_client(
+                    anthropic,
+                    max_connections=settings.PROVIDER_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.PROVIDER_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.PROVIDER_KEEPALIVE_EXPIRY,
+                    http2=settings.PROVIDER_HTTP2
+                )
+            )
+        )
+        result = await client.agenerate_with_tools(
+            prompt=request.prompt,
+            max_tokens=request.max_tokens
+        )
+    else:
+        client = AgenticAnthropicClient(api_key=settings.ANTHROPIC_API_KEY, model=model)
+        result = await run_in_threadpool(
+            client.generate_with_tools,
+            prompt=request.prompt,
+            max_tokens=request.max_tokens
+        )
     
     # Store session
-    _sessions[session_id] = {
+    await session_call(sessions, sessions.set, session_id, {
         "prompt": request.prompt,
         "tool_proposals": result.get("tool_proposals", []),
         "working_directory": request.working_directory,
         "messages": [{"role": "user", "content": request.prompt}]
-    }
+    })
     
     return AgentResponse(
         session_id=session_id,
@@ -157,7 +177,9 @@ async def agent_chat(
 @router.post("/confirm", response_model=ToolExecutionResult)
 async def confirm_tools(
     approval: ToolApproval,
-    settings: Settings = Depends(get_settings)
+    settings: Settings = Depends(get_settings),
+    sessions: SessionStore = Depends(get_session_store),
+    tool_engine: ToolEngine = Depends(get_tool_engine)
 ):
     """
     Confirm or reject proposed tool actions.
@@ -165,41 +187,21 @@ async def confirm_tools(
     After confirmation, approved tools are executed and results returned.
     The AI may propose additional actions based on the results.
     """
-    session = _sessions.get(approval.session_id)
+    session = await session_call(sessions, sessions.get, approval.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    # Get approved tool IDs
-    approved_ids = {a["tool_id"] for a in approval.approvals if a.get("approved", False)}
-    
-    # Execute approved tools
-    executor = ToolExecutor(base_path=session.get("working_directory", "."))
-    results = []
-    
-    for proposal in session.get("tool_proposals", []):
-        tool_id = proposal.get("tool_id")
-        
-        if tool_id in approved_ids:
-            # Execute the tool
-            tool_type = ToolType(proposal["tool_type"])
-            result = executor.execute(tool_type, proposal.get("parameters", {}))
-            results.append({
-                "tool_id": tool_id,
-                "success": result.success,
-                "output": result.output,
-                "error": result.error
-            })
-        else:
-            # Tool was rejected
-            results.append({
-                "tool_id": tool_id,
-                "success": False,
-                "output": None,
-                "error": "Rejected by user"
-            })
+    # Execute approved tools; independent actions run concurrently
+    results = await execute_approved_tools(
+        tool_engine,
+        approval.approvals,
+        session.get("tool_proposals", []),
+        working_directory=session.get("working_directory", ".")
+    )
     
-    # Update session
-    _sessions[approval.session_id]["results"] = results
+    # Update session (the store hands out copies, so write it back)
+    session["results"] = results
+    await session_call(sessions, sessions.set, approval.session_id, session)
     
     return ToolExecutionResult(
         session_id=approval.session_id,
@@ -211,18 +213,17 @@ async def confirm_tools(
 
 
 @router.get("/session/{session_id}")
-async def get_session(session_id: str):
+async def get_session(session_id: str, sessions: SessionStore = Depends(get_session_store)):
     """Get the current state of a session."""
-    session = _sessions.get(session_id)
+    session = await session_call(sessions, sessions.get, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     return session
 
 
 @router.delete("/session/{session_id}")
-async def delete_session(session_id: str):
+async def delete_session(session_id: str, sessions: SessionStore = Depends(get_session_store)):
     """Delete a session."""
-    if session_id in _sessions:
-        del _sessions[session_id]
+    if await session_call(sessions, sessions.delete, session_id):
         return {"status": "deleted"}
     raise HTTPException(status_code=404, detail="Session not found")
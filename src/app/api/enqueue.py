@@ -1,12 +1,16 @@
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException
+import uuid
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from pydantic import BaseModel
-from src.app.queue.adapter import QueueAdapter
+from src.app.queue.adapter import QueueAdapter, EnqueueBatchError
 from src.app.queue.fake_queue import FakeQueue
 from src.app.repos.request_repo import RequestRepo
 from src.app.repos.fake_request_repo import FakeRequestRepo
 from src.app.config import Settings
 from src.app.dependencies import get_settings
+from src.app.schemas.security import Client
+from src.app.security.auth import get_current_client
+from src.app.queue.scheduling import DEFAULT_PRIORITY, DEFAULT_TENANT, priority_for_plan
 
 router = APIRouter()
 
@@ -20,6 +24,19 @@ class EnqueueResponse(BaseModel):
     request_id: str
     queued: bool
 
+class EnqueueBatchRequest(BaseModel):
+    requests: List[EnqueueRequest]
+
+class EnqueueFailure(BaseModel):
+    index: int
+    request_id: str
+    error: str
+
+class EnqueueBatchResponse(BaseModel):
+    request_ids: List[str]
+    queued: int
+    failed: List[EnqueueFailure] = []
+
 # Dependencies (In a real app, these would be provided by a DI container or main.py)
 # For now, we use singletons or fakes if not initialized
 _QUEUE: Optional[QueueAdapter] = None
@@ -37,21 +54,29 @@ def get_repo() -> RequestRepo:
         _REPO = FakeRequestRepo()
     return _REPO
 
+def get_optional_client(request: Request) -> Optional[Client]:
+    """The client SecurityMiddleware authenticated, if any (None for anonymous callers)."""
+    return getattr(request.state, "client", None)
+
 @router.post("/api/enqueue", response_model=EnqueueResponse)
 def enqueue_job(
     req: EnqueueRequest,
+    request: Request,
     queue: QueueAdapter = Depends(get_queue),
     repo: RequestRepo = Depends(get_repo),
-    settings: Settings = Depends(get_settings)
+    settings: Settings = Depends(get_settings),
+    client: Optional[Client] = Depends(get_optional_client)
 ):
     """
     Enqueues a new LLM generation job.
+    The job's priority class comes from the client's plan, and it is scheduled
+    fairly against other clients' jobs (tenant = client id; anonymous callers
+    are keyed by IP and get the default class).
     """
     # 1. Create Request Record
     # We generate ID here or let repo do it. 
     # FakeRepo creates it. Real repo might need us to pass ID.
     # Let's assume we generate ID first.
-    import uuid
     request_id = str(uuid.uuid4())
     
     repo.create_request(
@@ -62,13 +87,76 @@ def enqueue_job(
     )
     
     # 2. Enqueue Job
-    job_payload = {
+    if client:
+        tenant, priority = client.id, priority_for_plan(client.plan)
+    else:
+        tenant, priority = (request.client.host if request.client else DEFAULT_TENANT), DEFAULT_PRIORITY
+    queue.enqueue("default", _job_payload(request_id, req, tenant, priority))
+    
+    return EnqueueResponse(request_id=request_id, queued=True)
+
+@router.post("/api/enqueue/batch", response_model=EnqueueBatchResponse)
+def enqueue_batch(
+    batch: EnqueueBatchRequest,
+    response: Response,
+    queue: QueueAdapter = Depends(get_queue),
+    repo: RequestRepo = Depends(get_repo),
+    settings: Settings = Depends(get_settings),
+    client: Client = Depends(get_current_client)
+):
+    """
+    Enqueues many generation jobs (e.g. an offline evaluation run) in one request.
+    Request records are created with one bulk insert and the jobs are sent with
+    one batched queue call, instead of a round trip of each per prompt.
+    If the queue accepts only part of the batch, the response is 207 and lists
+    the failed entries (their records are marked failed); only those should be
+    retried, the rest are already queued.
+    """
+    if not batch.requests:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one request")
+    if len(batch.requests) > settings.ENQUEUE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(batch.requests)} requests (max {settings.ENQUEUE_BATCH_MAX_ITEMS})"
+        )
+
+    request_ids = [str(uuid.uuid4()) for _ in batch.requests]
+    repo.create_requests([
+        {
+            "id": request_id,
+            "prompt": req.prompt,
+            "model": req.model or settings.DEFAULT_MODEL,
+            "stream": req.stream,
+            "user_id": req.user_id
+        }
+        for request_id, req in zip(request_ids, batch.requests)
+    ])
+    try:
+        queue.enqueue_many("default", [
+            _job_payload(request_id, req, client.id, priority_for_plan(client.plan))
+            for request_id, req in zip(request_ids, batch.requests)
+        ])
+    except EnqueueBatchError as e:
+        failed = [
+            EnqueueFailure(index=index, request_id=request_ids[index], error=error)
+            for index, error in sorted(e.failed.items())
+        ]
+        for failure in failed:
+            repo.update_request_status(failure.request_id, "failed", error_message=failure.error)
+        response.status_code = 207
+        return EnqueueBatchResponse(request_ids=request_ids, queued=len(request_ids) - len(failed), failed=failed)
+
+    return EnqueueBatchResponse(request_ids=request_ids, queued=len(request_ids))
+
+def _job_payload(request_id: str, req: EnqueueRequest, tenant: str, priority: str) -> dict:
+    # The tenant is never taken from the body: a caller picking its own user_id
+    # would get a fresh fair share per id
+    return {
         "request_id": request_id,
         "prompt": req.prompt,
         "model": req.model,
-        "stream": req.stream
+        "stream": req.stream,
+        "user_id": req.user_id,
+        "tenant": tenant,
+        "priority": priority
     }
-    
-    queue.enqueue("default", job_payload)
-    
-    return EnqueueResponse(request_id=request_id, queued=True)
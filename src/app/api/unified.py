@@ -12,18 +12,26 @@ All through ONE endpoint: /api/generate
 
 import uuid
 import logging
-from typing import Dict, Any, List, Optional, Generator
+import inspect
+from typing import Dict, Any, List, Optional, Generator, AsyncIterator, Callable
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
 from pydantic import BaseModel, Field
 
 from src.app.config import Settings
-from src.app.dependencies import get_settings, get_anthropic_client
-from src.app.services.anthropic_client import AnthropicClientProtocol
+from src.app.dependencies import get_settings, get_anthropic_client, get_response_cache, get_single_flight, get_session_store, get_tool_engine
+from src.app.services.anthropic_client import AnyAnthropicClient
+from src.app.services.response_cache import ResponseCache, make_cache_key
+from src.app.services.single_flight import SingleFlight
+from src.app.services.session_store import SessionStore, session_call
 from src.app.db import SupabaseClientWrapper
-from src.app.tools import ToolExecutor, ToolType, TOOL_DEFINITIONS
+from src.app.security.token_limiter import TokenRateLimiter, get_token_limiter, token_caller, estimate_tokens, usage_tokens
+from src.app.tools import ToolExecutor, ToolEngine, ToolType, CommandRunner, TOOL_DEFINITIONS
+from src.app.tools.engine import REJECTED
+from src.app.streaming.sse_endpoint import format_sse
 from src.app.services.slash_commands import SlashCommandService
 from src.app.services.agent_prompts import get_agent_config
 from src.app.services.s3_service import get_s3_service
@@ -97,9 +105,6 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# In-memory session storage for pending actions
-_sessions: Dict[str, Dict[str, Any]] = {}
-
 # Global database client
 _db_client: Optional[SupabaseClientWrapper] = None
 
@@ -159,39 +164,95 @@ def get_db_client(settings: Settings) -> Optional[SupabaseClientWrapper]:
 # Intent detection functions removed in favor of Native Tool Calling
 
 
-def execute_approved_tools(
+def local_tool_runner(working_directory: str = ".", commands: Optional[CommandRunner] = None) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    One ToolExecutor for a whole batch; it is stateless, so pool threads share it.
+    Pass the engine's CommandRunner so commands keep the configured limits.
+    """
+    executor = ToolExecutor(base_path=working_directory, commands=commands)
+
+    def run(action: Dict[str, Any]) -> Dict[str, Any]:
+        result = executor.execute(ToolType(action["tool_type"]), action.get("parameters", {}))
+        return {"success": result.success, "output": result.output, "error": result.error}
+    return run
+
+
+def s3_tool_runner(
+    project_name: str,
+    user_id: str,
+    working_directory: str = ".",
+    commands: Optional[CommandRunner] = None
+) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Run file tools against the user's S3 workspace, anything else locally."""
+    run_local = local_tool_runner(working_directory, commands)
+
+    def run(action: Dict[str, Any]) -> Dict[str, Any]:
+        tool_name = action.get("tool_type")
+        if tool_name not in ["read_file", "create_file", "list_directory"]:
+            return run_local(action)
+        result = execute_s3_tool(tool_name, action.get("parameters", {}), project_name, user_id)
+        return {
+            "success": result.get("success", False),
+            "output": result.get("content") or result.get("message") or str(result.get("files", [])),
+            "error": result.get("error")
+        }
+    return run
+
+
+async def execute_approved_tools(
+    engine: ToolEngine,
     approvals: List[Dict[str, Any]], 
     pending_actions: List[Dict[str, Any]],
     working_directory: str = "."
 ) -> List[Dict[str, Any]]:
-    """Execute approved tools and return results."""
-    approved_ids = {a["tool_id"] for a in approvals if a.get("approved", False)}
-    executor = ToolExecutor(base_path=working_directory)
-    results = []
-    
-    for action in pending_actions:
-        tool_id = action.get("tool_id")
-        
-        if tool_id in approved_ids:
-            tool_type = ToolType(action["tool_type"])
-            result = executor.execute(tool_type, action.get("parameters", {}))
-            results.append({
-                "tool_id": tool_id,
-                "description": action.get("description", ""),
-                "success": result.success,
-                "output": result.output,
-                "error": result.error
-            })
-        else:
-            results.append({
-                "tool_id": tool_id,
-                "description": action.get("description", ""),
-                "success": False,
-                "output": None,
-                "error": "Rejected by user"
-            })
+    """Execute approved tools concurrently and return results in proposal order."""
+    return await engine.run(pending_actions, approvals, local_tool_runner(working_directory, engine.commands), working_directory)
+
+
+def format_action_results(results: List[Dict[str, Any]]) -> str:
+    """Human-readable summary of a confirmed batch."""
+    success_count = sum(1 for r in results if r.get("success"))
+    total_count = len(results)
     
-    return results
+    output_parts = [f"Executed {success_count}/{total_count} actions:\n"]
+
+    for r in results:
+        status = "✓" if r.get("success") else "✗"
+        output_parts.append(f"{status} {r.get('description', 'Unknown action')}")
+        if r.get("output"):
+            output_parts.append(f"   Output: {r['output']}")
+        if r.get("error") and r["error"] != REJECTED:
+            output_parts.append(f"   Error: {r['error']}")
+    return "\n".join(output_parts)
+
+
+async def stream_action_results(
+    engine: ToolEngine,
+    pending_actions: List[Dict[str, Any]],
+    approvals: List[Dict[str, Any]],
+    run: Callable[[Dict[str, Any]], Dict[str, Any]],
+    request_id: str,
+    model: str
+) -> AsyncIterator[str]:
+    """
+    SSE frames: one `action_result` per action as it finishes, `output` lines
+    from running commands as they arrive, then `done` with the summary.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(pending_actions)
+    seq = 0
+    async for event in engine.stream(pending_actions, approvals, run):
+        if event["type"] == "action_result":
+            results[event["index"]] = event["result"]
+        seq += 1
+        yield format_sse({**event, "seq": seq})
+    yield format_sse({
+        "type": "done",
+        "seq": seq + 1,
+        "request_id": request_id,
+        "model": model,
+        "output": format_action_results(results),
+        "action_results": results
+    })
 
 
 def execute_s3_tool(
@@ -236,11 +297,162 @@ def yield_text_chunks(text: str, chunk_size: int = 20):
     for i in range(0, len(text), chunk_size):
         yield text[i:i + chunk_size]
 
+
+def build_tool_proposals(raw_tool_calls: List[Any]) -> List[Dict[str, Any]]:
+    """Map native tool calls (OpenAI format) to pending action proposals."""
+    proposals = []
+    for tool_call in raw_tool_calls:
+        func_name = tool_call.function.name
+        try:
+            func_args = json.loads(tool_call.function.arguments)
+        except (json.JSONDecodeError, TypeError):
+            # Malformed or missing arguments from the model
+            func_args = {}
+        
+        # Map to our ToolTypes
+        risk = "low"
+        desc = f"Call {func_name}"
+        
+        if func_name == "create_file":
+            risk = "medium"
+            desc = f"Create file: {func_args.get('path', 'unknown')}"
+        elif func_name == "run_command":
+            risk = "high"
+            desc = f"Run command: {func_args.get('command')}"
+        elif func_name == "list_directory":
+            desc = f"List directory: {func_args.get('path')}"
+
+        proposals.append({
+            "tool_id": str(uuid.uuid4()),
+            "tool_type": func_name,
+            "description": desc,
+            "parameters": func_args,
+            "requires_confirmation": True,
+            "risk_level": risk,
+            "native_tool_call_id": tool_call.id
+        })
+    return proposals
+
+
+async def open_confirmation_session(sessions: SessionStore, prompt: str, proposals: List[Dict[str, Any]]) -> str:
+    """Store pending actions for the confirmation flow and return the session ID."""
+    session_id = str(uuid.uuid4())
+    await session_call(sessions, sessions.set, session_id, {
+        "prompt": prompt,
+        "pending_actions": proposals,
+        "created_at": datetime.utcnow().isoformat()
+    })
+    return session_id
+
+
+def tool_call_text(proposals: List[Dict[str, Any]]) -> str:
+    """The generated part of tool calls, for estimating their token cost."""
+    return json.dumps([p["parameters"] for p in proposals])
+
+
+def format_pending_actions(proposals: List[Dict[str, Any]]) -> str:
+    """Human-readable list of actions awaiting approval."""
+    output = f"I need to perform the following actions:\n\n"
+    for i, p in enumerate(proposals, 1):
+        output += f"{i}. {p['description']} [Risk: {p['risk_level']}]\n"
+    return output
+
+
+def cache_opt_in(header_value: Optional[str]) -> bool:
+    """Whether the X-Response-Cache header asks for caching of a non-deterministic request."""
+    return bool(header_value) and header_value.strip().lower() in ("1", "true", "allow", "on")
+
+
+async def cache_call(cache: ResponseCache, fn: Callable, *args):
+    """Run a cache operation; Redis-backed caches go through the threadpool."""
+    if cache.remote is None:
+        return fn(*args)
+    return await run_in_threadpool(fn, *args)
+
+
+async def generate_text_async(client: AnyAnthropicClient, **kwargs) -> Dict[str, Any]:
+    """
+    Call client.generate_text without blocking the event loop.
+    Async clients are awaited; sync clients run on the threadpool.
+    """
+    if inspect.iscoroutinefunction(client.generate_text):
+        return await client.generate_text(**kwargs)
+    return await run_in_threadpool(client.generate_text, **kwargs)
+
+
+def stream_with_tools_async(client: AnyAnthropicClient, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+    """Async iterator over client.stream_with_tools events, sync clients are iterated on the threadpool."""
+    events = client.stream_with_tools(**kwargs)
+    if inspect.isasyncgen(events):
+        return events
+    return iterate_in_threadpool(events)
+
+
+async def _prepend(first_event: Dict[str, Any], events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    yield first_event
+    async for event in events:
+        yield event
+
+
+async def stream_generation(
+    first_event: Dict[str, Any],
+    events: AsyncIterator[Dict[str, Any]],
+    prompt: str,
+    sessions: SessionStore,
+    on_complete: Optional[Callable[[str, bool], None]] = None
+) -> AsyncIterator[str]:
+    """
+    Relay text deltas from a tool-aware upstream stream as they arrive.
+
+    If the model starts a tool call after text has already been sent, the
+    response can no longer switch to JSON, so the confirmation session is
+    opened here and its details are appended to the stream instead.
+    `on_complete(generated, cacheable)` always runs once the stream ends: with
+    everything the model generated (text and tool arguments, for token
+    accounting) and whether that is a plain text answer fit for caching (not
+    when the stream had tool calls, failed or was abandoned by the client).
+    """
+    text_parts = []
+    tool_parts = []
+    completed = False
+    try:
+        async for event in _prepend(first_event, events):
+            if event["type"] == "text":
+                text_parts.append(event["text"])
+                yield event["text"]
+            elif event["type"] == "tool_calls":
+                proposals = build_tool_proposals(event["tool_calls"])
+                if proposals:
+                    tool_parts.append(tool_call_text(proposals))
+                    session_id = await open_confirmation_session(sessions, prompt, proposals)
+                    yield f"\n\n{format_pending_actions(proposals)}"
+                    yield f"\n[session_id: {session_id}] Confirm with session_id and approvals to proceed.\n"
+        completed = True
+    except Exception as e:
+        logger.error(f"Streaming generation error: {e}")
+        yield f"\n\n[Error: {str(e)}]"
+    finally:
+        if on_complete:
+            generated = "".join(text_parts + tool_parts)
+            if completed and not tool_parts:
+                await run_in_threadpool(on_complete, generated, True)
+            else:
+                # Only settles the budget; no I/O, so it is safe while the generator closes
+                on_complete(generated, False)
+
 @router.post("/generate", response_model=None)
 async def unified_generate(
     request: UnifiedRequest,
+    http_request: Request,
     settings: Settings = Depends(get_settings),
-    client: AnthropicClientProtocol = Depends(get_anthropic_client)
+    client: AnyAnthropicClient = Depends(get_anthropic_client),
+    response_cache: Optional[ResponseCache] = Depends(get_response_cache),
+    single_flight: Optional[SingleFlight] = Depends(get_single_flight),
+    token_limiter: TokenRateLimiter = Depends(get_token_limiter),
+    sessions: SessionStore = Depends(get_session_store),
+    tool_engine: ToolEngine = Depends(get_tool_engine),
+    accept: Optional[str] = Header(None),
+    x_response_cache: Optional[str] = Header(None, description="Set to 'allow' to cache a non-zero temperature request")
 ):
     """
     Unified endpoint for all AI operations.
@@ -325,7 +537,8 @@ async def unified_generate(
 
     # ===== CASE 1: User is confirming pending actions =====
     if request.confirm and request.session_id:
-        session = _sessions.get(request.session_id)
+        # Consumed atomically, so a confirmation is executed at most once across workers
+        session = await session_call(sessions, sessions.pop, request.session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found or expired")
         
@@ -337,69 +550,25 @@ async def unified_generate(
         user_id = request.user_id or "default-user"
         project_name = request.project_name or ""
         
-        # Execute approved tools
-        approved_ids = {a["tool_id"] for a in approvals if a.get("approved", False)}
-        results = []
-        
-        for action in pending_actions:
-            tool_id = action.get("tool_id")
-            
-            if tool_id in approved_ids:
-                tool_name = action.get("tool_type")
-                tool_args = action.get("parameters", {})
-                
-                if use_s3 and tool_name in ["read_file", "create_file", "list_directory"]:
-                    # Use S3 tool execution
-                    result = execute_s3_tool(tool_name, tool_args, project_name, user_id)
-                    results.append({
-                        "tool_id": tool_id,
-                        "description": action.get("description", ""),
-                        "success": result.get("success", False),
-                        "output": result.get("content") or result.get("message") or str(result.get("files", [])),
-                        "error": result.get("error")
-                    })
-                else:
-                    # Use local tool execution (fallback)
-                    executor = ToolExecutor(base_path=".")
-                    tool_type = ToolType(tool_name)
-                    result = executor.execute(tool_type, tool_args)
-                    results.append({
-                        "tool_id": tool_id,
-                        "description": action.get("description", ""),
-                        "success": result.success,
-                        "output": result.output,
-                        "error": result.error
-                    })
-            else:
-                results.append({
-                    "tool_id": tool_id,
-                    "description": action.get("description", ""),
-                    "success": False,
-                    "output": None,
-                    "error": "Rejected by user"
-                })
-        
-        # Clear session
-        del _sessions[request.session_id]
+        if use_s3:
+            run = s3_tool_runner(project_name, user_id, commands=tool_engine.commands)
+        else:
+            run = local_tool_runner(commands=tool_engine.commands)
         
-        # Format output
-        success_count = sum(1 for r in results if r.get("success"))
-        total_count = len(results)
+        # Stream each action's result as it completes when the client asks for SSE
+        if accept and "text/event-stream" in accept:
+            return StreamingResponse(
+                stream_action_results(tool_engine, pending_actions, approvals, run, request_id, model),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
         
-        output_parts = [f"Executed {success_count}/{total_count} actions:\n"]
-
-        for r in results:
-            status = "✓" if r.get("success") else "✗"
-            output_parts.append(f"{status} {r.get('description', 'Unknown action')}")
-            if r.get("output"):
-                output_parts.append(f"   Output: {r['output']}")
-            if r.get("error") and r["error"] != "Rejected by user":
-                output_parts.append(f"   Error: {r['error']}")
-
+        # Independent actions run concurrently; same-path writes keep their order
+        results = await tool_engine.run(pending_actions, approvals, run)
         
         return UnifiedResponse(
             request_id=request_id,
-            output="\n".join(output_parts),
+            output=format_action_results(results),
             model=model,
             action_required=False,
             pending_actions=[],
@@ -407,7 +576,7 @@ async def unified_generate(
         )
     
     # ===== CASE 2 & 3: Smart Agent & Streaming =====
-    # Strategy: We generate synchronously first to check for Tool Calls.
+    # Strategy: Stream directly when possible; otherwise generate synchronously first to check for Tool Calls.
     
     # 0. Get Active Agent Configuration
     agent_config = get_agent_config(ACTIVE_AGENT)
@@ -419,62 +588,110 @@ async def unified_generate(
     # but 'prompt' injection works well for DeepSeek V2/V3 compatibility via this client.
     full_prompt = f"System: {system_prompt}\n\nUser: {request.prompt}"
 
+    # Token budget: reserve the worst case now, settle against real usage below
+    caller_id, plan = token_caller(http_request)
+    prompt_tokens = estimate_tokens(full_prompt)
+    budget = token_limiter.reserve(caller_id, plan, prompt_tokens + request.max_tokens)
+    if not budget.allowed:
+        raise HTTPException(status_code=429, detail="Token rate limit exceeded", headers=budget.headers())
+
     try:
-        # Call the model WITH tools (Synchronous)
-        result = client.generate_text(
-            prompt=full_prompt,
-            model=target_model,
-            max_tokens=request.max_tokens,
-            temperature=request.temperature,
-            tools=NATIVE_TOOLS
-        )
+        # Identity of this upstream call, shared by the response cache and single-flight
+        mapped_model = client._map_model(target_model) if hasattr(client, "_map_model") else target_model
+        flight_key = make_cache_key(mapped_model, full_prompt, request.max_tokens, request.temperature, NATIVE_TOOLS)
+        
+        # Deterministic (temperature 0) or opted-in requests are served from the response cache
+        cache_key = None
+        result = None
+        if response_cache is not None and (request.temperature == 0 or cache_opt_in(x_response_cache)):
+            cache_key = flight_key
+            result = await cache_call(response_cache, response_cache.get, cache_key)
+
+        cached = result is not None
+        if cached:
+            budget.settle(0)  # Served from cache: no upstream tokens
+
+        def finish_stream(text: str, cacheable: bool = True) -> None:
+            # Streams report no usage, so settle on an estimate of what was generated
+            budget.settle(prompt_tokens + estimate_tokens(text))
+            if cache_key and cacheable:
+                response_cache.set(cache_key, {"output": text, "model": target_model, "usage": None})
+
+        # Stream straight from upstream when the client can report tool calls mid-stream.
+        # Text-only answers then reach the user at upstream TTFT; tool calls still
+        # go through the confirmation flow below.
+        if result is None and request.stream and hasattr(client, "stream_with_tools"):
+            open_stream = lambda: stream_with_tools_async(
+                client,
+                prompt=full_prompt,
+                model=target_model,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature,
+                tools=NATIVE_TOOLS
+            )
+            # Identical concurrent requests attach to the leader's stream
+            events = single_flight.stream(flight_key, open_stream) if single_flight else open_stream()
+            
+            # Peek until we know whether the reply opens with text or a tool call
+            first_event = await anext(events, None)
+            if first_event is None:
+                budget.settle(prompt_tokens)
+                return StreamingResponse(iter(()), media_type="text/plain")
+            
+            if first_event["type"] == "text":
+                return StreamingResponse(
+                    stream_generation(first_event, events, request.prompt, sessions, on_complete=finish_stream),
+                    media_type="text/plain"
+                )
+            
+            # Tool call before any text: drain the stream and answer with JSON
+            raw_tool_calls = []
+            async for event in _prepend(first_event, events):
+                if event["type"] == "tool_calls":
+                    raw_tool_calls = event["tool_calls"]
+            
+            proposals = build_tool_proposals(raw_tool_calls)
+            budget.settle(prompt_tokens + estimate_tokens(tool_call_text(proposals)))
+            session_id = await open_confirmation_session(sessions, request.prompt, proposals) if proposals else None
+            return UnifiedResponse(
+                request_id=request_id,
+                output=format_pending_actions(proposals) if proposals else "",
+                model=model,
+                action_required=bool(proposals),
+                pending_actions=proposals,
+                session_id=session_id
+            )
+
+        if result is None:
+            # Call the model WITH tools (off the event loop)
+            generate = lambda: generate_text_async(
+                client,
+                prompt=full_prompt,
+                model=target_model,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature,
+                tools=NATIVE_TOOLS
+            )
+            # Identical concurrent requests await the leader's upstream call
+            result = await single_flight.do(flight_key, generate) if single_flight else await generate()
+            used = usage_tokens(result.get("usage"))
+            if used is None:
+                # Providers without usage (e.g. some OpenRouter models): settle on an estimate
+                generated = (result.get("output") or "") + tool_call_text(build_tool_proposals(result.get("tool_calls") or []))
+                used = prompt_tokens + estimate_tokens(generated)
+            budget.settle(used)
+            if cache_key:
+                await cache_call(response_cache, response_cache.set, cache_key, result)
         
         raw_tool_calls = result.get("tool_calls")
         
         # 3A. Tool Actions Required -> Return JSON
         if raw_tool_calls:
-            proposals = []
-            for tool_call in raw_tool_calls:
-                func_name = tool_call.function.name
-                try:
-                    func_args = json.loads(tool_call.function.arguments)
-                except:
-                    func_args = {}
-                
-                # Map to our ToolTypes
-                risk = "low"
-                desc = f"Call {func_name}"
-                
-                if func_name == "create_file":
-                    risk = "medium"
-                    desc = f"Create file: {func_args.get('path', 'unknown')}"
-                elif func_name == "run_command":
-                    risk = "high"
-                    desc = f"Run command: {func_args.get('command')}"
-                elif func_name == "list_directory":
-                    desc = f"List directory: {func_args.get('path')}"
-
-                proposals.append({
-                    "tool_id": str(uuid.uuid4()),
-                    "tool_type": func_name,
-                    "description": desc,
-                    "parameters": func_args,
-                    "requires_confirmation": True,
-                    "risk_level": risk,
-                    "native_tool_call_id": tool_call.id
-                })
+            proposals = build_tool_proposals(raw_tool_calls)
             
             if proposals:
-                session_id = str(uuid.uuid4())
-                _sessions[session_id] = {
-                    "prompt": request.prompt,
-                    "pending_actions": proposals,
-                    "created_at": datetime.utcnow().isoformat()
-                }
-                
-                output = f"I need to perform the following actions:\n\n"
-                for i, p in enumerate(proposals, 1):
-                    output += f"{i}. {p['description']} [Risk: {p['risk_level']}]\n"
+                session_id = await open_confirmation_session(sessions, request.prompt, proposals)
+                output = format_pending_actions(proposals)
                 
                 if result.get("output"):
                     output = f"{result['output']}\n\n{output}"
@@ -500,7 +717,8 @@ async def unified_generate(
         
         # Default JSON return
         return UnifiedResponse(
-            request_id=result.get("request_id", request_id),
+            # A cache hit is answered under this request's id, not the one that filled the cache
+            request_id=request_id if cached else result.get("request_id", request_id),
             output=text_output,
             model=result.get("model", model),
             action_required=False,
@@ -510,4 +728,5 @@ async def unified_generate(
 
     except Exception as e:
         logger.error(f"Generation error: {e}")
+        budget.settle(0)  # Refund the reservation of a failed upstream call
         raise HTTPException(status_code=500, detail=str(e))
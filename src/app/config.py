@@ -12,8 +12,35 @@ class Settings(BaseSettings):
     """
     ZAI_API_KEY: Optional[str] = None # Z.AI API Key (Primary Provider)
     OPENROUTER_API_KEY: Optional[str] = None # OpenRouter Key (DeepSeek)
+    ANTHROPIC_API_KEY: Optional[str] = None # Native Anthropic Key (Agentic endpoints)
     USE_MOCK_CLIENT: bool = True
     DEFAULT_MODEL: str = "deepseek/deepseek-chat"
+
+    # Provider HTTP Client
+    PROVIDER_ASYNC_CLIENT: bool = True  # Use AsyncAnthropic/AsyncOpenAI over a shared connection pool
+    PROVIDER_MAX_CONNECTIONS: int = 100
+    PROVIDER_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    PROVIDER_KEEPALIVE_EXPIRY: float = 30.0  # Seconds an idle connection is kept open
+    PROVIDER_HTTP2: bool = True  # Only effective when the 'h2' package is installed
+
+    # Upstream Response Cache (temperature 0, or opted in via X-Response-Cache header)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL_SECONDS: int = 3600
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RESPONSE_CACHE_REDIS_URL: Optional[str] = None  # Enables the shared Redis tier
+    SINGLE_FLIGHT_ENABLED: bool = True  # Coalesce concurrent identical upstream calls
+
+    # Tool-confirmation sessions (/api/generate and /api/agent)
+    SESSION_TTL_SECONDS: int = 3600  # Sessions expire this long after their last use
+    SESSION_MAX_ENTRIES: int = 10000  # In-process store cap (least recently used evicted)
+    SESSION_REDIS_URL: Optional[str] = None  # Shared store; required with more than one worker process
+    TOOL_MAX_CONCURRENCY: int = 16  # Approved tool actions (S3/filesystem calls) run at once per process
+    COMMAND_MAX_CONCURRENCY: int = 4  # run_command subprocesses at once per event loop
+    COMMAND_TIMEOUT_SECONDS: float = 300  # Wall-clock limit; the process group is killed after it
+    COMMAND_CPU_SECONDS: int = 120  # RLIMIT_CPU for each command (0 = unlimited)
+    COMMAND_MEMORY_BYTES: int = 2147483648  # RLIMIT_AS for each command (0 = unlimited)
+    COMMAND_OUTPUT_MAX_BYTES: int = 1048576  # Last N bytes of stdout/stderr kept in the result
     
     # AWS Secrets Manager Configuration
     AWS_SECRETS_MANAGER_ENABLED: bool = False
@@ -34,15 +61,44 @@ class Settings(BaseSettings):
     ALLOWED_API_KEYS: str = ""  # Comma separated list
     JWT_SECRET: str = "REPLACE_ME"
     RATE_LIMIT_PER_MINUTE: int = 60
+    RATE_LIMIT_REDIS_URL: Optional[str] = None  # Shared GCRA limiter; unset = per-process limiter
+    RATE_LIMIT_LOCAL_TOKENS: int = 0  # Tokens taken per Redis round trip and spent locally (0/1 = off)
+    RATE_LIMIT_MAX_CLIENTS: int = 100000  # In-process limiter state cap (least recently seen clients evicted)
+    # Upstream token budget per Client.plan for /api/generate ("plan:tokens_per_minute", 0 = unlimited;
+    # unknown plans and unauthenticated callers use "free")
+    TOKEN_LIMITS_PER_MINUTE: str = "free:50000,standard:200000,premium:1000000,enterprise:0"
     AUDIT_LOG_PATH: str = "logs/audit.log"
+    AUDIT_QUEUE_SIZE: int = 10000  # Pending audit events before new ones are dropped (and counted)
+    AUDIT_FSYNC_SECONDS: float = 1.0  # Max interval between fsyncs of the audit log
+    AUDIT_MAX_BYTES: int = 104857600  # Rotate the audit log at this size (0 = never)
+    AUDIT_ROTATE_SECONDS: int = 0  # Also rotate after this many seconds (0 = never)
+    AUDIT_BACKUP_COUNT: int = 5  # Rotated files kept (audit.log.1 .. audit.log.N)
 
     # Queue Configuration
     QUEUE_MAX_ATTEMPTS: int = 3
     QUEUE_DLQ_NAME: str = "dead_letter_queue"
+    ENQUEUE_BATCH_MAX_ITEMS: int = 1000  # Prompts accepted per POST /api/enqueue/batch
+    WORKER_CONCURRENCY: int = 50  # Jobs kept in flight per worker process
+    WORKER_DRAIN_TIMEOUT_SECONDS: float = 30.0  # On shutdown, wait this long for in-flight jobs
+    WORKER_RESERVE_TIMEOUT_SECONDS: float = 10.0  # Long-poll wait per reserve (also bounds stop latency)
+    WORKER_MAINTENANCE_INTERVAL_SECONDS: float = 5.0  # Lease reaping / delayed-job promotion period
+    WORKER_INTERACTIVE_RESERVED_SLOTS: int = 5  # Slots batch-priority jobs may never occupy
+    WORKER_METRICS_INTERVAL_SECONDS: float = 60.0  # How often job wait/run/attempt samples are sent to CloudWatch
+
+    # Streaming Broker (Redis Streams)
+    BROKER_REDIS_URL: Optional[str] = None  # Unset = no broker backend (local/dev)
+    BROKER_STREAM_MAXLEN: int = 10000  # Approximate entries kept per request stream
+    BROKER_STREAM_TTL_SECONDS: int = 3600  # Streams expire this long after their last message
+    SSE_HEARTBEAT_SECONDS: float = 15.0  # Comment frame sent when a stream is idle this long
+    SSE_BUFFER_SIZE: int = 256  # Per-connection messages buffered before chunks are coalesced
 
     # Observability Configuration
     ENABLE_TRACING: bool = False
     LOG_JSON: bool = True
+    LOG_LEVEL: str = "INFO"
+    LOG_QUEUE_SIZE: int = 10000  # Log records queued for the writer thread before LOG_OVERFLOW applies
+    LOG_OVERFLOW: str = "drop-debug"  # Full log queue: block | drop-debug | sample (WARNING+ always waits)
+    LOG_BATCH_SIZE: int = 100  # Lines written to stdout per write()
     TRACE_SAMPLING_RATE: float = 1.0
 
     # Security Hardening
@@ -64,6 +120,8 @@ class Settings(BaseSettings):
             secrets = get_secrets_from_aws(self.AWS_SECRETS_NAME, boto3_client)
             
             # Update settings if keys exist in the secret
+            if "ANTHROPIC_API_KEY" in secrets:
+                self.ANTHROPIC_API_KEY = secrets["ANTHROPIC_API_KEY"]
             if "ZAI_API_KEY" in secrets:
                 self.ZAI_API_KEY = secrets["ZAI_API_KEY"]
             if "OPENROUTER_API_KEY" in secrets:
@@ -59,6 +59,23 @@ class SupabaseClientWrapper:
         # Fallback if no client
         return {"id": "fallback-id", "created_at": "now"}
 
+    def create_requests(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Creates many request log entries in a single insert.
+        Each row has prompt, model, stream, user_id and optionally id.
+        """
+        data = [{**row, "status": "queued"} for row in rows]
+
+        if self.client:
+            try:
+                return self.client.table("request_logs").insert(data).execute().data
+            except Exception as e:
+                logger.error(f"DB Error create_requests: {e}")
+                return []
+
+        # Fallback if no client
+        return [{"id": row.get("id", "fallback-id"), "created_at": "now"} for row in rows]
+
     def update_request_status(
         self, 
         request_id: str, 
@@ -1,14 +1,43 @@
 from functools import lru_cache
-from typing import Optional, Any
+from typing import Optional, Any, Dict, Tuple, Callable
 from fastapi import Depends
 from src.app.config import Settings
-from src.app.services.anthropic_client import AnthropicClientProtocol, RealAnthropicClient, MockAnthropicClient
-from src.app.config import Settings
-from src.app.services.anthropic_client import AnthropicClientProtocol, RealAnthropicClient, MockAnthropicClient
+from src.app.services.anthropic_client import (
+    AnthropicClientProtocol,
+    AnyAnthropicClient,
+    RealAnthropicClient,
+    AsyncRealAnthropicClient,
+    MockAnthropicClient,
+)
+from src.app.services.response_cache import ResponseCache, InMemoryLRUTier, RedisCacheTier
+from src.app.services.single_flight import SingleFlight
+from src.app.services.session_store import SessionStore, InMemorySessionStore, RedisSessionStore
+from src.app.tools.engine import ToolEngine
+from src.app.tools.command_runner import CommandRunner
+from src.app.metrics.publish_queue_metrics import CloudWatchPusher
+from src.app.graceful_shutdown import register_shutdown_handler
 
 # Singleton instance
 _settings_instance: Optional[Settings] = None
 
+# Response cache singleton (None when disabled)
+_response_cache: Optional[ResponseCache] = None
+
+# Tool-confirmation session store singleton
+_session_store: Optional[SessionStore] = None
+
+# Thread pool that runs confirmed tool actions
+_tool_engine: Optional[ToolEngine] = None
+
+# CloudWatch pusher shared by everything that publishes metrics in this process
+_metrics_pusher: Optional[CloudWatchPusher] = None
+
+# Single-flight registry for in-flight upstream calls
+_single_flight = SingleFlight()
+
+# Async provider clients, one per (kind, api_key, base_url), each owning a connection pool
+_pooled_clients: Dict[Tuple[str, str, Optional[str]], Any] = {}
+
 def get_settings(boto3_client: Optional[Any] = None) -> Settings:
     """
     Returns a cached instance of the application settings.
@@ -24,27 +53,148 @@ def get_settings(boto3_client: Optional[Any] = None) -> Settings:
             _settings_instance.load_from_aws_secrets(boto3_client=boto3_client)
     return _settings_instance
 
-def get_anthropic_client(settings: Settings = Depends(get_settings)) -> AnthropicClientProtocol:
+def get_pooled_client(key: Tuple[str, str, Optional[str]], factory: Callable[[], Any]) -> Any:
     """
-    Dependency that provides an instance of AnthropicClientProtocol.
-    Returns MockAnthropicClient if USE_MOCK_CLIENT is True, otherwise RealAnthropicClient.
+    Returns the process-wide async client for `key`, creating it on first use.
+    The client's pool is closed by the graceful shutdown handlers.
     """
+    client = _pooled_clients.get(key)
+    if client is None:
+        client = factory()
+        _pooled_clients[key] = client
+        register_shutdown_handler(client.aclose)
+    return client
+
+def _provider_client(settings: Settings, api_key: str, base_url: str, sync: bool = False) -> AnyAnthropicClient:
+    if sync or not settings.PROVIDER_ASYNC_CLIENT:
+        return RealAnthropicClient(api_key=api_key, base_url=base_url)
+    
+    return get_pooled_client(
+        ("provider", api_key, base_url),
+        lambda: AsyncRealAnthropicClient(
+            api_key=api_key,
+            base_url=base_url,
+            max_connections=settings.PROVIDER_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.PROVIDER_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.PROVIDER_KEEPALIVE_EXPIRY,
+            http2=settings.PROVIDER_HTTP2
+        )
+    )
+
+def _select_client(settings: Settings, sync: bool) -> AnyAnthropicClient:
     if settings.USE_MOCK_CLIENT:
         return MockAnthropicClient()
     
     # OpenRouter Provider (DeepSeek)
     if settings.OPENROUTER_API_KEY:
-        return RealAnthropicClient(
-            api_key=settings.OPENROUTER_API_KEY, 
-            base_url="https://openrouter.ai/api/v1"
-        )
+        return _provider_client(settings, settings.OPENROUTER_API_KEY, "https://openrouter.ai/api/v1", sync)
 
     # Z.AI Provider
     if settings.ZAI_API_KEY:
-        return RealAnthropicClient(
-            api_key=settings.ZAI_API_KEY, 
-            base_url="https://api.z.ai/api/anthropic"
-        )
+        return _provider_client(settings, settings.ZAI_API_KEY, "https://api.z.ai/api/anthropic", sync)
 
     # Fallback to mock if no key provided
     return MockAnthropicClient()
+
+def get_anthropic_client(settings: Settings = Depends(get_settings)) -> AnyAnthropicClient:
+    """
+    Dependency that provides a provider client for event-loop callers.
+    Returns MockAnthropicClient if USE_MOCK_CLIENT is True, otherwise a real client:
+    the shared AsyncRealAnthropicClient (AsyncAnthropicClientProtocol) when
+    PROVIDER_ASYNC_CLIENT is set, else a per-request RealAnthropicClient.
+    Callers must handle both shapes (see unified.generate_text_async).
+    """
+    return _select_client(settings, sync=False)
+
+def get_sync_anthropic_client(settings: Settings = Depends(get_settings)) -> AnthropicClientProtocol:
+    """
+    Provider client for blocking consumers that iterate streams on a thread
+    (e.g. StreamingWorker). Always an AnthropicClientProtocol, whatever
+    PROVIDER_ASYNC_CLIENT says.
+    """
+    return _select_client(settings, sync=True)
+
+def get_response_cache(settings: Settings = Depends(get_settings)) -> Optional[ResponseCache]:
+    """
+    Dependency that provides the process-wide upstream response cache.
+    Returns None when RESPONSE_CACHE_ENABLED is False.
+    """
+    global _response_cache
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None
+    if _response_cache is None:
+        remote = None
+        if settings.RESPONSE_CACHE_REDIS_URL:
+            remote = RedisCacheTier(
+                redis_url=settings.RESPONSE_CACHE_REDIS_URL,
+                ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS
+            )
+        _response_cache = ResponseCache(
+            local=InMemoryLRUTier(
+                max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+                max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+                ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS
+            ),
+            remote=remote
+        )
+    return _response_cache
+
+def get_session_store(settings: Settings = Depends(get_settings)) -> SessionStore:
+    """
+    Dependency that provides the process-wide tool-confirmation session store:
+    Redis when SESSION_REDIS_URL is set, otherwise in-process.
+    """
+    global _session_store
+    if _session_store is None:
+        if settings.SESSION_REDIS_URL:
+            _session_store = RedisSessionStore(
+                redis_url=settings.SESSION_REDIS_URL,
+                ttl_seconds=settings.SESSION_TTL_SECONDS
+            )
+        else:
+            _session_store = InMemorySessionStore(
+                max_entries=settings.SESSION_MAX_ENTRIES,
+                ttl_seconds=settings.SESSION_TTL_SECONDS
+            )
+    return _session_store
+
+def get_tool_engine(settings: Settings = Depends(get_settings)) -> ToolEngine:
+    """
+    Dependency that provides the process-wide tool execution engine, sized by
+    TOOL_MAX_CONCURRENCY, with run_command limited by the COMMAND_* settings.
+    Its pool is shut down by the graceful shutdown handlers.
+    """
+    global _tool_engine
+    if _tool_engine is None:
+        _tool_engine = ToolEngine(
+            max_workers=settings.TOOL_MAX_CONCURRENCY,
+            commands=CommandRunner(
+                max_concurrent=settings.COMMAND_MAX_CONCURRENCY,
+                timeout_seconds=settings.COMMAND_TIMEOUT_SECONDS,
+                cpu_seconds=settings.COMMAND_CPU_SECONDS,
+                memory_bytes=settings.COMMAND_MEMORY_BYTES,
+                max_output_bytes=settings.COMMAND_OUTPUT_MAX_BYTES
+            )
+        )
+        register_shutdown_handler(_tool_engine.shutdown)
+    return _tool_engine
+
+def get_metrics_pusher() -> CloudWatchPusher:
+    """
+    Returns the process-wide CloudWatch pusher (disabled without boto3).
+    Datums still buffered are sent by the graceful shutdown handlers.
+    """
+    global _metrics_pusher
+    if _metrics_pusher is None:
+        _metrics_pusher = CloudWatchPusher()
+        register_shutdown_handler(_metrics_pusher.flush)
+    return _metrics_pusher
+
+def get_single_flight(settings: Settings = Depends(get_settings)) -> Optional[SingleFlight]:
+    """
+    Dependency that provides the process-wide single-flight registry.
+    Returns None when SINGLE_FLIGHT_ENABLED is False.
+    """
+    if not settings.SINGLE_FLIGHT_ENABLED:
+        return None
+    return _single_flight
@@ -1,14 +1,146 @@
 import re
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Pattern, Tuple
+
+REPLACEMENT = "[REDACTED]"
 
 # Common patterns to redact
 PATTERNS = {
     "EMAIL": r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+",
     "API_KEY": r"(sk-[a-zA-Z0-9]{20,})", # Example pattern for API keys
     "JWT": r"eyJ[a-zA-Z0-9_-]+\.eyJ[a-zA-Z0-9_-]+\.[a-zA-Z0-9_-]+",
-    "CREDIT_CARD": r"\b(?:\d[ -]*?){13,16}\b"
+    # Digits and separators are disjoint, so this cannot backtrack like (?:\d[ -]*?){13,16}
+    "CREDIT_CARD": r"\b\d(?:[ -]*\d){12,15}\b"
+}
+
+# Substrings every match of a pattern contains; text containing none of a
+# pattern's triggers cannot match it, so that pattern is skipped.
+TRIGGERS = {
+    "EMAIL": ("@",),
+    "API_KEY": ("sk-",),
+    "JWT": ("eyJ",),
+    "CREDIT_CARD": tuple("0123456789")
 }
 
+# For StreamRedactor: what a not-yet-finished match of each pattern can look
+# like at the end of the text seen so far (every prefix of a possible match,
+# including complete matches that could still grow).
+PARTIAL_PATTERNS = {
+    "EMAIL": r"[a-zA-Z0-9_.+-]+(?:@(?:[a-zA-Z0-9-]+(?:\.[a-zA-Z0-9-.]*)?)?)?",
+    "API_KEY": r"s(?:k(?:-[a-zA-Z0-9]*)?)?",
+    "JWT": r"e(?:y(?:J[a-zA-Z0-9_-]*(?:\.(?:e(?:y(?:J[a-zA-Z0-9_-]*(?:\.[a-zA-Z0-9_-]*)?)?)?)?)?)?)?",
+    "CREDIT_CARD": r"\b\d(?:[ -]*\d){0,15}[ -]*"
+}
+
+@lru_cache(maxsize=64)
+def _compile(patterns: Tuple[str, ...]) -> Pattern:
+    """One alternation over all patterns, so the text is scanned once."""
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+
+class Redactor:
+    """
+    Single-pass redaction over a table of named patterns.
+
+    All patterns are compiled into one alternation (leftmost match wins, so an
+    overlapping secret is replaced once). Before scanning, the text is checked
+    for each pattern's trigger substrings (much cheaper than a regex scan);
+    text that contains none is returned as is, and otherwise only the patterns
+    that could match are compiled into the alternation.
+    """
+    def __init__(
+        self,
+        patterns: Dict[str, str],
+        triggers: Optional[Dict[str, Tuple[str, ...]]] = None,
+        replacement: str = REPLACEMENT
+    ):
+        self.patterns = dict(patterns)
+        self.triggers = triggers or {}
+        self.replacement = replacement
+        # (name, search for any trigger or None = always active)
+        self._checks = [
+            (name, re.compile("|".join(map(re.escape, self.triggers[name]))).search if name in self.triggers else None)
+            for name in self.patterns
+        ]
+        self._regexes: Dict[Tuple[str, ...], Pattern] = {}
+
+    def active(self, text: str) -> Tuple[str, ...]:
+        """Names of the patterns that may match `text`."""
+        return tuple(name for name, search in self._checks if search is None or search(text))
+
+    def redact(self, text: str) -> str:
+        if not text:
+            return text
+        names = self.active(text)
+        if not names:
+            return text
+        regex = self._regexes.get(names)
+        if regex is None:
+            regex = self._regexes[names] = _compile(tuple(self.patterns[name] for name in names))
+        return regex.sub(self.replacement, text)
+
+DEFAULT_REDACTOR = Redactor(PATTERNS, TRIGGERS)
+
+class StreamRedactor:
+    """
+    Incremental redaction for text that arrives in pieces (model tokens,
+    large payloads read in chunks), where a secret may span chunk boundaries.
+
+    feed() returns the redacted text that is safe to emit now and holds back
+    only the longest suffix that could still be the start of a match
+    (PARTIAL_PATTERNS), e.g. a trailing word that may turn into an email;
+    flush() redacts and returns the held text at the end of the stream. The
+    concatenated output equals redact_text() over the whole text.
+
+    Memory is bounded: at most `max_hold` characters are held. A would-be
+    match longer than that is redacted up to that point, so only a secret
+    longer than `max_hold` can leak its remainder. Not thread-safe; use one
+    per stream.
+    """
+    def __init__(
+        self,
+        patterns: Dict[str, str] = PATTERNS,
+        partials: Dict[str, str] = PARTIAL_PATTERNS,
+        replacement: str = REPLACEMENT,
+        max_hold: int = 1024
+    ):
+        self.replacement = replacement
+        self.max_hold = max_hold
+        self._regex = _compile(tuple(patterns.values()))
+        self._partial = re.compile("|".join(f"(?:{partials[name]})\\Z" for name in patterns))
+        self._held = ""
+
+    def feed(self, chunk: str) -> str:
+        text = self._held + chunk
+        if not text:
+            return ""
+        # Must emit at least up to `forced` to stay within max_hold
+        forced = max(0, len(text) - self.max_hold)
+        partial = self._partial.search(text, forced)
+        hold = partial.start() if partial else len(text)
+
+        out = []
+        pos = 0
+        for match in self._regex.finditer(text):
+            start, end = match.span()
+            if start >= hold:
+                break
+            if end > hold:
+                if start >= forced:
+                    # Could still grow: wait for more text
+                    hold = start
+                    break
+                hold = end
+            out.append(text[pos:start])
+            out.append(self.replacement)
+            pos = end
+        out.append(text[pos:hold])
+        self._held = text[hold:]
+        return "".join(out)
+
+    def flush(self) -> str:
+        text, self._held = self._held, ""
+        return self._regex.sub(self.replacement, text) if text else ""
+
 def redact_text(text: str, patterns: Optional[List[str]] = None) -> str:
     """
     Redacts sensitive information from text using regex patterns.
@@ -17,13 +149,9 @@ def redact_text(text: str, patterns: Optional[List[str]] = None) -> str:
         return text
         
     if patterns is None:
-        patterns = list(PATTERNS.values())
-        
-    redacted_text = text
-    for pattern in patterns:
-        redacted_text = re.sub(pattern, "[REDACTED]", redacted_text)
+        return DEFAULT_REDACTOR.redact(text)
         
-    return redacted_text
+    return _compile(tuple(patterns)).sub(REPLACEMENT, text)
 
 def redact_headers(headers: Dict[str, Any]) -> Dict[str, Any]:
     """
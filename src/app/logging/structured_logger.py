@@ -1,15 +1,30 @@
+import atexit
+import copy
 import logging
 import json
 import datetime
-import threading
 import queue
 import sys
-from typing import Any, Dict, Optional
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional
+from src.app.config import Settings
+from src.app.graceful_shutdown import register_shutdown_handler
 from src.app.logging.redaction import redact_text
+from src.app.observability import increment_log_dropped
 
-# Global queue for non-blocking logging
-_LOG_QUEUE = queue.Queue(maxsize=1000)
-_LISTENER_THREAD = None
+# Overflow policies for a full log queue
+OVERFLOW_BLOCK = "block"            # wait for space (never lose a record)
+OVERFLOW_DROP_DEBUG = "drop-debug"  # drop records below WARNING, wait for the rest
+OVERFLOW_SAMPLE = "sample"          # keep 1 in `sample_every` records below WARNING, wait for the rest
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_DEBUG, OVERFLOW_SAMPLE)
+
+# Global queue and listener for non-blocking logging (set by configure_logging)
+_LOG_QUEUE: Optional[queue.Queue] = None
+_LISTENER: Optional["BatchingQueueListener"] = None
+_STOP_REGISTERED = False
+
+# Fields copied from `extra={...}` onto the record
+CONTEXT_FIELDS = frozenset(("request_id", "trace_id", "span_id", "user_id", "route", "latency_ms", "status"))
 
 class StructuredFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
@@ -25,66 +40,160 @@ class StructuredFormatter(logging.Formatter):
             "file": record.filename,
             "line": record.lineno
         }
-        
-        # Add extra fields if present
-        if hasattr(record, "request_id"):
-            log_record["request_id"] = record.request_id
-        if hasattr(record, "trace_id"):
-            log_record["trace_id"] = record.trace_id
-        if hasattr(record, "span_id"):
-            log_record["span_id"] = record.span_id
-        if hasattr(record, "user_id"):
-            log_record["user_id"] = record.user_id
-        if hasattr(record, "route"):
-            log_record["route"] = record.route
-        if hasattr(record, "latency_ms"):
-            log_record["latency_ms"] = record.latency_ms
-        if hasattr(record, "status"):
-            log_record["status"] = record.status
-            
+
+        # Add extra fields if present (one set intersection instead of a check per field)
+        attrs = record.__dict__
+        for key in CONTEXT_FIELDS.intersection(attrs):
+            log_record[key] = attrs[key]
+
         # Merge 'extra' dict if passed
-        if hasattr(record, "extra_data"):
-            log_record.update(record.extra_data)
+        extra_data = attrs.get("extra_data")
+        if extra_data:
+            log_record.update(extra_data)
 
         return json.dumps(log_record)
 
-def _log_listener():
+class OverflowQueueHandler(QueueHandler):
     """
-    Background thread to process log records from queue.
+    QueueHandler with a bounded queue and an explicit policy for when it is
+    full (see OVERFLOW_POLICIES). WARNING and above always wait for space, so
+    only debug/info chatter is ever lost; dropped records are counted in
+    `dropped` and log_records_dropped_total{level}.
+
+    Records are queued unformatted (the listener thread does the JSON encoding
+    and redaction); the message is merged with its args here since args may
+    not be safe to share across threads.
     """
-    while True:
+    def __init__(self, log_queue: queue.Queue, overflow: str = OVERFLOW_DROP_DEBUG, sample_every: int = 10):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown log overflow policy: {overflow}")
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.sample_every = max(1, sample_every)
+        self.dropped = 0
+        self._overflowed = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Traceback objects must not cross threads; keep the text instead
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
         try:
-            record = _LOG_QUEUE.get()
-            if record is None:
-                break
-            # In a real app, this would write to a file or network socket.
-            # Here we just print to stderr/stdout to avoid blocking main loop IO
-            # if we were writing to a slow disk/network.
-            # For standard logging, we might re-emit to a handler.
-            # But to keep it simple and safe, we just let the handler do the work
-            # and this queue is just a buffer if we were using a QueueHandler.
-            # Actually, Python's QueueHandler/QueueListener pattern is better.
-            # Let's implement a simple QueueHandler that puts into _LOG_QUEUE
-            # and a listener that writes to StreamHandler.
-            pass 
-        except Exception:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
             pass
+        if self.overflow != OVERFLOW_BLOCK and record.levelno < logging.WARNING:
+            self._overflowed += 1
+            if self.overflow == OVERFLOW_DROP_DEBUG or self._overflowed % self.sample_every:
+                self.dropped += 1
+                increment_log_dropped(record.levelname)
+                return
+        self.queue.put(record)
+
+class BatchingStreamHandler(logging.StreamHandler):
+    """
+    StreamHandler that buffers formatted lines and writes them with a single
+    write()/flush() per batch: when `batch_size` lines are pending, or when
+    flush() is called (BatchingQueueListener does so once the queue is empty).
+    Only used from the listener thread.
+    """
+    def __init__(self, stream=None, batch_size: int = 100):
+        super().__init__(stream)
+        self.batch_size = batch_size
+        self._buffer: List[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._buffer.append(self.format(record) + self.terminator)
+            if len(self._buffer) >= self.batch_size:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            if self._buffer:
+                lines, self._buffer = "".join(self._buffer), []
+                self.stream.write(lines)
+            if self.stream and hasattr(self.stream, "flush"):
+                self.stream.flush()
+        finally:
+            self.release()
+
+class BatchingQueueListener(QueueListener):
+    """QueueListener that flushes its handlers whenever it has drained the queue."""
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        if self.queue.empty():
+            self.flush()
+
+    def flush(self) -> None:
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except (OSError, ValueError):
+                # Stream already closed (e.g. at interpreter exit), as in logging.shutdown()
+                pass
+
+def stop_logging() -> None:
+    """
+    Drain the log queue, flush and stop the listener thread (safe to call twice).
+    Records logged afterwards (e.g. by later shutdown handlers) are written
+    directly to the listener's streams instead of piling up in the queue.
+    """
+    global _LISTENER
+    if _LISTENER is not None:
+        listener, _LISTENER = _LISTENER, None
+        if listener._thread is not None:
+            listener.stop()
+        listener.flush()
+        root_logger = logging.getLogger()
+        for handler in root_logger.handlers[:]:
+            if isinstance(handler, OverflowQueueHandler) and handler.queue is listener.queue:
+                root_logger.removeHandler(handler)
+                for target in listener.handlers:
+                    direct = logging.StreamHandler(target.stream)
+                    direct.setFormatter(target.formatter)
+                    root_logger.addHandler(direct)
 
 def get_logger(name: str) -> logging.Logger:
     return logging.getLogger(name)
 
-def configure_logging(env: str = "dev", log_level: str = "INFO", json_format: bool = True):
+def configure_logging(
+    env: str = "dev",
+    log_level: str = "INFO",
+    json_format: bool = True,
+    queue_size: int = 10000,
+    overflow: str = OVERFLOW_DROP_DEBUG,
+    sample_every: int = 10,
+    batch_size: int = 100
+):
     """
     Configures the root logger.
+
+    Loggers only put records on a bounded queue (`queue_size`, with the
+    `overflow` policy once full); a QueueListener thread formats them and
+    writes to stdout in batches of up to `batch_size` lines, so a backed-up
+    stdout (e.g. an ECS log driver) stalls that thread, not the event loop.
     """
+    global _LOG_QUEUE, _LISTENER, _STOP_REGISTERED
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
     
     # Remove existing handlers
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
+    stop_logging()
         
-    handler = logging.StreamHandler(sys.stdout)
+    handler = BatchingStreamHandler(sys.stdout, batch_size=batch_size)
     
     if json_format:
         handler.setFormatter(StructuredFormatter())
@@ -92,8 +201,18 @@ def configure_logging(env: str = "dev", log_level: str = "INFO", json_format: bo
         handler.setFormatter(logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         ))
+
+    _LOG_QUEUE = queue.Queue(maxsize=queue_size)
+    _LISTENER = BatchingQueueListener(_LOG_QUEUE, handler)
+    _LISTENER.start()
+    if not _STOP_REGISTERED:
+        # Write out whatever is still queued on graceful shutdown, or at the
+        # latest when the process exits
+        register_shutdown_handler(stop_logging)
+        atexit.register(stop_logging)
+        _STOP_REGISTERED = True
         
-    root_logger.addHandler(handler)
+    root_logger.addHandler(OverflowQueueHandler(_LOG_QUEUE, overflow=overflow, sample_every=sample_every))
     
     # Guidance for Production:
     # if env == "production":
@@ -102,6 +221,17 @@ def configure_logging(env: str = "dev", log_level: str = "INFO", json_format: bo
     #     # root_logger.addHandler(CloudWatchLogHandler())
     #     pass
 
+def setup_logging(settings: Settings) -> None:
+    """configure_logging from the LOG_* settings (app and worker startup)."""
+    configure_logging(
+        env=settings.ENVIRONMENT,
+        log_level=settings.LOG_LEVEL,
+        json_format=settings.LOG_JSON,
+        queue_size=settings.LOG_QUEUE_SIZE,
+        overflow=settings.LOG_OVERFLOW,
+        batch_size=settings.LOG_BATCH_SIZE
+    )
+
 class LoggerAdapter(logging.LoggerAdapter):
     def process(self, msg, kwargs):
         extra = self.extra.copy()
@@ -7,11 +7,25 @@ Single endpoint /api/generate handles all functionality:
 - Tool use with confirmation (create files, run commands, etc.)
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from src.app.api import auth, unified, workspace
+from src.app.dependencies import get_settings
+from src.app.graceful_shutdown import _run_shutdown_handlers
+from src.app.logging.structured_logger import setup_logging
 
-app = FastAPI(title="Claude Proxy Backend")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Queued, batched logging; stop_logging is registered as a shutdown handler
+    setup_logging(get_settings())
+    yield
+    # Closes pooled provider connections and anything else registered for shutdown
+    await _run_shutdown_handlers()
+
+
+app = FastAPI(title="Claude Proxy Backend", lifespan=lifespan)
 
 # CORS Configuration
 app.add_middleware(
@@ -1,13 +1,21 @@
 import logging
-from typing import Optional, Any, Protocol
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional, Any, Protocol, List, Dict, Sequence
 from src.app.queue.adapter import QueueAdapter
 
 logger = logging.getLogger(__name__)
 
+MAX_DATUMS_PER_CALL = 1000  # CloudWatch put_metric_data limit
+MAX_VALUES_PER_DATUM = 150  # Distinct Values per datum (put_metric_data limit)
+
 class MetricsPusher(Protocol):
     def put_metric(self, name: str, value: float, unit: str = "Count") -> None:
         ...
 
+    def put_values(self, name: str, values: Sequence[float], unit: str = "Count", dimensions: Optional[Dict[str, str]] = None) -> None:
+        ...
+
 class FakeMetricsPusher:
     """
     In-memory metrics recorder for testing.
@@ -21,37 +29,76 @@ class FakeMetricsPusher:
             self.metrics[name] = []
         self.metrics[name].append(value)
 
+    def put_values(self, name: str, values: Sequence[float], unit: str = "Count", dimensions: Optional[Dict[str, str]] = None) -> None:
+        for value in values:
+            self.put_metric(name, value, unit)
+
 class CloudWatchPusher:
     """
     Publishes metrics to CloudWatch.
     Guarded import to prevent boto3 requirement in local/test envs.
+
+    Datums are buffered (with their timestamp) and sent in put_metric_data
+    calls of up to `max_batch` datums, when the buffer fills or on flush().
     """
-    def __init__(self, namespace: str = "ClaudeProxy/Queue"):
+    def __init__(self, namespace: str = "ClaudeProxy/Queue", client: Any = None, max_batch: int = MAX_DATUMS_PER_CALL):
         self.namespace = namespace
-        self.client = None
-        try:
-            import boto3
-            self.client = boto3.client("cloudwatch")
-        except ImportError:
-            logger.warning("boto3 not installed, CloudWatchPusher disabled")
+        self.client = client
+        self.max_batch = min(max_batch, MAX_DATUMS_PER_CALL)
+        self._buffer: List[Dict[str, Any]] = []
+        if self.client is None:
+            try:
+                import boto3
+                self.client = boto3.client("cloudwatch")
+            except ImportError:
+                logger.warning("boto3 not installed, CloudWatchPusher disabled")
 
     def put_metric(self, name: str, value: float, unit: str = "Count") -> None:
         if not self.client:
             return
-        
-        try:
-            self.client.put_metric_data(
-                Namespace=self.namespace,
-                MetricData=[
-                    {
-                        "MetricName": name,
-                        "Value": value,
-                        "Unit": unit
-                    }
-                ]
-            )
-        except Exception as e:
-            logger.error(f"Failed to push metric {name}: {e}")
+        self._buffer.append({
+            "MetricName": name,
+            "Value": value,
+            "Unit": unit,
+            "Timestamp": datetime.now(timezone.utc)
+        })
+        if len(self._buffer) >= self.max_batch:
+            self.flush()
+
+    def put_values(self, name: str, values: Sequence[float], unit: str = "Count", dimensions: Optional[Dict[str, str]] = None) -> None:
+        """
+        Buffer many samples of one metric as Values/Counts datums: each distinct
+        value is sent once with how often it occurred, up to MAX_VALUES_PER_DATUM
+        per datum, so CloudWatch still computes percentiles over all samples.
+        """
+        if not self.client or not values:
+            return
+        counts = Counter(values)
+        distinct = list(counts)
+        timestamp = datetime.now(timezone.utc)
+        for start in range(0, len(distinct), MAX_VALUES_PER_DATUM):
+            chunk = distinct[start:start + MAX_VALUES_PER_DATUM]
+            datum: Dict[str, Any] = {
+                "MetricName": name,
+                "Values": chunk,
+                "Counts": [float(counts[value]) for value in chunk],
+                "Unit": unit,
+                "Timestamp": timestamp
+            }
+            if dimensions:
+                datum["Dimensions"] = [{"Name": key, "Value": value} for key, value in dimensions.items()]
+            self._buffer.append(datum)
+            if len(self._buffer) >= self.max_batch:
+                self.flush()
+
+    def flush(self) -> None:
+        """Send all buffered datums."""
+        while self._buffer:
+            batch, self._buffer = self._buffer[:self.max_batch], self._buffer[self.max_batch:]
+            try:
+                self.client.put_metric_data(Namespace=self.namespace, MetricData=batch)
+            except Exception as e:
+                logger.error(f"Failed to push {len(batch)} metrics: {e}")
 
 def publish_queue_metrics(queue_adapter: QueueAdapter, pusher: Optional[MetricsPusher] = None) -> None:
     """
@@ -65,10 +112,28 @@ def publish_queue_metrics(queue_adapter: QueueAdapter, pusher: Optional[MetricsP
         depth = queue_adapter.inspect_queue_length("default")
         pusher.put_metric("QueueDepth", float(depth), "Count")
 
-        # 2. Oldest Message Age (Not supported by all adapters directly, 
-        # but we can simulate or add to interface later. For now, we skip or mock).
-        # If adapter supported it: age = queue_adapter.get_oldest_age("default")
-        # pusher.put_metric("OldestMessageAge", age, "Seconds")
+        # 2. Oldest Message Age (None when the backend cannot tell, e.g. SQS,
+        # which publishes ApproximateAgeOfOldestMessage itself)
+        age = queue_adapter.oldest_job_age("default")
+        if age is not None:
+            pusher.put_metric("OldestMessageAge", float(age), "Seconds")
+
+        # 3. Scheduling: per-priority depth and oldest wait (starvation), tenant fairness
+        if hasattr(queue_adapter, "scheduling_stats"):
+            stats = queue_adapter.scheduling_stats("default")
+            for priority, count in stats["depth"].items():
+                pusher.put_metric(f"QueueDepth.{priority}", float(count), "Count")
+            for priority, age in stats["oldest_wait_seconds"].items():
+                pusher.put_metric(f"OldestWait.{priority}", float(age), "Seconds")
+            # Only schedulers that track tenants report these (not RedisAdapter)
+            if "active_tenants" in stats:
+                pusher.put_metric("ActiveTenants", float(stats["active_tenants"]), "Count")
+            if "fairness" in stats:
+                pusher.put_metric("TenantFairnessIndex", float(stats["fairness"]), "None")
         
     except Exception as e:
         logger.error(f"Error publishing queue metrics: {e}")
+    finally:
+        # Batching pushers send everything collected above in one call
+        if hasattr(pusher, "flush"):
+            pusher.flush()
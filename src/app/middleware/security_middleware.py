@@ -6,7 +6,7 @@ from starlette.responses import JSONResponse
 
 from src.app.config import Settings
 from src.app.security.auth import validate_api_key, validate_jwt, Client
-from src.app.security.rate_limiter import get_rate_limiter
+from src.app.security.rate_limiter import get_rate_limiter, rate_limit_headers
 from src.app.security.audit import audit_event
 from src.app.schemas.security import RequestAudit
 
@@ -60,20 +60,18 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         # 2. Rate Limiting
         client_id = client.id if client else (request.client.host if request.client else "unknown")
         
-        if not self.rate_limiter.allow(client_id):
-            usage = self.rate_limiter.get_usage(client_id)
+        # Decision and usage come from one check (one Redis round trip at most)
+        rate_limit = self.rate_limiter.check(client_id)
+        if not rate_limit["allowed"]:
             return JSONResponse(
                 status_code=429,
                 content={"detail": "Rate limit exceeded"},
-                headers={
-                    "X-RateLimit-Limit": str(usage["limit"]),
-                    "X-RateLimit-Remaining": "0",
-                    "Retry-After": str(usage["reset"] - int(time.time()))
-                }
+                headers=rate_limit_headers(rate_limit)
             )
 
         # 3. Process Request
         response = await call_next(request)
+        response.headers.update(rate_limit_headers(rate_limit))
         
         # 4. Audit Logging
         duration = (time.time() - start_time) * 1000
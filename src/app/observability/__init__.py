@@ -9,6 +9,16 @@ logger = logging.getLogger(__name__)
 REQUEST_COUNTER: Any = None
 REQUEST_DURATION: Any = None
 IN_FLIGHT_REQUESTS: Any = None
+RESPONSE_CACHE_EVENTS: Any = None
+SINGLE_FLIGHT_CALLS: Any = None
+SSE_BACKPRESSURE_EVENTS: Any = None
+STREAM_FLUSH_TOKENS: Any = None
+QUEUE_WAIT_SECONDS: Any = None
+JOB_RUN_SECONDS: Any = None
+JOB_ATTEMPTS: Any = None
+AUDIT_LOG_EVENTS: Any = None
+LOG_RECORDS_DROPPED: Any = None
+SESSION_EVENTS: Any = None
 
 # Global Tracer Placeholder
 _TRACER: Any = None
@@ -43,7 +53,8 @@ def setup_metrics(app: Optional[FastAPI] = None):
     If prometheus_client is installed, register metrics and mount /metrics endpoint.
     Otherwise, use no-op metrics.
     """
-    global REQUEST_COUNTER, REQUEST_DURATION, IN_FLIGHT_REQUESTS
+    global REQUEST_COUNTER, REQUEST_DURATION, IN_FLIGHT_REQUESTS, RESPONSE_CACHE_EVENTS, SINGLE_FLIGHT_CALLS, SSE_BACKPRESSURE_EVENTS, STREAM_FLUSH_TOKENS
+    global QUEUE_WAIT_SECONDS, JOB_RUN_SECONDS, JOB_ATTEMPTS, AUDIT_LOG_EVENTS, LOG_RECORDS_DROPPED, SESSION_EVENTS
 
     try:
         from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
@@ -63,6 +74,60 @@ def setup_metrics(app: Optional[FastAPI] = None):
             "Number of HTTP requests currently being processed",
             ["method", "path"]
         )
+        RESPONSE_CACHE_EVENTS = Counter(
+            "response_cache_events_total",
+            "Upstream response cache hits, misses, evictions and expirations",
+            ["tier", "event"]
+        )
+        SINGLE_FLIGHT_CALLS = Counter(
+            "single_flight_calls_total",
+            "Upstream calls by single-flight role (leader = upstream call, follower = coalesced)",
+            ["kind", "role"]
+        )
+        SSE_BACKPRESSURE_EVENTS = Counter(
+            "sse_backpressure_events_total",
+            "Messages coalesced or dropped because an SSE client fell behind",
+            ["action"]
+        )
+        STREAM_FLUSH_TOKENS = Histogram(
+            "stream_flush_tokens",
+            "Tokens per chunk published by the streaming worker, by flush trigger",
+            ["reason"],
+            buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+        )
+        QUEUE_WAIT_SECONDS = Histogram(
+            "queue_job_wait_seconds",
+            "Time from enqueue (or becoming visible) until a worker starts the job",
+            ["queue"],
+            buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+        )
+        JOB_RUN_SECONDS = Histogram(
+            "queue_job_run_seconds",
+            "Job run duration by outcome (success/retried/failed); the count is throughput",
+            ["queue", "outcome"],
+            buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+        )
+        JOB_ATTEMPTS = Histogram(
+            "queue_job_attempts",
+            "Delivery attempt number of each processed job",
+            ["queue"],
+            buckets=(1, 2, 3, 5, 10)
+        )
+        AUDIT_LOG_EVENTS = Counter(
+            "audit_log_events_total",
+            "Audit events by outcome (written, dropped on a full queue, error)",
+            ["outcome"]
+        )
+        LOG_RECORDS_DROPPED = Counter(
+            "log_records_dropped_total",
+            "Log records dropped by the overflow policy because the log queue was full",
+            ["level"]
+        )
+        SESSION_EVENTS = Counter(
+            "confirmation_session_events_total",
+            "Confirmation session store events (created, miss, expired, evicted) by backend",
+            ["store", "event"]
+        )
         
         if app:
             @app.get("/metrics")
@@ -76,6 +141,16 @@ def setup_metrics(app: Optional[FastAPI] = None):
         REQUEST_COUNTER = NoOpMetric()
         REQUEST_DURATION = NoOpMetric()
         IN_FLIGHT_REQUESTS = NoOpMetric()
+        RESPONSE_CACHE_EVENTS = NoOpMetric()
+        SINGLE_FLIGHT_CALLS = NoOpMetric()
+        SSE_BACKPRESSURE_EVENTS = NoOpMetric()
+        STREAM_FLUSH_TOKENS = NoOpMetric()
+        QUEUE_WAIT_SECONDS = NoOpMetric()
+        JOB_RUN_SECONDS = NoOpMetric()
+        JOB_ATTEMPTS = NoOpMetric()
+        AUDIT_LOG_EVENTS = NoOpMetric()
+        LOG_RECORDS_DROPPED = NoOpMetric()
+        SESSION_EVENTS = NoOpMetric()
 
 def increment_request_counter(method: str, path: str, status: int):
     if REQUEST_COUNTER:
@@ -93,6 +168,53 @@ def track_in_flight(method: str, path: str, increment: bool = True):
         else:
             metric.dec()
 
+def increment_cache_event(tier: str, event: str):
+    """Count a response cache event (hit, miss, eviction, expired) for a tier."""
+    if RESPONSE_CACHE_EVENTS:
+        RESPONSE_CACHE_EVENTS.labels(tier=tier, event=event).inc()
+
+def increment_single_flight(kind: str, role: str):
+    """Count a single-flight call (kind: generate/stream, role: leader/follower)."""
+    if SINGLE_FLIGHT_CALLS:
+        SINGLE_FLIGHT_CALLS.labels(kind=kind, role=role).inc()
+
+def increment_sse_backpressure(action: str):
+    """Count a message coalesced or dropped for a slow SSE client."""
+    if SSE_BACKPRESSURE_EVENTS:
+        SSE_BACKPRESSURE_EVENTS.labels(action=action).inc()
+
+def observe_stream_flush(reason: str, tokens: int):
+    """Record how many tokens one streaming worker flush published (reason: bytes/interval/final)."""
+    if STREAM_FLUSH_TOKENS:
+        STREAM_FLUSH_TOKENS.labels(reason=reason).observe(tokens)
+
+def observe_queue_wait(queue: str, seconds: float):
+    """Record how long a job waited in the queue before a worker started it."""
+    if QUEUE_WAIT_SECONDS:
+        QUEUE_WAIT_SECONDS.labels(queue=queue).observe(seconds)
+
+def observe_job_run(queue: str, outcome: str, seconds: float, attempts: int):
+    """Record one processed job: run duration by outcome, and its attempt number."""
+    if JOB_RUN_SECONDS:
+        JOB_RUN_SECONDS.labels(queue=queue, outcome=outcome).observe(seconds)
+    if JOB_ATTEMPTS:
+        JOB_ATTEMPTS.labels(queue=queue).observe(attempts)
+
+def increment_audit_event(outcome: str, count: int = 1):
+    """Count audit events by outcome (written/dropped/error)."""
+    if AUDIT_LOG_EVENTS:
+        AUDIT_LOG_EVENTS.labels(outcome=outcome).inc(count)
+
+def increment_log_dropped(level: str):
+    """Count a log record dropped because the log queue was full."""
+    if LOG_RECORDS_DROPPED:
+        LOG_RECORDS_DROPPED.labels(level=level).inc()
+
+def increment_session_event(store: str, event: str):
+    """Count a confirmation session event (created, miss, expired, evicted) for a store backend."""
+    if SESSION_EVENTS:
+        SESSION_EVENTS.labels(store=store, event=event).inc()
+
 # ------------------------------------------------------------------------
 # Tracing Setup
 # ------------------------------------------------------------------------
@@ -2,6 +2,7 @@ from .adapter import QueueAdapter
 from .redis_adapter import RedisAdapter
 from .sqs_adapter import SQSAdapter
 from .fake_queue import FakeQueue
+from .fake_redis import FakeRedis
 from .models import QueueJob
 
-__all__ = ["QueueAdapter", "RedisAdapter", "SQSAdapter", "FakeQueue", "QueueJob"]
+__all__ = ["QueueAdapter", "RedisAdapter", "SQSAdapter", "FakeQueue", "FakeRedis", "QueueJob"]
@@ -1,5 +1,17 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence
+
+class EnqueueBatchError(RuntimeError):
+    """
+    Raised by enqueue_many when only part of a batch was sent.
+    `job_ids` are the IDs assigned to every job, in order; `failed` maps the
+    index of each job that was NOT enqueued to its error. Every other job is
+    on the queue, so callers must retry only the failed ones.
+    """
+    def __init__(self, job_ids: List[str], failed: Dict[int, str]):
+        super().__init__(f"{len(failed)} of {len(job_ids)} job(s) were not enqueued")
+        self.job_ids = job_ids
+        self.failed = failed
 
 class QueueAdapter(ABC):
     """
@@ -14,15 +26,59 @@ class QueueAdapter(ABC):
         """
         pass
 
+    def enqueue_many(self, queue_name: str, jobs: List[Dict[str, Any]]) -> List[str]:
+        """
+        Enqueues several jobs, preserving their order.
+        Returns the job IDs.
+        Adapters override this to send the batch in as few round trips as possible;
+        when a backend sends the batch in parts, a partial failure is reported
+        with EnqueueBatchError.
+        """
+        return [self.enqueue(queue_name, job) for job in jobs]
+
     @abstractmethod
-    def reserve(self, queue_name: str, timeout: Optional[int] = 0) -> Optional[Dict[str, Any]]:
+    def reserve(self, queue_name: str, timeout: Optional[float] = 0) -> Optional[Dict[str, Any]]:
         """
         Atomically reserves a job from the queue.
         The job should be hidden from other workers for a visibility timeout.
+        Blocks for up to `timeout` seconds waiting for a job (0/None returns immediately).
         Returns the job dict or None if queue is empty.
+        Jobs carry `enqueued_at` (epoch seconds the job was sent or became
+        visible) when the backend knows it.
         """
         pass
 
+    def reserve_many(
+        self,
+        queue_name: str,
+        max_n: int,
+        timeout: Optional[float] = 0,
+        priorities: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Reserves up to `max_n` jobs, blocking for up to `timeout` seconds for the first one.
+        Returns an empty list if the queue is empty.
+        Adapters override this to fetch the batch in a single round trip.
+        `priorities` restricts the batch to those priority classes on adapters
+        that schedule by priority (see queue.scheduling); others ignore it.
+        """
+        jobs = []
+        job = self.reserve(queue_name, timeout=timeout)
+        while job:
+            jobs.append(job)
+            if len(jobs) >= max_n:
+                break
+            job = self.reserve(queue_name)
+        return jobs
+
+    def ack_many(self, queue_name: str, job_ids: List[str]) -> None:
+        """
+        Acknowledges several jobs at once.
+        Adapters override this to delete the batch in a single round trip.
+        """
+        for job_id in job_ids:
+            self.ack(queue_name, job_id)
+
     @abstractmethod
     def ack(self, queue_name: str, job_id: str) -> None:
         """
@@ -44,9 +100,24 @@ class QueueAdapter(ABC):
         """
         pass
 
+    def defer(self, queue_name: str, job: Dict[str, Any], delay_seconds: Optional[int] = 0) -> str:
+        """
+        Puts back a reserved job that was never run (e.g. it was reserved over
+        a capacity cap), without counting the delivery as an attempt.
+        Adapters that count attempts elsewhere than on the job override this.
+        """
+        return self.requeue(queue_name, {**job, "attempts": job.get("attempts", 1) - 1}, delay_seconds)
+
     @abstractmethod
     def inspect_queue_length(self, queue_name: str) -> int:
         """
         Returns the approximate number of messages in the queue.
         """
         pass
+
+    def oldest_job_age(self, queue_name: str) -> Optional[float]:
+        """
+        Returns how long (seconds) the oldest ready job has been waiting,
+        0.0 for an empty queue, or None if the backend cannot tell.
+        """
+        return None
@@ -1,92 +1,194 @@
 import uuid
 import time
-from typing import Optional, Dict, Any, List
+import heapq
+import itertools
+import threading
+from typing import Optional, Dict, Any, List, Tuple, Sequence
 from datetime import datetime, timedelta
 from src.app.queue.adapter import QueueAdapter
 from src.app.queue.models import QueueJob
+from src.app.queue.scheduling import FairScheduler, job_flow
 
 class FakeQueue(QueueAdapter):
     """
-    In-memory queue for testing.
+    In-memory queue for testing and local load tests.
+
+    Each queue keeps ready jobs in a FairScheduler (weighted fair queuing across
+    the payload's priority class and `tenant`; FIFO for a single tenant) and
+    delayed jobs (`visible_after` in the future) in a heap ordered by visibility
+    time. Reserving promotes only the delayed jobs that are due, so its cost
+    does not grow with the backlog: O(log n) per reserved or promoted job.
+
+    Thread-safe; `reserve(timeout=...)` blocks on a condition variable until a
+    job is enqueued or becomes visible.
     """
     def __init__(self):
-        self.queues: Dict[str, List[QueueJob]] = {}
+        self._ready: Dict[str, FairScheduler] = {}
+        self._delayed: Dict[str, List[Tuple[float, int, QueueJob]]] = {}
+        self._order = itertools.count()  # heap tie-breaker: FIFO among equal times
         self.dlq: List[QueueJob] = []
         self.reserved: Dict[str, QueueJob] = {} # job_id -> job
+        self._cond = threading.Condition(threading.RLock())
+
+    @property
+    def queues(self) -> Dict[str, List[QueueJob]]:
+        """Snapshot of queued jobs per queue: ready jobs in order, then delayed jobs by visibility."""
+        with self._cond:
+            names = set(self._ready) | set(self._delayed)
+            return {
+                name: (self._ready[name].items() if name in self._ready else [])
+                + [job for _, _, job in sorted(self._delayed.get(name, []))]
+                for name in names
+            }
 
     def enqueue(self, queue_name: str, job: Dict[str, Any]) -> str:
-        if queue_name not in self.queues:
-            self.queues[queue_name] = []
-            
+        with self._cond:
+            job_id = self._enqueue_one(queue_name, job)
+            self._cond.notify()
+            return job_id
+
+    def enqueue_many(self, queue_name: str, jobs: List[Dict[str, Any]]) -> List[str]:
+        with self._cond:
+            job_ids = [self._enqueue_one(queue_name, job) for job in jobs]
+            self._cond.notify_all()
+            return job_ids
+
+    def _enqueue_one(self, queue_name: str, job: Dict[str, Any]) -> str:
         job_id = job.get("id") or str(uuid.uuid4())
         # Ensure it matches our model structure
-        q_job = QueueJob(
+        self._push(QueueJob(
             id=job_id,
             queue=queue_name,
             payload=job.get("payload", job), # Handle if job is already payload or full dict
             created_at=datetime.now(),
             attempts=job.get("attempts", 0),
             visible_after=job.get("visible_after")
-        )
-        
-        self.queues[queue_name].append(q_job)
+        ))
         return job_id
 
-    def reserve(self, queue_name: str, timeout: Optional[int] = 0) -> Optional[Dict[str, Any]]:
-        if queue_name not in self.queues:
+    def _push(self, job: QueueJob) -> None:
+        if job.visible_after and job.visible_after > datetime.now():
+            heapq.heappush(self._delayed.setdefault(job.queue, []), (job.visible_after.timestamp(), next(self._order), job))
+        else:
+            self._scheduler(job.queue).push(job, *job_flow(job.payload))
+
+    def _scheduler(self, queue_name: str) -> FairScheduler:
+        if queue_name not in self._ready:
+            self._ready[queue_name] = FairScheduler()
+        return self._ready[queue_name]
+
+    def reserve(self, queue_name: str, timeout: Optional[float] = 0, priorities: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + (timeout or 0)
+        with self._cond:
+            while True:
+                job = self._reserve_visible(queue_name, priorities)
+                remaining = deadline - time.monotonic()
+                if job or remaining <= 0:
+                    return job
+                # Sleep until notified, or until the next delayed job becomes visible
+                next_visible = self._next_visible_in(queue_name)
+                self._cond.wait(min(remaining, next_visible) if next_visible is not None else remaining)
+
+    def reserve_many(
+        self,
+        queue_name: str,
+        max_n: int,
+        timeout: Optional[float] = 0,
+        priorities: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        with self._cond:
+            first = self.reserve(queue_name, timeout=timeout, priorities=priorities)
+            if not first:
+                return []
+            jobs = [first]
+            while len(jobs) < max_n:
+                job = self._reserve_visible(queue_name, priorities)
+                if not job:
+                    break
+                jobs.append(job)
+            return jobs
+
+    def ack_many(self, queue_name: str, job_ids: List[str]) -> None:
+        with self._cond:
+            for job_id in job_ids:
+                self.reserved.pop(job_id, None)
+
+    def _reserve_visible(self, queue_name: str, priorities: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        self._promote_due(queue_name)
+        ready = self._ready.get(queue_name)
+        job = ready.pop(priorities) if ready else None
+        if job is None:
             return None
-            
+        job.attempts += 1
+        self.reserved[job.id] = job
+
+        # Return dict representation
+        data = job.model_dump()
+        data["enqueued_at"] = (job.visible_after or job.created_at).timestamp()
+        return data
+
+    def _promote_due(self, queue_name: str) -> None:
+        delayed = self._delayed.get(queue_name)
+        if not delayed:
+            return
         now = datetime.now()
-        
-        # Find first visible job
-        for i, job in enumerate(self.queues[queue_name]):
-            if job.visible_after and job.visible_after > now:
-                continue
-                
-            # Found one
-            self.queues[queue_name].pop(i)
-            job.attempts += 1
-            self.reserved[job.id] = job
-            
-            # Return dict representation
-            return job.model_dump()
-            
-        return None
+        # Checks the job itself (not just the heap key) so a visibility cleared in place is honored
+        while delayed and (delayed[0][2].visible_after is None or delayed[0][2].visible_after <= now):
+            _, _, job = heapq.heappop(delayed)
+            self._scheduler(queue_name).push(job, *job_flow(job.payload))
+
+    def _next_visible_in(self, queue_name: str) -> Optional[float]:
+        delayed = self._delayed.get(queue_name)
+        if not delayed:
+            return None
+        return max(0.0, delayed[0][0] - time.time())
 
     def ack(self, queue_name: str, job_id: str) -> None:
-        if job_id in self.reserved:
-            del self.reserved[job_id]
+        with self._cond:
+            if job_id in self.reserved:
+                del self.reserved[job_id]
 
     def fail(self, queue_name: str, job_id: str, reason: Optional[str] = None) -> None:
-        if job_id in self.reserved:
-            job = self.reserved.pop(job_id)
-            self.dlq.append(job)
+        with self._cond:
+            if job_id in self.reserved:
+                job = self.reserved.pop(job_id)
+                self.dlq.append(job)
 
     def requeue(self, queue_name: str, job: Dict[str, Any], delay_seconds: Optional[int] = 0) -> str:
-        # If it was reserved, remove from reserved
-        job_id = job.get("id")
-        if job_id and job_id in self.reserved:
-            del self.reserved[job_id]
-            
-        # Update visibility
-        visible_after = None
-        if delay_seconds:
-            visible_after = datetime.now() + timedelta(seconds=delay_seconds)
-            
-        # Add back to queue
-        if queue_name not in self.queues:
-            self.queues[queue_name] = []
-            
-        q_job = QueueJob(
-            id=job_id or str(uuid.uuid4()),
-            queue=queue_name,
-            payload=job.get("payload", job),
-            created_at=datetime.now(),
-            attempts=job.get("attempts", 0),
-            visible_after=visible_after
-        )
-        self.queues[queue_name].append(q_job)
-        return q_job.id
+        with self._cond:
+            # If it was reserved, remove from reserved
+            job_id = job.get("id")
+            if job_id and job_id in self.reserved:
+                del self.reserved[job_id]
+
+            # Update visibility
+            visible_after = None
+            if delay_seconds:
+                visible_after = datetime.now() + timedelta(seconds=delay_seconds)
+
+            q_job = QueueJob(
+                id=job_id or str(uuid.uuid4()),
+                queue=queue_name,
+                payload=job.get("payload", job),
+                created_at=datetime.now(),
+                attempts=job.get("attempts", 0),
+                visible_after=visible_after
+            )
+            self._push(q_job)
+            self._cond.notify()
+            return q_job.id
 
     def inspect_queue_length(self, queue_name: str) -> int:
-        return len(self.queues.get(queue_name, []))
+        with self._cond:
+            return len(self._ready.get(queue_name, ())) + len(self._delayed.get(queue_name, ()))
+
+    def oldest_job_age(self, queue_name: str) -> Optional[float]:
+        with self._cond:
+            self._promote_due(queue_name)
+            ready = self._ready.get(queue_name)
+            return ready.oldest_wait() if ready else 0.0
+
+    def scheduling_stats(self, queue_name: str) -> Dict[str, Any]:
+        """Per-priority depth/oldest wait and tenant fairness (see FairScheduler.stats)."""
+        with self._cond:
+            return self._scheduler(queue_name).stats()
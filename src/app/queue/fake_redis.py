@@ -0,0 +1,275 @@
+import json
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.app.queue import redis_adapter
+from src.app.security import redis_rate_limiter
+from src.app.security.rate_limiter import gcra
+
+class FakeRedis:
+    """
+    In-process fake of the Redis commands used by RedisAdapter,
+    RedisRateLimiter and RedisSessionStore (strings, lists, sorted sets, hashes, pipelines, and their Lua
+    scripts).
+
+    Lua scripts are not interpreted: `register_script` maps each known script
+    source to an equivalent Python implementation. Blocking list commands wait
+    on a condition so pushes from other threads wake them up.
+    """
+    def __init__(self):
+        self.lists: Dict[str, List[Any]] = {}
+        self.zsets: Dict[str, Dict[Any, float]] = {}
+        self.strings: Dict[str, Any] = {}
+        self.hashes: Dict[str, Dict[str, Any]] = {}
+        self.script_calls = 0
+        self._cond = threading.Condition(threading.RLock())
+        self._script_impls: Dict[str, Callable[[List[str], List[Any]], Any]] = {
+            redis_adapter.RESERVE_LUA: self._reserve_script,
+            redis_adapter.REAP_LEASES_LUA: self._reap_script,
+            redis_adapter.PROMOTE_DELAYED_LUA: self._promote_script,
+            redis_rate_limiter.GCRA_LUA: self._gcra_script,
+        }
+
+    # --- Strings (expiry is not simulated) -------------------------------------
+    def get(self, name: str) -> Optional[Any]:
+        return self.strings.get(name)
+
+    def set(self, name: str, value: Any, ex: Optional[int] = None, px: Optional[int] = None) -> bool:
+        with self._cond:
+            self.strings[name] = value
+            return True
+
+    def getdel(self, name: str) -> Optional[Any]:
+        with self._cond:
+            return self.strings.pop(name, None)
+
+    def delete(self, *names: str) -> int:
+        with self._cond:
+            return sum(self.strings.pop(name, None) is not None for name in names)
+
+    def expire(self, name: str, seconds: int) -> bool:
+        return name in self.strings
+
+    # --- Lists (index 0 = left) -----------------------------------------------
+    def lpush(self, name: str, *values: Any) -> int:
+        with self._cond:
+            items = self.lists.setdefault(name, [])
+            for value in values:
+                items.insert(0, value)
+            self._cond.notify_all()
+            return len(items)
+
+    def rpush(self, name: str, *values: Any) -> int:
+        with self._cond:
+            items = self.lists.setdefault(name, [])
+            items.extend(values)
+            self._cond.notify_all()
+            return len(items)
+
+    def lmove(self, first_list: str, second_list: str, src: str = "LEFT", dest: str = "RIGHT") -> Optional[Any]:
+        with self._cond:
+            items = self.lists.get(first_list)
+            if not items:
+                return None
+            value = items.pop() if src == "RIGHT" else items.pop(0)
+            target = self.lists.setdefault(second_list, [])
+            if dest == "LEFT":
+                target.insert(0, value)
+            else:
+                target.append(value)
+            self._cond.notify_all()
+            return value
+
+    def blmove(self, first_list: str, second_list: str, timeout: float, src: str = "LEFT", dest: str = "RIGHT") -> Optional[Any]:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                value = self.lmove(first_list, second_list, src=src, dest=dest)
+                remaining = deadline - time.monotonic()
+                if value is not None or remaining <= 0:
+                    return value
+                self._cond.wait(remaining)
+
+    def blmpop(self, timeout: float, numkeys: int, *keys: str, direction: str = "LEFT", count: int = 1) -> Optional[List[Any]]:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                for name in keys[:numkeys]:
+                    items = self.lists.get(name)
+                    if items:
+                        popped = [items.pop(0) if direction == "LEFT" else items.pop() for _ in range(min(count, len(items)))]
+                        return [name, popped]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def ltrim(self, name: str, start: int, end: int) -> bool:
+        with self._cond:
+            self.lists[name] = self.lrange(name, start, end)
+            return True
+
+    def lrem(self, name: str, count: int, value: Any) -> int:
+        with self._cond:
+            items = self.lists.get(name, [])
+            removed = 0
+            while value in items and (count == 0 or removed < count):
+                items.remove(value)
+                removed += 1
+            return removed
+
+    def llen(self, name: str) -> int:
+        return len(self.lists.get(name, []))
+
+    def lindex(self, name: str, index: int) -> Optional[Any]:
+        items = self.lists.get(name, [])
+        return items[index] if -len(items) <= index < len(items) else None
+
+    def lrange(self, name: str, start: int, end: int) -> List[Any]:
+        items = self.lists.get(name, [])
+        return items[start:] if end == -1 else items[start:end + 1]
+
+    # --- Sorted sets ------------------------------------------------------------
+    def zadd(self, name: str, mapping: Dict[Any, float], xx: bool = False, ch: bool = False) -> int:
+        with self._cond:
+            zset = self.zsets.setdefault(name, {})
+            if xx:
+                mapping = {member: score for member, score in mapping.items() if member in zset}
+            added = sum(1 for member in mapping if member not in zset)
+            changed = sum(1 for member, score in mapping.items() if zset.get(member) != score)
+            zset.update(mapping)
+            return changed if ch else added
+
+    def zrem(self, name: str, *members: Any) -> int:
+        with self._cond:
+            zset = self.zsets.get(name, {})
+            return sum(1 for member in members if zset.pop(member, None) is not None)
+
+    def zrangebyscore(self, name: str, min: float, max: float, start: Optional[int] = None, num: Optional[int] = None) -> List[Any]:
+        with self._cond:
+            members = sorted(
+                ((score, member) for member, score in self.zsets.get(name, {}).items() if min <= score <= max),
+                key=lambda item: item[0]
+            )
+            result = [member for _, member in members]
+            if start is not None and num is not None:
+                result = result[start:start + num]
+            return result
+
+    def zcard(self, name: str) -> int:
+        return len(self.zsets.get(name, {}))
+
+    # --- Hashes -------------------------------------------------------------------
+    def hincrby(self, name: str, key: str, amount: int = 1) -> int:
+        with self._cond:
+            fields = self.hashes.setdefault(name, {})
+            fields[key] = int(fields.get(key, 0)) + amount
+            return fields[key]
+
+    def hget(self, name: str, key: str) -> Optional[Any]:
+        return self.hashes.get(name, {}).get(key)
+
+    def hdel(self, name: str, *keys: str) -> int:
+        with self._cond:
+            fields = self.hashes.get(name, {})
+            return sum(fields.pop(key, None) is not None for key in keys)
+
+    # --- Pipelines and scripts --------------------------------------------------
+    def pipeline(self, transaction: bool = True) -> "FakeRedisPipeline":
+        return FakeRedisPipeline(self)
+
+    def register_script(self, source: str) -> Callable[..., Any]:
+        impl = self._script_impls[source]
+
+        def run(keys: Optional[List[str]] = None, args: Optional[List[Any]] = None, client: Any = None) -> Any:
+            with self._cond:
+                self.script_calls += 1
+                return impl(keys or [], args or [])
+        return run
+
+    def _push_ready(self, prefix: str, default_priority: str, raw: Any, head: bool) -> None:
+        ready = prefix + (json.loads(raw).get("priority") or default_priority)
+        (self.rpush if head else self.lpush)(ready, raw)
+        self._set_wake(f"{ready}:wake")
+
+    def _set_wake(self, wake: str) -> None:
+        self.rpush(wake, 1)
+        self.ltrim(wake, 0, 0)
+
+    def _reserve_script(self, keys: List[str], args: List[Any]) -> List[Any]:
+        processing, leases, attempts, *classes = keys
+        ready, wakes = classes[:len(classes) // 2], classes[len(classes) // 2:]
+        max_jobs, deadline, worker_id = int(args[0]), float(args[1]), args[2]
+        jobs = []
+        for _ in range(max_jobs):
+            for key in ready:
+                raw = self.lmove(key, processing, src="RIGHT", dest="LEFT")
+                if raw is not None:
+                    break
+            else:
+                break
+            self.zadd(leases, {f"{worker_id}|{raw}": deadline})
+            jobs.extend([raw, self.hincrby(attempts, json.loads(raw)["id"])])
+        for key, wake in zip(ready, wakes):
+            if self.llen(key):
+                self._set_wake(wake)
+            else:
+                self.lists.pop(wake, None)
+        return jobs
+
+    def _reap_script(self, keys: List[str], args: List[Any]) -> List[int]:
+        leases, attempts, dlq = keys
+        now, limit, prefix, max_attempts = float(args[0]), int(args[1]), args[2], int(args[3])
+        ready_prefix, default_priority = args[4], args[5]
+        expired = self.zrangebyscore(leases, float("-inf"), now, start=0, num=limit)
+        dead = 0
+        for member in expired:
+            worker_id, _, raw = member.partition("|")
+            self.lrem(prefix + worker_id, 1, raw)
+            self.zrem(leases, member)
+            job_id = json.loads(raw)["id"]
+            if max_attempts > 0 and int(self.hget(attempts, job_id) or 0) >= max_attempts:
+                self.hdel(attempts, job_id)
+                self.lpush(dlq, raw)
+                dead += 1
+            else:
+                self._push_ready(ready_prefix, default_priority, raw, head=True)
+        return [len(expired), dead]
+
+    def _promote_script(self, keys: List[str], args: List[Any]) -> int:
+        (delayed,) = keys
+        now, limit, ready_prefix, default_priority = float(args[0]), int(args[1]), args[2], args[3]
+        due = self.zrangebyscore(delayed, float("-inf"), now, start=0, num=limit)
+        for raw in due:
+            self._push_ready(ready_prefix, default_priority, raw, head=False)
+        if due:
+            self.zrem(delayed, *due)
+        return len(due)
+
+    def _gcra_script(self, keys: List[str], args: List[Any]) -> List[Any]:
+        now, interval, period, requested = float(args[0]), float(args[1]), float(args[2]), int(args[3])
+        stored = self.strings.get(keys[0])
+        granted, tat, remaining, retry_after = gcra(float(stored) if stored is not None else None, now, interval, period, requested)
+        if granted:
+            self.strings[keys[0]] = str(tat)
+        return [granted, remaining, str(tat), str(retry_after)]
+
+class FakeRedisPipeline:
+    """
+    Buffers FakeRedis commands and runs them on execute(), like a redis-py pipeline.
+    """
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self) -> List[Any]:
+        with self.redis._cond:
+            results = [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
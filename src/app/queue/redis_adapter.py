@@ -1,19 +1,162 @@
+import os
 import json
 import uuid
 import time
-from typing import Optional, Dict, Any
+import socket
+from typing import Optional, Dict, Any, List, Sequence, Callable, Union
 from src.app.queue.adapter import QueueAdapter
+from src.app.queue.scheduling import PRIORITY_WEIGHTS, DEFAULT_PRIORITY, job_flow
+
+# Ready jobs are kept in one list per priority class, "<ready prefix><priority>",
+# each with a wake list "<ready list>:wake" that holds a single token while the
+# class has jobs, so idle workers can block on the classes they may take.
+# Pushing a job to a ready list from a script goes through this snippet.
+PUSH_READY_LUA = """
+local function push_ready(prefix, default_priority, raw, head)
+    local ready = prefix .. (cjson.decode(raw)['priority'] or default_priority)
+    redis.call(head and 'RPUSH' or 'LPUSH', ready, raw)
+    redis.call('RPUSH', ready .. ':wake', 1)
+    redis.call('LTRIM', ready .. ':wake', 0, 0)
+end
+"""
+
+# Moves up to ARGV[2] due jobs from the delayed ZSET to their ready lists in one step.
+# KEYS[1] = delayed zset; ARGV[1] = now, ARGV[2] = limit, ARGV[3] = ready prefix, ARGV[4] = default priority
+PROMOTE_DELAYED_LUA = PUSH_READY_LUA + """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, raw in ipairs(due) do
+    push_ready(ARGV[3], ARGV[4], raw, false)
+end
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return #due
+"""
+
+# Returns up to ARGV[2] jobs whose lease expired to the head of their ready list.
+# Lease members are "<worker_id>|<raw job>"; the job is also removed from that
+# worker's processing list (ARGV[3] .. worker_id). A job that has already been
+# delivered ARGV[4] times (e.g. it crashes its worker) goes to the DLQ instead.
+# KEYS[1] = leases zset, KEYS[2] = attempts hash, KEYS[3] = dlq
+# ARGV[1] = now, ARGV[2] = limit, ARGV[3] = processing prefix, ARGV[4] = max attempts (0 = unlimited),
+# ARGV[5] = ready prefix, ARGV[6] = default priority
+# Returns {reaped, dead-lettered}
+REAP_LEASES_LUA = PUSH_READY_LUA + """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+local max_attempts = tonumber(ARGV[4])
+local dead = 0
+for _, member in ipairs(expired) do
+    local sep = string.find(member, '|', 1, true)
+    local raw = string.sub(member, sep + 1)
+    redis.call('LREM', ARGV[3] .. string.sub(member, 1, sep - 1), 1, raw)
+    redis.call('ZREM', KEYS[1], member)
+    local id = cjson.decode(raw)['id']
+    local attempts = tonumber(redis.call('HGET', KEYS[2], id) or '0')
+    if max_attempts > 0 and attempts >= max_attempts then
+        redis.call('HDEL', KEYS[2], id)
+        redis.call('LPUSH', KEYS[3], raw)
+        dead = dead + 1
+    else
+        push_ready(ARGV[5], ARGV[6], raw, true)
+    end
+end
+return {#expired, dead}
+"""
+
+# Atomically moves up to ARGV[1] jobs to the processing list, taking each from
+# the first non-empty ready list (highest priority first), leases them and
+# counts the delivery in the attempts hash (keyed by job id). Afterwards each
+# ready list's wake token is set or cleared to match whether it still has jobs.
+# KEYS[1] = processing list, KEYS[2] = leases zset, KEYS[3] = attempts hash,
+# KEYS[4..3+n] = ready lists in priority order, KEYS[4+n..3+2n] = their wake lists
+# ARGV[1] = max jobs, ARGV[2] = lease deadline, ARGV[3] = worker_id
+# Returns {raw1, attempts1, raw2, attempts2, ...}
+RESERVE_LUA = """
+local n = (#KEYS - 3) / 2
+local jobs = {}
+for i = 1, tonumber(ARGV[1]) do
+    local raw = false
+    for c = 1, n do
+        raw = redis.call('LMOVE', KEYS[3 + c], KEYS[1], 'RIGHT', 'LEFT')
+        if raw then break end
+    end
+    if not raw then break end
+    redis.call('ZADD', KEYS[2], ARGV[2], ARGV[3] .. '|' .. raw)
+    jobs[#jobs + 1] = raw
+    jobs[#jobs + 1] = redis.call('HINCRBY', KEYS[3], cjson.decode(raw)['id'], 1)
+end
+for c = 1, n do
+    if redis.call('LLEN', KEYS[3 + c]) > 0 then
+        redis.call('RPUSH', KEYS[3 + n + c], 1)
+        redis.call('LTRIM', KEYS[3 + n + c], 0, 0)
+    else
+        redis.call('DEL', KEYS[3 + n + c])
+    end
+end
+return jobs
+"""
+
+# Values per LPUSH in enqueue_many (keeps single commands reasonably sized)
+ENQUEUE_CHUNK_SIZE = 1000
+
+Raw = Union[str, bytes]
 
 class RedisAdapter(QueueAdapter):
     """
-    Redis-backed queue adapter.
-    Uses lists for queues and sorted sets for delayed/scheduled jobs.
-    
-    NOTE: This is a simplified implementation. Production systems might use 
-    Redis Streams or a library like RQ/Celery/Bull.
+    Redis-backed queue adapter with at-least-once delivery.
+
+    Keys (per queue):
+        queue:{name}:{priority}              ready list per priority class (LPUSH in, take from the right)
+        queue:{name}:{priority}:wake         one token while that ready list has jobs
+        queue:{name}:processing:{worker_id}  jobs reserved by one worker
+        queue:{name}:leases                  ZSET of "<worker_id>|<job>" scored by lease deadline
+        queue:{name}:delayed                 ZSET of backoff/scheduled jobs scored by due time
+        queue:{name}:attempts                HASH of job id -> deliveries so far
+        queue:{name}:dlq                     failed jobs
+
+    Jobs are routed to the ready list of their priority class (see
+    queue.scheduling.job_flow; the class is stored on the job as `priority`).
+    A reserve takes from the highest non-empty class first, restricted to
+    `priorities` when given, and blocks on the wake lists of those classes
+    (BLMPOP, Redis >= 7) when they are all empty. Unlike FakeQueue's weighted
+    fair queue, classes are served in strict priority order and tenants FIFO
+    within a class; `scheduling_stats` reports depth and oldest wait per class.
+
+    Reserving is one Lua script (move + lease), so a crash never leaves a job
+    reserved without a lease. Reserved jobs stay in the worker's processing list
+    and hold a lease of `visibility_timeout` seconds until acked, failed or requeued. `run_maintenance`
+    (called periodically by WorkerRunner) re-queues expired leases, e.g. from a
+    crashed worker, and promotes due delayed jobs; both are Lua scripts so they
+    are atomic and move jobs in bulk.
+
+    Every delivery increments the job's `attempts` (returned on the job), so
+    retries reach `max_attempts` and the DLQ. A job whose lease expires after
+    its last attempt (a poison job that keeps crashing its worker) is moved to
+    the DLQ by the reaper instead of being redelivered. Long-running jobs keep
+    their lease with `extend_leases`.
+
+    NOTE: Keys are built inside the scripts, so this is not Redis Cluster safe
+    without hash tags in queue names.
     """
-    def __init__(self, redis_url: Optional[str] = None, client=None):
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        client=None,
+        worker_id: Optional[str] = None,
+        visibility_timeout: int = 600,
+        maintenance_batch: int = 1000,
+        max_attempts: int = 3,
+        clock: Callable[[], float] = time.time
+    ):
         self.client = client
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.maintenance_batch = maintenance_batch
+        self._clock = clock
+        # job_id -> raw payload of jobs reserved by this adapter, needed to LREM them
+        self._reserved: Dict[str, Raw] = {}
+        self._scripts: Dict[str, Any] = {}
         if not self.client and redis_url:
             # Safe import
             try:
@@ -26,47 +169,219 @@ class RedisAdapter(QueueAdapter):
         if not self.client:
             raise RuntimeError("Redis client not initialized. Install 'redis' package or inject a client.")
 
+    def _script(self, source: str):
+        if source not in self._scripts:
+            self._scripts[source] = self.client.register_script(source)
+        return self._scripts[source]
+
+    def _processing_key(self, queue_name: str) -> str:
+        return f"queue:{queue_name}:processing:{self.worker_id}"
+
+    def _ready_keys(self, queue_name: str, priorities: Optional[Sequence[str]] = None) -> List[str]:
+        """Ready lists of the given priority classes (default: all), highest first."""
+        return [f"queue:{queue_name}:{p}" for p in PRIORITY_WEIGHTS if priorities is None or p in priorities]
+
+    def _push_ready(self, pipe: Any, queue_name: str, jobs: List[Dict[str, Any]]) -> None:
+        """Queue LPUSHes of `jobs` onto their class ready lists and set the wake tokens."""
+        by_class: Dict[str, List[str]] = {}
+        for job in jobs:
+            job["priority"] = job_flow(job.get("payload", job))[0]
+            by_class.setdefault(job["priority"], []).append(json.dumps(job))
+        for priority, raws in by_class.items():
+            ready = f"queue:{queue_name}:{priority}"
+            # One variadic LPUSH per chunk keeps single commands reasonably sized
+            for start in range(0, len(raws), ENQUEUE_CHUNK_SIZE):
+                pipe.lpush(ready, *raws[start:start + ENQUEUE_CHUNK_SIZE])
+            pipe.rpush(f"{ready}:wake", 1)
+            pipe.ltrim(f"{ready}:wake", 0, 0)
+
+    def _lease_member(self, raw: Raw) -> Raw:
+        if isinstance(raw, bytes):
+            return self.worker_id.encode() + b"|" + raw
+        return f"{self.worker_id}|{raw}"
+
+    def _track(self, reply: List[Any]) -> List[Dict[str, Any]]:
+        """Jobs from a RESERVE_LUA reply of (raw, attempts) pairs."""
+        jobs = []
+        for raw, attempts in zip(reply[::2], reply[1::2]):
+            job = json.loads(raw)
+            job["attempts"] = int(attempts)
+            self._reserved[job["id"]] = raw
+            jobs.append(job)
+        return jobs
+
     def enqueue(self, queue_name: str, job: Dict[str, Any]) -> str:
         self._check_client()
         job_id = job.get("id") or str(uuid.uuid4())
         job["id"] = job_id
-        # LPUSH to list
-        self.client.lpush(f"queue:{queue_name}", json.dumps(job))
+        job["enqueued_at"] = self._clock()
+        pipe = self.client.pipeline()
+        self._push_ready(pipe, queue_name, [job])
+        pipe.execute()
         return job_id
 
-    def reserve(self, queue_name: str, timeout: Optional[int] = 0) -> Optional[Dict[str, Any]]:
+    def enqueue_many(self, queue_name: str, jobs: List[Dict[str, Any]]) -> List[str]:
         self._check_client()
-        # RPOP from list
-        # In a real system, we'd use RPOPLPUSH to a processing queue for safety
-        raw = self.client.rpop(f"queue:{queue_name}")
-        if raw:
-            return json.loads(raw)
-        return None
+        if not jobs:
+            return []
+        now = self._clock()
+        for job in jobs:
+            job["id"] = job.get("id") or str(uuid.uuid4())
+            job["enqueued_at"] = now
+        # All chunks go in a single pipeline round trip. Workers take from the
+        # right, so jobs of a class are still served in list order.
+        pipe = self.client.pipeline()
+        self._push_ready(pipe, queue_name, jobs)
+        pipe.execute()
+        return [job["id"] for job in jobs]
+
+    def reserve(self, queue_name: str, timeout: Optional[float] = 0) -> Optional[Dict[str, Any]]:
+        jobs = self.reserve_many(queue_name, 1, timeout=timeout)
+        return jobs[0] if jobs else None
+
+    def reserve_many(self, queue_name: str, max_n: int, timeout: Optional[float] = 0, priorities: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        self._check_client()
+        ready = self._ready_keys(queue_name, priorities)
+        if not ready:
+            return []
+        wakes = [f"{key}:wake" for key in ready]
+        keys = [self._processing_key(queue_name), f"queue:{queue_name}:leases", f"queue:{queue_name}:attempts", *ready, *wakes]
+        deadline = time.monotonic() + (timeout or 0)
+        while True:
+            raws = self._script(RESERVE_LUA)(
+                keys=keys,
+                args=[max_n, self._clock() + self.visibility_timeout, self.worker_id]
+            )
+            remaining = deadline - time.monotonic()
+            if raws or remaining <= 0:
+                return self._track(raws or [])
+            # Block server-side until one of the classes has jobs. Only the wake
+            # token is consumed; the job is then reserved and leased atomically
+            # by the script above (another worker may win), which also restores
+            # the token while jobs are left.
+            if not self.client.blmpop(remaining, len(wakes), *wakes, direction="LEFT"):
+                return []
 
     def ack(self, queue_name: str, job_id: str) -> None:
+        self.ack_many(queue_name, [job_id])
+
+    def ack_many(self, queue_name: str, job_ids: List[str]) -> None:
         self._check_client()
-        # If using RPOPLPUSH, we would LREM from the processing queue here.
-        pass
+        job_ids = [job_id for job_id in job_ids if job_id in self._reserved]
+        if not job_ids:
+            return
+        pipe = self.client.pipeline()
+        self._release(pipe, queue_name, [self._reserved.pop(job_id) for job_id in job_ids])
+        pipe.hdel(f"queue:{queue_name}:attempts", *job_ids)
+        pipe.execute()
+
+    def _release(self, pipe: Any, queue_name: str, raws: List[Raw]) -> None:
+        for raw in raws:
+            pipe.lrem(self._processing_key(queue_name), 1, raw)
+        pipe.zrem(f"queue:{queue_name}:leases", *[self._lease_member(raw) for raw in raws])
+
+    def extend_leases(self, queue_name: str, job_ids: List[str]) -> int:
+        """
+        Push the lease deadline of jobs this adapter still holds `visibility_timeout`
+        seconds out, so a job that runs longer than that is not redelivered.
+        Returns how many leases were extended (an already-reaped lease is not revived).
+        """
+        self._check_client()
+        members = [self._lease_member(self._reserved[job_id]) for job_id in job_ids if job_id in self._reserved]
+        if not members:
+            return 0
+        deadline = self._clock() + self.visibility_timeout
+        return self.client.zadd(f"queue:{queue_name}:leases", {member: deadline for member in members}, xx=True, ch=True)
 
     def fail(self, queue_name: str, job_id: str, reason: Optional[str] = None) -> None:
         self._check_client()
         # Move to DLQ
-        # We assume the job payload isn't readily available here in this simple RPOP model
-        # unless passed in. But the interface assumes we know the ID.
-        # For this simple adapter, we might need the full job to move it.
-        # If we can't move it, we just log.
-        pass
+        raw = self._reserved.pop(job_id, None)
+        if raw is not None:
+            pipe = self.client.pipeline()
+            self._release(pipe, queue_name, [raw])
+            pipe.hdel(f"queue:{queue_name}:attempts", job_id)
+            pipe.lpush(f"queue:{queue_name}:dlq", raw)
+            pipe.execute()
 
     def requeue(self, queue_name: str, job: Dict[str, Any], delay_seconds: Optional[int] = 0) -> str:
         self._check_client()
+        job.setdefault("id", str(uuid.uuid4()))
+        raw = self._reserved.pop(job["id"], None)
+        # Release the reservation and schedule the retry in one round trip
+        pipe = self.client.pipeline()
+        if raw is not None:
+            self._release(pipe, queue_name, [raw])
+        job["enqueued_at"] = self._clock() + (delay_seconds or 0)
         if delay_seconds and delay_seconds > 0:
-            # ZADD to delayed set
-            score = time.time() + delay_seconds
-            self.client.zadd(f"queue:{queue_name}:delayed", {json.dumps(job): score})
+            # ZADD to delayed set; run_maintenance promotes it once due
+            pipe.zadd(f"queue:{queue_name}:delayed", {json.dumps(job): job["enqueued_at"]})
         else:
-            self.enqueue(queue_name, job)
+            self._push_ready(pipe, queue_name, [job])
+        pipe.execute()
         return job["id"]
 
+    def defer(self, queue_name: str, job: Dict[str, Any], delay_seconds: Optional[int] = 0) -> str:
+        self._check_client()
+        # Deliveries are counted in the attempts hash, so take this one back
+        self.client.hincrby(f"queue:{queue_name}:attempts", job["id"], -1)
+        return self.requeue(queue_name, job, delay_seconds)
+
+    def run_maintenance(self, queue_name: str) -> Dict[str, int]:
+        """
+        Re-queue jobs whose lease expired (dead-lettering those out of attempts)
+        and promote due delayed jobs. Safe to call from every worker concurrently.
+        """
+        self._check_client()
+        now = self._clock()
+        ready_prefix = f"queue:{queue_name}:"
+        reaped, dead_lettered = self._script(REAP_LEASES_LUA)(
+            keys=[f"queue:{queue_name}:leases", f"queue:{queue_name}:attempts", f"queue:{queue_name}:dlq"],
+            args=[now, self.maintenance_batch, f"queue:{queue_name}:processing:", self.max_attempts, ready_prefix, DEFAULT_PRIORITY]
+        )
+        promoted = self._script(PROMOTE_DELAYED_LUA)(
+            keys=[f"queue:{queue_name}:delayed"],
+            args=[now, self.maintenance_batch, ready_prefix, DEFAULT_PRIORITY]
+        )
+        return {"reaped": int(reaped), "promoted": int(promoted), "dead_lettered": int(dead_lettered)}
+
     def inspect_queue_length(self, queue_name: str) -> int:
         self._check_client()
-        return self.client.llen(f"queue:{queue_name}")
+        return sum(self._class_lengths(queue_name).values())
+
+    def oldest_job_age(self, queue_name: str) -> Optional[float]:
+        self._check_client()
+        ages = list(self._oldest_waits(queue_name).values())
+        if any(age is None for age in ages):
+            return None
+        return max(ages, default=0.0)
+
+    def scheduling_stats(self, queue_name: str) -> Dict[str, Any]:
+        """
+        Snapshot for metrics: depth and oldest wait per priority class (the
+        starvation signal). Tenant fairness is not tracked by this backend.
+        """
+        self._check_client()
+        return {
+            "depth": self._class_lengths(queue_name),
+            "oldest_wait_seconds": {p: age or 0.0 for p, age in self._oldest_waits(queue_name).items()},
+        }
+
+    def _class_lengths(self, queue_name: str) -> Dict[str, int]:
+        pipe = self.client.pipeline()
+        for key in self._ready_keys(queue_name):
+            pipe.llen(key)
+        return dict(zip(PRIORITY_WEIGHTS, (int(n) for n in pipe.execute())))
+
+    def _oldest_waits(self, queue_name: str) -> Dict[str, Optional[float]]:
+        """Wait of the oldest ready job per class (0.0 when empty, None when it has no enqueued_at)."""
+        # Workers take from the right, so each list's tail is its oldest job
+        pipe = self.client.pipeline()
+        for key in self._ready_keys(queue_name):
+            pipe.lindex(key, -1)
+        now = self._clock()
+        waits: Dict[str, Optional[float]] = {}
+        for priority, raw in zip(PRIORITY_WEIGHTS, pipe.execute()):
+            enqueued_at = json.loads(raw).get("enqueued_at") if raw is not None else now
+            waits[priority] = max(0.0, now - enqueued_at) if enqueued_at is not None else None
+        return waits
@@ -0,0 +1,120 @@
+import heapq
+import itertools
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Priority classes, highest first, and their fair-share weights
+PRIORITY_WEIGHTS: Dict[str, int] = {
+    "interactive": 8,
+    "standard": 4,
+    "batch": 1,
+}
+DEFAULT_PRIORITY = "standard"
+DEFAULT_TENANT = "default"
+
+# Client.plan -> priority class
+PLAN_PRIORITIES: Dict[str, str] = {
+    "premium": "interactive",
+    "enterprise": "interactive",
+    "standard": "standard",
+    "free": "batch",
+}
+
+def priority_for_plan(plan: Optional[str]) -> str:
+    """Map a Client.plan to its priority class (unknown plans get the default)."""
+    return PLAN_PRIORITIES.get((plan or "").lower(), DEFAULT_PRIORITY)
+
+def job_flow(payload: Dict[str, Any]) -> Tuple[str, str]:
+    """(priority, tenant) of a job payload; missing or unknown values fall back to the defaults."""
+    priority = payload.get("priority")
+    if priority not in PRIORITY_WEIGHTS:
+        priority = DEFAULT_PRIORITY
+    return priority, str(payload.get("tenant") or DEFAULT_TENANT)
+
+class FairScheduler:
+    """
+    Weighted fair queue across (priority, tenant) flows (start-time fair queuing).
+
+    Every item gets a virtual finish tag when pushed:
+        start  = max(virtual_time, last finish tag of its flow)
+        finish = start + 1 / PRIORITY_WEIGHTS[priority]
+    and items are popped in finish-tag order. A tenant that submits thousands of
+    jobs only spreads its own tags out; a tenant arriving later starts at the
+    current virtual time and is interleaved right away. Higher priority classes
+    advance 1/weight per job, so they get proportionally more dispatches without
+    starving lower classes. With a single flow this is plain FIFO.
+
+    push/pop are O(log n). Not thread-safe; callers hold their own lock.
+    """
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        # One heap per priority class so pops can be restricted to some classes
+        self._heaps: Dict[str, List[Tuple[float, int, Tuple[str, str], float, Any]]] = {p: [] for p in PRIORITY_WEIGHTS}
+        self._order = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: Dict[Tuple[str, str], float] = {}
+        self._queued: Dict[Tuple[str, str], int] = {}
+        self._served: Dict[Tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return sum(len(heap) for heap in self._heaps.values())
+
+    def push(self, item: Any, priority: str = DEFAULT_PRIORITY, tenant: str = DEFAULT_TENANT) -> None:
+        flow = (priority, tenant)
+        start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+        finish = start + 1.0 / PRIORITY_WEIGHTS[priority]
+        self._last_finish[flow] = finish
+        self._queued[flow] = self._queued.get(flow, 0) + 1
+        heapq.heappush(self._heaps[priority], (finish, next(self._order), flow, self._clock(), item))
+
+    def pop(self, priorities: Optional[Iterable[str]] = None) -> Optional[Any]:
+        """Pop the item with the smallest finish tag, optionally only from some priority classes."""
+        candidates = [self._heaps[p] for p in (priorities or PRIORITY_WEIGHTS) if self._heaps.get(p)]
+        if not candidates:
+            return None
+        heap = min(candidates, key=lambda h: h[0][:2])
+        finish, _, flow, _, item = heapq.heappop(heap)
+        self._virtual_time = max(self._virtual_time, finish - 1.0 / PRIORITY_WEIGHTS[flow[0]])
+        self._served[flow] = self._served.get(flow, 0) + 1
+        self._queued[flow] -= 1
+        if not self._queued[flow]:
+            # An idle flow restarts at the virtual time, so its old tag is not needed
+            del self._queued[flow]
+            del self._last_finish[flow]
+        return item
+
+    def items(self) -> List[Any]:
+        """Queued items in dispatch order."""
+        entries = sorted(entry for heap in self._heaps.values() for entry in heap)
+        return [item for *_, item in entries]
+
+    def oldest_wait(self) -> float:
+        """Seconds the longest-waiting item has been queued (0.0 when empty)."""
+        now = self._clock()
+        return max((self._oldest_wait(heap, now) for heap in self._heaps.values()), default=0.0)
+
+    @staticmethod
+    def _oldest_wait(heap: List[Tuple[float, int, Tuple[str, str], float, Any]], now: float) -> float:
+        return (now - min(entry[3] for entry in heap)) if heap else 0.0
+
+    def stats(self, reset: bool = True) -> Dict[str, Any]:
+        """
+        Snapshot for metrics:
+            depth / oldest_wait_seconds per priority class (starvation signal),
+            active_tenants, and fairness: Jain's index of weight-normalized
+            dispatches per flow since the last reset (1.0 = perfectly fair).
+        """
+        now = self._clock()
+        depth = {p: len(heap) for p, heap in self._heaps.items()}
+        oldest = {p: self._oldest_wait(heap, now) for p, heap in self._heaps.items()}
+        shares = [count / PRIORITY_WEIGHTS[flow[0]] for flow, count in self._served.items()]
+        fairness = (sum(shares) ** 2) / (len(shares) * sum(s * s for s in shares)) if shares else 1.0
+        stats = {
+            "depth": depth,
+            "oldest_wait_seconds": oldest,
+            "active_tenants": len({tenant for _, tenant in self._queued}),
+            "fairness": fairness,
+        }
+        if reset:
+            self._served = {}
+        return stats
@@ -1,15 +1,38 @@
 import json
+import math
 import uuid
-from typing import Optional, Dict, Any
-from src.app.queue.adapter import QueueAdapter
+from typing import Optional, Dict, Any, List, Sequence
+from src.app.queue.adapter import QueueAdapter, EnqueueBatchError
+
+MAX_WAIT_SECONDS = 20
+MAX_BATCH_SIZE = 10  # SQS limit for receive_message, send_message_batch and delete_message_batch
 
 class SQSAdapter(QueueAdapter):
     """
     SQS-backed queue adapter.
+
+    oldest_job_age is not available through the SQS API; use the
+    ApproximateAgeOfOldestMessage metric that SQS publishes to CloudWatch.
+
+    SQS cannot receive by priority class, so `reserve_many` ignores
+    `priorities`; WorkerRunner defers batch jobs it receives over its cap.
+
+    Attempts:
+        A retried job is deleted and resent with a delay, so SQS's own receive
+        count restarts at 1. The body therefore carries `attempts`, incremented
+        on every requeue, and a received job's attempt is that plus any extra
+        receives of the same message (a worker that died before acking).
+        `fail` moves the message to `dlq_url` (when set) and deletes it, so a
+        job that keeps failing stops being redelivered.
     """
-    def __init__(self, queue_url: str, client=None):
+    def __init__(self, queue_url: str, client=None, dlq_url: Optional[str] = None):
         self.queue_url = queue_url
         self.client = client
+        self.dlq_url = dlq_url
+        # job_id -> ReceiptHandle of jobs received by this adapter, needed to delete them
+        self._receipts: Dict[str, str] = {}
+        # job_id -> message body as received, for fail() to forward to the DLQ
+        self._bodies: Dict[str, str] = {}
         # If client is None, we assume it will be injected or we are in a mode where we shouldn't connect.
         # Real init would look like:
         # import boto3
@@ -30,47 +53,112 @@ class SQSAdapter(QueueAdapter):
         )
         return job_id
 
-    def reserve(self, queue_name: str, timeout: Optional[int] = 0) -> Optional[Dict[str, Any]]:
+    def enqueue_many(self, queue_name: str, jobs: List[Dict[str, Any]]) -> List[str]:
+        """
+        Sends the jobs in chunks of MAX_BATCH_SIZE. Every chunk is attempted even
+        if an earlier one failed, and failed entries are reported per job with
+        EnqueueBatchError, since the other chunks are already on the queue.
+        """
+        self._check_client()
+        for job in jobs:
+            job["id"] = job.get("id") or str(uuid.uuid4())
+        failed: Dict[int, str] = {}
+        for start in range(0, len(jobs), MAX_BATCH_SIZE):
+            batch = jobs[start:start + MAX_BATCH_SIZE]
+            try:
+                response = self.client.send_message_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=[{"Id": str(start + i), "MessageBody": json.dumps(job)} for i, job in enumerate(batch)]
+                )
+            except Exception as e:
+                failed.update({start + i: str(e) for i in range(len(batch))})
+                continue
+            for entry in (response.get("Failed") or []) if isinstance(response, dict) else []:
+                failed[int(entry["Id"])] = entry.get("Message") or entry.get("Code") or "send failed"
+        job_ids = [job["id"] for job in jobs]
+        if failed:
+            raise EnqueueBatchError(job_ids, failed)
+        return job_ids
+
+    def reserve(self, queue_name: str, timeout: Optional[float] = 0) -> Optional[Dict[str, Any]]:
+        jobs = self.reserve_many(queue_name, 1, timeout=timeout)
+        return jobs[0] if jobs else None
+
+    def reserve_many(self, queue_name: str, max_n: int, timeout: Optional[float] = 0, priorities: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         self._check_client()
+        # Long polling: SQS holds the request open until a message arrives
         response = self.client.receive_message(
             QueueUrl=self.queue_url,
-            MaxNumberOfMessages=1,
-            WaitTimeSeconds=timeout or 0,
-            VisibilityTimeout=30 # Default visibility
+            MaxNumberOfMessages=max(1, min(max_n, MAX_BATCH_SIZE)),
+            WaitTimeSeconds=self._wait_seconds(timeout),
+            VisibilityTimeout=30, # Default visibility
+            AttributeNames=["SentTimestamp", "ApproximateReceiveCount"]
         )
         
-        messages = response.get("Messages", [])
-        if not messages:
-            return None
-            
-        msg = messages[0]
-        body = json.loads(msg["Body"])
-        # Attach receipt handle for ACK
-        body["_receipt_handle"] = msg["ReceiptHandle"]
-        return body
+        jobs = []
+        for msg in response.get("Messages", []):
+            body = json.loads(msg["Body"])
+            attributes = msg.get("Attributes", {})
+            # Attach receipt handle for ACK
+            body["_receipt_handle"] = msg["ReceiptHandle"]
+            sent = attributes.get("SentTimestamp")
+            if sent:
+                body["enqueued_at"] = int(sent) / 1000.0
+            receives = int(attributes.get("ApproximateReceiveCount", 1))
+            body["attempts"] = body.get("attempts", 1) + receives - 1
+            if "id" in body:
+                self._receipts[body["id"]] = msg["ReceiptHandle"]
+                self._bodies[body["id"]] = msg["Body"]
+            jobs.append(body)
+        return jobs
+
+    @staticmethod
+    def _wait_seconds(timeout: Optional[float]) -> int:
+        # SQS accepts whole seconds, up to 20
+        return min(MAX_WAIT_SECONDS, math.ceil(timeout or 0))
 
     def ack(self, queue_name: str, job_id: str) -> None:
-        # SQS requires ReceiptHandle, which we hid in the job dict or need to track.
-        # This interface might need adjustment for SQS if we only pass ID.
-        # But for now, we assume the job dict is available in the context where ack is called,
-        # or we change the signature. 
-        # Since the signature is fixed (job_id), this is a limitation of the abstraction for SQS 
-        # unless we store a mapping.
-        # For this exercise, we'll assume we can't easily ACK by ID alone without the handle.
-        pass
+        # SQS deletes by ReceiptHandle; we remember the handles of the messages we received.
+        self._check_client()
+        self._bodies.pop(job_id, None)
+        receipt = self._receipts.pop(job_id, None)
+        if receipt is None:
+            return
+        self.client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt)
+
+    def ack_many(self, queue_name: str, job_ids: List[str]) -> None:
+        self._check_client()
+        for job_id in job_ids:
+            self._bodies.pop(job_id, None)
+        receipts = [self._receipts.pop(job_id) for job_id in job_ids if job_id in self._receipts]
+        for start in range(0, len(receipts), MAX_BATCH_SIZE):
+            batch = receipts[start:start + MAX_BATCH_SIZE]
+            self.client.delete_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[{"Id": str(i), "ReceiptHandle": receipt} for i, receipt in enumerate(batch)]
+            )
 
     def fail(self, queue_name: str, job_id: str, reason: Optional[str] = None) -> None:
-        # SQS handles DLQ via Redrive Policy automatically if not deleted.
-        # We can explicitly move it if needed, or just let visibility expire.
-        pass
+        # A redrive policy never fires for retried jobs (each retry is a new
+        # message), so dead-letter explicitly and stop redelivery
+        self._check_client()
+        body = self._bodies.get(job_id)
+        if self.dlq_url and body is not None:
+            self.client.send_message(QueueUrl=self.dlq_url, MessageBody=body)
+        self.ack(queue_name, job_id)
 
     def requeue(self, queue_name: str, job: Dict[str, Any], delay_seconds: Optional[int] = 0) -> str:
         self._check_client()
-        # Send new message with DelaySeconds
+        # Delete the received copy so it is not redelivered alongside the new one
+        self.ack(queue_name, job["id"])
+        # Receive-time fields are re-derived when the new message is received
+        body = {k: v for k, v in job.items() if k not in ("_receipt_handle", "enqueued_at")}
+        body["attempts"] = job.get("attempts", 1) + 1
+        # Send new message with DelaySeconds (SQS allows at most 15 minutes)
         self.client.send_message(
             QueueUrl=self.queue_url,
-            MessageBody=json.dumps(job),
-            DelaySeconds=delay_seconds or 0
+            MessageBody=json.dumps(body),
+            DelaySeconds=min(delay_seconds or 0, 900)
         )
         return job["id"]
 
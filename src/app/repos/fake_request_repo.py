@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from src.app.repos.request_repo import RequestRepo
 
@@ -8,6 +8,7 @@ class FakeRequestRepo(RequestRepo):
     """
     def __init__(self):
         self.requests: Dict[str, Dict[str, Any]] = {}
+        self.bulk_inserts = 0  # create_requests calls, one per bulk insert
 
     def create_request(self, request_id: str, user_id: Optional[str] = None, 
                       prompt: str = "", model: str = "") -> Dict[str, Any]:
@@ -22,6 +23,18 @@ class FakeRequestRepo(RequestRepo):
         }
         return self.requests[request_id]
 
+    def create_requests(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self.bulk_inserts += 1
+        return [
+            self.create_request(
+                request_id=req["id"],
+                user_id=req.get("user_id"),
+                prompt=req.get("prompt", ""),
+                model=req.get("model", "")
+            )
+            for req in requests
+        ]
+
     def update_request_status(self, request_id: str, status: str, 
                             error_message: Optional[str] = None) -> Optional[Dict[str, Any]]:
         if request_id in self.requests:
@@ -1,5 +1,5 @@
 from decimal import Decimal
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from src.app.db import SupabaseClientWrapper
 
 class RequestRepo:
@@ -15,6 +15,13 @@ class RequestRepo:
         """
         return self.db.create_request(prompt, model, stream, user_id)
 
+    def create_requests(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Creates many request records in one bulk insert.
+        Each item has prompt, model, stream, user_id and optionally id.
+        """
+        return self.db.create_requests(requests)
+
     def set_running(self, request_id: str) -> Dict[str, Any]:
         """
         Updates request status to 'running'.
@@ -1,28 +1,212 @@
 import json
 import logging
 import os
-from datetime import datetime, timezone
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, IO
 from src.app.schemas.security import RequestAudit
 from src.app.config import Settings
+from src.app.graceful_shutdown import register_shutdown_handler
+from src.app.observability import increment_audit_event
 
 logger = logging.getLogger(__name__)
 
+class AuditSink:
+    """
+    Background audit log writer.
+
+    Request handlers only enqueue (non-blocking, into a queue bounded at
+    `max_queue` events); a daemon thread serializes events, writes them in
+    batches of up to `batch_size` lines with one write() call, fsyncs at most
+    every `fsync_interval` seconds, and rotates the file once it reaches
+    `max_bytes` or is `rotate_seconds` old (0 disables either), keeping
+    `backup_count` old files as path.1 ... path.N.
+
+    When the queue is full the event is dropped and counted (`dropped` and the
+    audit_log_events_total{outcome="dropped"} metric) rather than stalling the
+    request.
+    """
+    def __init__(
+        self,
+        path: str,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        fsync_interval: float = 1.0,
+        max_bytes: int = 100 * 1024 * 1024,
+        rotate_seconds: float = 0,
+        backup_count: int = 5,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self._queue: "queue.Queue[Optional[RequestAudit]]" = queue.Queue(maxsize=max_queue)
+        self._file: Optional[IO[str]] = None
+        self._size = 0
+        self._clock = clock
+        self._opened_at = 0.0
+        self._last_fsync = clock()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, event: RequestAudit) -> bool:
+        """Enqueue an event without blocking. Returns False if it was dropped."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            increment_audit_event("dropped")
+            return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued event has been written. Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write what is queued, fsync and stop the writer thread."""
+        if self._thread and self._thread.is_alive():
+            self.flush(timeout)
+            self._queue.put(None)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._maybe_fsync()
+                continue
+            batch: List[Optional[RequestAudit]] = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            events = [event for event in batch if event is not None]
+            try:
+                if events:
+                    self._write(events)
+            except Exception as e:
+                # Fallback logging if file write fails
+                logger.error(f"Failed to write audit log: {e}")
+                increment_audit_event("error", len(events))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                self._close_file()
+                return
+
+    def _write(self, events: List[RequestAudit]) -> None:
+        if self._file is None:
+            self._open()
+        lines = "".join(json.dumps(_entry(event)) + "\n" for event in events)
+        self._file.write(lines)
+        self._file.flush()
+        self._size += len(lines.encode("utf-8"))
+        self.written += len(events)
+        increment_audit_event("written", len(events))
+        self._maybe_fsync()
+        if (self.max_bytes and self._size >= self.max_bytes) or \
+                (self.rotate_seconds and self._clock() - self._opened_at >= self.rotate_seconds):
+            self._rotate()
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._opened_at = self._clock()
+        try:
+            self._size = os.path.getsize(self.path)
+        except OSError:
+            self._size = 0
+
+    def _maybe_fsync(self, force: bool = False) -> None:
+        if self._file is None:
+            return
+        if force or self._clock() - self._last_fsync >= self.fsync_interval:
+            try:
+                os.fsync(self._file.fileno())
+            except (OSError, ValueError, TypeError):
+                pass # Not a real file (e.g. mocked in tests)
+            self._last_fsync = self._clock()
+
+    def _rotate(self) -> None:
+        self._close_file()
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0 and os.path.exists(self.path):
+            os.replace(self.path, f"{self.path}.1")
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+        self.rotations += 1
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._maybe_fsync(force=True)
+            self._file.close()
+            self._file = None
+            self._size = 0
+
+def _entry(event: RequestAudit) -> Dict:
+    entry = event.model_dump()
+    # Serialize datetime
+    entry["timestamp"] = event.timestamp.isoformat()
+    return entry
+
+# One sink per audit log path
+_SINKS: Dict[str, AuditSink] = {}
+_SINKS_LOCK = threading.Lock()
+
+def get_audit_sink(settings: Settings) -> AuditSink:
+    sink = _SINKS.get(settings.AUDIT_LOG_PATH)
+    if sink is None:
+        with _SINKS_LOCK:
+            sink = _SINKS.get(settings.AUDIT_LOG_PATH)
+            if sink is None:
+                sink = AuditSink(
+                    settings.AUDIT_LOG_PATH,
+                    max_queue=settings.AUDIT_QUEUE_SIZE,
+                    fsync_interval=settings.AUDIT_FSYNC_SECONDS,
+                    max_bytes=settings.AUDIT_MAX_BYTES,
+                    rotate_seconds=settings.AUDIT_ROTATE_SECONDS,
+                    backup_count=settings.AUDIT_BACKUP_COUNT
+                )
+                _SINKS[settings.AUDIT_LOG_PATH] = sink
+                register_shutdown_handler(sink.close)
+    return sink
+
 def audit_event(event: RequestAudit, settings: Settings = Settings()):
     """
-    Writes an audit event to the log file.
+    Queues an audit event for the background writer (never blocks on disk).
     """
-    try:
-        # Ensure directory exists
-        log_path = settings.AUDIT_LOG_PATH
-        os.makedirs(os.path.dirname(log_path), exist_ok=True)
-        
-        entry = event.model_dump()
-        # Serialize datetime
-        entry["timestamp"] = event.timestamp.isoformat()
-        
-        with open(log_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry) + "\n")
-            
-    except Exception as e:
-        # Fallback logging if file write fails
-        logger.error(f"Failed to write audit log: {e}")
+    get_audit_sink(settings).submit(event)
@@ -0,0 +1,98 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+# fn(current value or None) -> (new value or None to delete, expires_at, result)
+UpdateFn = Callable[[Optional[Any]], Tuple[Optional[Any], float, Any]]
+
+class _Shard:
+    def __init__(self, max_entries: int, bucket_seconds: float):
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        self.bucket_seconds = bucket_seconds
+        self.entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()  # LRU order
+        self.buckets: Dict[int, Set[Hashable]] = {}  # expiry bucket -> keys
+        self.evictions = 0
+        self.next_sweep = float("-inf")  # start of the first bucket not yet swept
+
+    def index(self, key: Hashable, expires_at: float) -> None:
+        bucket = int(expires_at // self.bucket_seconds)
+        keys = self.buckets.get(bucket)
+        if keys is None:
+            self.buckets[bucket] = keys = set()
+        keys.add(key)
+
+    def unindex(self, key: Hashable, expires_at: float) -> None:
+        keys = self.buckets.get(int(expires_at // self.bucket_seconds))
+        if keys is not None:
+            keys.discard(key)
+
+    def sweep(self, now: float) -> None:
+        """Drop every entry in expiry buckets that ended before now."""
+        current = int(now // self.bucket_seconds)
+        self.next_sweep = (current + 1) * self.bucket_seconds
+        for bucket in [b for b in self.buckets if b < current]:
+            for key in self.buckets.pop(bucket):
+                entry = self.entries.get(key)
+                if entry is not None and entry[1] <= now:
+                    del self.entries[key]
+
+class RateLimitStore:
+    """
+    Bounded, thread-safe key -> state map for in-process rate limiters.
+
+    - Expiry: every entry has an `expires_at` after which it is dropped (for
+      GCRA, the TAT: once it has passed the client is indistinguishable from a
+      new one, so forgetting it changes nothing). Keys are grouped in
+      `bucket_seconds` time buckets; each shard sweeps its expired buckets on
+      its next update, so sweeping costs O(expired keys).
+    - Memory budget: at most `max_entries` keys in total. When full, the least
+      recently updated key is evicted (that client gets a fresh budget), so a
+      scan over millions of ids cannot grow the heap.
+    - Locking: keys are spread over `shards` independently locked shards.
+    """
+    def __init__(self, max_entries: int = 100_000, shards: int = 32, bucket_seconds: float = 1.0):
+        per_shard = max(1, max_entries // shards)
+        self._shards = [_Shard(per_shard, bucket_seconds) for _ in range(shards)]
+        self.max_entries = per_shard * shards
+
+    def _shard(self, key: Hashable) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+    @property
+    def evictions(self) -> int:
+        return sum(shard.evictions for shard in self._shards)
+
+    def get(self, key: Hashable, now: float) -> Optional[Any]:
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            return entry[0] if entry is not None and entry[1] > now else None
+
+    def update(self, key: Hashable, now: float, fn: UpdateFn) -> Any:
+        """
+        Atomically read-modify-write one key under its shard lock.
+        `fn` gets the live value (None if missing or expired) and returns
+        (new value or None to delete, expires_at, result); returns `result`.
+        """
+        shard = self._shard(key)
+        with shard.lock:
+            if now >= shard.next_sweep:
+                shard.sweep(now)
+            entries = shard.entries
+            entry = entries.pop(key, None)
+            if entry is not None:
+                shard.unindex(key, entry[1])
+            value, expires_at, result = fn(entry[0] if entry is not None and entry[1] > now else None)
+            if value is not None and expires_at > now:
+                if len(entries) >= shard.max_entries:
+                    oldest, (_, oldest_expiry) = entries.popitem(last=False)
+                    shard.unindex(oldest, oldest_expiry)
+                    shard.evictions += 1
+                # Re-inserted at the end: most recently updated
+                entries[key] = (value, expires_at)
+                shard.index(key, expires_at)
+            return result
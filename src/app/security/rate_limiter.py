@@ -1,7 +1,33 @@
+import math
 import time
-from typing import Dict, Tuple
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
 from fastapi import Request, Response, HTTPException, Depends
 from src.app.config import Settings
+from src.app.security.rate_limit_store import RateLimitStore
+
+logger = logging.getLogger(__name__)
+
+def gcra(tat: Optional[float], now: float, emission_interval: float, period: float, requested: int = 1) -> Tuple[int, float, int, float]:
+    """
+    Generic cell rate algorithm step (shared by the in-memory limiter and the
+    Python twin of the Redis script).
+
+    `tat` is the stored theoretical arrival time (None for a new client). A
+    request fits while the new TAT stays within `period` of now, so a client can
+    burst up to limit = period / emission_interval and then gets one request per
+    emission_interval: no 2x burst at window boundaries.
+
+    Grants up to `requested` tokens and returns
+    (granted, new_tat, remaining, retry_after_seconds).
+    """
+    tat = max(tat if tat is not None else now, now)
+    available = max(0, int((period - (tat - now)) / emission_interval + 1e-9))
+    granted = min(requested, available)
+    tat += granted * emission_interval
+    remaining = max(0, int((period - (tat - now)) / emission_interval + 1e-9))
+    retry_after = 0.0 if granted else (tat + emission_interval) - period - now
+    return granted, tat, remaining, retry_after
 
 class RateLimiter:
     """
@@ -13,50 +39,69 @@ class RateLimiter:
     def get_usage(self, client_id: str) -> Dict[str, int]:
         raise NotImplementedError
 
+    def check(self, client_id: str) -> Dict[str, Any]:
+        """
+        Consume one request and return the decision and usage together:
+        {"allowed", "limit", "remaining", "reset", "retry_after"}.
+        Limiters override this to do a single computation (or round trip).
+        """
+        allowed = self.allow(client_id)
+        usage = self.get_usage(client_id)
+        retry_after = 0 if allowed else max(1, usage["reset"] - int(time.time()))
+        return {"allowed": allowed, **usage, "retry_after": retry_after}
+
 class InMemoryRateLimiter(RateLimiter):
     """
-    Simple token bucket / fixed window limiter for testing.
-    Resets every minute.
+    In-process GCRA limiter: `limit_per_minute` requests, refilled smoothly
+    (one every 60 / limit seconds) rather than reset at minute boundaries.
+    Per-client TATs live in a bounded RateLimitStore (`max_clients` entries,
+    dropped once their TAT has passed). Thread-safe.
     """
-    def __init__(self, limit_per_minute: int):
+    def __init__(
+        self,
+        limit_per_minute: int,
+        period: float = 60.0,
+        clock: Callable[[], float] = time.time,
+        max_clients: int = 100_000
+    ):
         self.limit = limit_per_minute
-        self.windows: Dict[str, Tuple[int, int]] = {} # client_id -> (timestamp_minute, count)
+        self.period = period
+        self.emission_interval = period / limit_per_minute
+        self._clock = clock
+        self.tats = RateLimitStore(max_entries=max_clients) # client_id -> theoretical arrival time
+
+    def acquire(self, client_id: str, requested: int = 1) -> Dict[str, Any]:
+        """Grant up to `requested` tokens; returns check()'s fields plus "granted"."""
+        now = self._clock()
+
+        def step(stored: Optional[float]):
+            granted, tat, remaining, retry_after = gcra(stored, now, self.emission_interval, self.period, requested)
+            result = gcra_decision(granted, self.limit, remaining, tat, retry_after)
+            return (tat if granted else stored), (tat if granted else (stored or now)), result
+
+        return self.tats.update(client_id, now, step)
+
+    def check(self, client_id: str) -> Dict[str, Any]:
+        return self.acquire(client_id)
 
     def allow(self, client_id: str) -> bool:
-        current_minute = int(time.time() / 60)
-        
-        window = self.windows.get(client_id)
-        
-        if not window or window[0] != current_minute:
-            # New window
-            self.windows[client_id] = (current_minute, 1)
-            return True
-        
-        # Existing window
-        timestamp, count = window
-        if count < self.limit:
-            self.windows[client_id] = (timestamp, count + 1)
-            return True
-            
-        return False
+        return self.check(client_id)["allowed"]
 
     def get_usage(self, client_id: str) -> Dict[str, int]:
-        current_minute = int(time.time() / 60)
-        window = self.windows.get(client_id)
-        
-        if not window or window[0] != current_minute:
-            return {
-                "limit": self.limit,
-                "remaining": self.limit,
-                "reset": (current_minute + 1) * 60
-            }
-            
-        count = window[1]
-        return {
-            "limit": self.limit,
-            "remaining": max(0, self.limit - count),
-            "reset": (current_minute + 1) * 60
-        }
+        now = self._clock()
+        _, tat, remaining, _ = gcra(self.tats.get(client_id, now), now, self.emission_interval, self.period, 0)
+        return {"limit": self.limit, "remaining": remaining, "reset": math.ceil(tat)}
+
+def gcra_decision(granted: int, limit: int, remaining: int, tat: float, retry_after: float) -> Dict[str, Any]:
+    """Build a check() result from a GCRA step."""
+    return {
+        "allowed": granted > 0,
+        "granted": granted,
+        "limit": limit,
+        "remaining": remaining,
+        "reset": math.ceil(tat),  # when the client is back to a full burst
+        "retry_after": max(1, math.ceil(retry_after)) if not granted else 0
+    }
 
 # Global instance for simplicity in this demo
 _LIMITER = None
@@ -64,9 +109,18 @@ _LIMITER = None
 def get_rate_limiter(settings: Settings = Depends(Settings)) -> RateLimiter:
     global _LIMITER
     if _LIMITER is None:
-        # In production, you would initialize a RedisRateLimiter here
-        # e.g., RedisRateLimiter(redis_client, settings.RATE_LIMIT_PER_MINUTE)
-        _LIMITER = InMemoryRateLimiter(settings.RATE_LIMIT_PER_MINUTE)
+        if settings.RATE_LIMIT_REDIS_URL:
+            # Shared across replicas; imported lazily to avoid a circular import
+            from src.app.security.redis_rate_limiter import RedisRateLimiter
+            _LIMITER = RedisRateLimiter(
+                redis_url=settings.RATE_LIMIT_REDIS_URL,
+                limit=settings.RATE_LIMIT_PER_MINUTE,
+                window=60,
+                local_tokens=settings.RATE_LIMIT_LOCAL_TOKENS,
+                max_clients=settings.RATE_LIMIT_MAX_CLIENTS
+            )
+        else:
+            _LIMITER = InMemoryRateLimiter(settings.RATE_LIMIT_PER_MINUTE, max_clients=settings.RATE_LIMIT_MAX_CLIENTS)
     return _LIMITER
 
 async def check_rate_limit(
@@ -84,13 +138,19 @@ async def check_rate_limit(
     else:
         client_id = request.client.host if request.client else "unknown"
         
-    if not limiter.allow(client_id):
-        usage = limiter.get_usage(client_id)
-        response.headers["X-RateLimit-Limit"] = str(usage["limit"])
-        response.headers["X-RateLimit-Remaining"] = "0"
-        response.headers["Retry-After"] = str(usage["reset"] - int(time.time()))
-        raise HTTPException(status_code=429, detail="Rate limit exceeded")
-        
-    usage = limiter.get_usage(client_id)
-    response.headers["X-RateLimit-Limit"] = str(usage["limit"])
-    response.headers["X-RateLimit-Remaining"] = str(usage["remaining"])
+    result = limiter.check(client_id)
+    if not result["allowed"]:
+        raise HTTPException(status_code=429, detail="Rate limit exceeded", headers=rate_limit_headers(result))
+
+    response.headers.update(rate_limit_headers(result))
+
+def rate_limit_headers(result: Dict[str, Any]) -> Dict[str, str]:
+    """X-RateLimit-* (and Retry-After when rejected) headers for a check() result."""
+    headers = {
+        "X-RateLimit-Limit": str(result["limit"]),
+        "X-RateLimit-Remaining": str(result["remaining"]),
+        "X-RateLimit-Reset": str(result["reset"])
+    }
+    if not result["allowed"]:
+        headers["Retry-After"] = str(result["retry_after"])
+    return headers
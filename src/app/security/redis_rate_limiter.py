@@ -1,79 +1,127 @@
 import time
 import logging
-from typing import Optional, Tuple, Any, Dict
-from src.app.security.rate_limiter import RateLimiter
+from typing import Optional, Tuple, Any, Dict, Callable
+from src.app.security.rate_limiter import RateLimiter, InMemoryRateLimiter, rate_limit_headers, gcra_decision
+from src.app.security.rate_limit_store import RateLimitStore
 
 logger = logging.getLogger(__name__)
 
+# GCRA in one atomic step. Grants up to ARGV[4] tokens (fewer if the burst is
+# nearly used up) and stores the new theoretical arrival time with a TTL.
+# KEYS[1] = tat key; ARGV[1] = now, ARGV[2] = emission interval, ARGV[3] = period, ARGV[4] = requested
+# Returns {granted, remaining, tat, retry_after}; floats as strings (Redis truncates Lua numbers).
+GCRA_LUA = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local period = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or ARGV[1])
+if tat < now then tat = now end
+local available = math.max(0, math.floor((period - (tat - now)) / interval + 1e-9))
+local granted = math.min(tonumber(ARGV[4]), available)
+tat = tat + granted * interval
+if granted > 0 then
+    redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil((tat - now) * 1000))
+end
+local remaining = math.max(0, math.floor((period - (tat - now)) / interval + 1e-9))
+local retry_after = 0
+if granted == 0 then retry_after = (tat + interval) - period - now end
+return {granted, remaining, tostring(tat), tostring(retry_after)}
+"""
+
 class RedisRateLimiter(RateLimiter):
     """
-    Redis-backed rate limiter using fixed window counter.
-    Falls back to in-memory if redis_client is None.
+    Redis-backed GCRA limiter: `limit` requests per `window` seconds, shared by
+    every replica. Each check is one atomic Lua script call.
+
+    With `local_tokens` > 1 a process takes that many tokens per round trip and
+    spends them locally for up to `local_ttl` seconds, so most requests skip
+    Redis. Unspent tokens expire with the lease, so the cluster-wide limit is
+    never exceeded; a busy client may see up to `local_tokens` fewer per replica.
+
+    Falls back to an in-process limiter if there is no client, and fails open
+    if Redis errors.
     """
-    def __init__(self, redis_client: Any = None, limit: int = 60, window: int = 60):
+    def __init__(
+        self,
+        redis_client: Any = None,
+        limit: int = 60,
+        window: int = 60,
+        redis_url: Optional[str] = None,
+        local_tokens: int = 0,
+        local_ttl: float = 1.0,
+        clock: Callable[[], float] = time.time,
+        max_clients: int = 100_000
+    ):
         self.redis = redis_client
         self.limit = limit
         self.window = window
-        self._memory_fallback = {}
-        
-    def is_allowed(self, client_id: str) -> Tuple[bool, Dict[str, str]]:
+        self.emission_interval = window / limit
+        self.local_tokens = local_tokens
+        self.local_ttl = local_ttl
+        self._clock = clock
+        self._script = None
+        # client_id -> (tokens left, last decision from Redis, lease expiry)
+        self._local = RateLimitStore(max_entries=max_clients)
+        self._memory_fallback = InMemoryRateLimiter(limit, period=window, clock=clock, max_clients=max_clients)
+        if not self.redis and redis_url:
+            # Safe import
+            try:
+                import redis
+                self.redis = redis.Redis.from_url(redis_url)
+            except ImportError:
+                logger.warning("redis-py not installed. Using in-memory rate limiting.")
+
+    def check(self, client_id: str) -> Dict[str, Any]:
         if not self.redis:
-            return self._check_memory(client_id)
-            
-        key = f"rate_limit:{client_id}"
+            return self._memory_fallback.check(client_id)
+        if self.local_tokens > 1:
+            local = self._take_local(client_id)
+            if local:
+                return local
         try:
-            # Simple fixed window: INCR key, EXPIRE if new
-            # For atomic operations in prod, use Lua script
-            current = self.redis.incr(key)
-            if current == 1:
-                self.redis.expire(key, self.window)
-                
-            remaining = max(0, self.limit - current)
-            reset_time = int(time.time()) + self.window # Approx
-            
-            headers = {
-                "X-RateLimit-Limit": str(self.limit),
-                "X-RateLimit-Remaining": str(remaining),
-                "X-RateLimit-Reset": str(reset_time)
-            }
-            
-            if current > self.limit:
-                headers["Retry-After"] = str(self.window)
-                return False, headers
-                
-            return True, headers
-            
+            return self._acquire(client_id, max(1, self.local_tokens))
         except Exception as e:
             logger.error(f"Redis rate limit error: {e}")
-            # Fail open or closed? Let's fail open for availability
-            return True, {}
+            # Fail open for availability
+            return {"allowed": True, "granted": 1, "limit": self.limit, "remaining": self.limit, "reset": int(self._clock()), "retry_after": 0}
+
+    def _acquire(self, client_id: str, requested: int) -> Dict[str, Any]:
+        if self._script is None:
+            self._script = self.redis.register_script(GCRA_LUA)
+        granted, remaining, tat, retry_after = self._script(
+            keys=[f"rate_limit:{client_id}"],
+            args=[self._clock(), self.emission_interval, self.window, requested]
+        )
+        result = gcra_decision(int(granted), self.limit, int(remaining), float(tat), float(retry_after))
+        if result["granted"] > 1:
+            # Keep the rest for the next requests in this process
+            now = self._clock()
+            lease_ends = now + self.local_ttl
+            self._local.update(client_id, now, lambda _: ((result["granted"] - 1, result, lease_ends), lease_ends, None))
+            result = {**result, "remaining": result["remaining"] + result["granted"] - 1}
+        return result
+
+    def _take_local(self, client_id: str) -> Optional[Dict[str, Any]]:
+        now = self._clock()
 
-    def _check_memory(self, client_id: str) -> Tuple[bool, Dict[str, str]]:
-        """
-        Simple in-memory fallback for tests/local.
-        Note: This implementation is not thread-safe or distributed.
-        """
-        now = int(time.time())
-        window_key = f"{client_id}:{now // self.window}"
-        
-        count = self._memory_fallback.get(window_key, 0)
-        count += 1
-        self._memory_fallback[window_key] = count
-        
-        # Cleanup old keys (naive)
-        if len(self._memory_fallback) > 1000:
-            self._memory_fallback.clear()
-            
-        remaining = max(0, self.limit - count)
-        
-        headers = {
-            "X-RateLimit-Limit": str(self.limit),
-            "X-RateLimit-Remaining": str(remaining),
-            "X-RateLimit-Reset": str(now + self.window)
-        }
-        
-        if count > self.limit:
-            headers["Retry-After"] = str(self.window)
-            return False, headers
-            
-        return True, headers
+        def take(entry: Optional[Tuple[int, Dict[str, Any], float]]):
+            if entry is None:
+                return None, now, None
+            tokens, last, lease_ends = entry
+            decision = {**last, "granted": 1, "remaining": last["remaining"] + tokens - 1}
+            return ((tokens - 1, last, lease_ends) if tokens > 1 else None), lease_ends, decision
+
+        return self._local.update(client_id, now, take)
+
+    def allow(self, client_id: str) -> bool:
+        return self.check(client_id)["allowed"]
+
+    def get_usage(self, client_id: str) -> Dict[str, int]:
+        if not self.redis:
+            return self._memory_fallback.get_usage(client_id)
+        result = self._acquire(client_id, 0)
+        return {"limit": result["limit"], "remaining": result["remaining"], "reset": result["reset"]}
+
+    def is_allowed(self, client_id: str) -> Tuple[bool, Dict[str, str]]:
+        result = self.check(client_id)
+        return result["allowed"], rate_limit_headers(result)
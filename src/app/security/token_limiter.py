@@ -0,0 +1,145 @@
+import math
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from fastapi import Depends, Request
+from src.app.config import Settings
+from src.app.dependencies import get_settings
+from src.app.security.rate_limiter import gcra
+from src.app.security.rate_limit_store import RateLimitStore
+
+DEFAULT_PLAN = "free"
+
+def parse_plan_limits(spec: str) -> Dict[str, int]:
+    """Parse "plan:tokens,plan:tokens" (tokens per minute, 0 = unlimited)."""
+    limits = {}
+    for item in spec.split(","):
+        if ":" in item:
+            plan, tokens = item.split(":", 1)
+            limits[plan.strip().lower()] = int(tokens)
+    return limits
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for text we have no usage for."""
+    return len(text) // 4 + 1
+
+def usage_tokens(usage: Optional[Dict[str, Any]]) -> Optional[int]:
+    """Total tokens from a generate_text usage dict, or None if it reports none."""
+    if not usage:
+        return None
+    counts = [usage.get(k) for k in ("input_tokens", "output_tokens", "prompt_tokens", "completion_tokens")]
+    counts = [c for c in counts if isinstance(c, int)]
+    return sum(counts) if counts and sum(counts) > 0 else None
+
+class TokenReservation:
+    """
+    Result of TokenRateLimiter.reserve(). If admitted, `reserved` tokens were
+    charged up front; call settle() with the tokens actually used to refund the
+    difference (or charge the overrun). Settling more than once is a no-op.
+    """
+    def __init__(self, limiter: "TokenRateLimiter", client_id: str, allowed: bool, reserved: int, limit: int, remaining: int, retry_after: int):
+        self._limiter = limiter
+        self._settled = not allowed or reserved == 0
+        self.client_id = client_id
+        self.allowed = allowed
+        self.reserved = reserved
+        self.limit = limit
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+    def settle(self, used: int) -> None:
+        if self._settled:
+            return
+        self._settled = True
+        self._limiter.adjust(self.client_id, self.limit, used - self.reserved)
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-TokenLimit-Limit": str(self.limit),
+            "X-TokenLimit-Remaining": str(self.remaining)
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
+
+class TokenRateLimiter:
+    """
+    Per-client token budget (tokens per minute, by Client.plan) using GCRA,
+    so a max_tokens=8000 request costs 160x a max_tokens=50 one.
+
+    A request reserves its estimated cost (prompt estimate + max_tokens, capped
+    at the plan's burst so huge requests are still possible) when admitted, and
+    is reconciled against the reported usage afterwards. State is a bounded
+    RateLimitStore of `max_clients` entries. Thread-safe.
+    """
+    def __init__(
+        self,
+        plan_limits: Dict[str, int],
+        period: float = 60.0,
+        clock: Callable[[], float] = time.time,
+        max_clients: int = 100_000
+    ):
+        self.plan_limits = plan_limits
+        self.period = period
+        self._clock = clock
+        self.tats = RateLimitStore(max_entries=max_clients) # client_id -> theoretical arrival time
+
+    def limit_for(self, plan: Optional[str]) -> int:
+        plan = (plan or DEFAULT_PLAN).lower()
+        return self.plan_limits.get(plan, self.plan_limits.get(DEFAULT_PLAN, 0))
+
+    def reserve(self, client_id: str, plan: Optional[str], tokens: int) -> TokenReservation:
+        limit = self.limit_for(plan)
+        if limit <= 0:
+            return TokenReservation(self, client_id, True, 0, 0, 0, 0)
+        interval = self.period / limit
+        cost = max(1, min(tokens, limit))
+        now = self._clock()
+
+        def step(stored: Optional[float]):
+            granted, tat, remaining, _ = gcra(stored, now, interval, self.period, cost)
+            if granted == cost:
+                # All or nothing: only commit when the whole estimate fits
+                return tat, tat, TokenReservation(self, client_id, True, cost, limit, remaining, 0)
+            start = max(stored if stored is not None else now, now)
+            retry_after = max(1, math.ceil(start + cost * interval - self.period - now))
+            _, _, remaining, _ = gcra(stored, now, interval, self.period, 0)
+            return stored, start, TokenReservation(self, client_id, False, 0, limit, remaining, retry_after)
+
+        return self.tats.update(client_id, now, step)
+
+    def adjust(self, client_id: str, limit: int, tokens: int) -> None:
+        """Charge (tokens > 0) or refund (tokens < 0) a client's budget."""
+        if limit <= 0 or not tokens:
+            return
+        now = self._clock()
+
+        def step(stored: Optional[float]):
+            # A refund can restore the full burst but not bank tokens beyond it
+            tat = max((stored if stored is not None else now) + tokens * (self.period / limit), now)
+            return tat, tat, None
+
+        self.tats.update(client_id, now, step)
+
+def token_caller(request: Request) -> Tuple[str, str]:
+    """
+    (client id, plan) for budgeting: the authenticated client, else the IP on
+    the free plan, keyed like SecurityMiddleware's request-count limiting.
+    Never key on anything from the request body, or a caller could mint fresh
+    budgets (or spend someone else's) by changing it.
+    """
+    client = getattr(request.state, "client", None)
+    if client:
+        return client.id, client.plan
+    return request.client.host if request.client else "unknown", DEFAULT_PLAN
+
+# Global instance, like the request-count limiter
+_TOKEN_LIMITER: Optional[TokenRateLimiter] = None
+
+def get_token_limiter(settings: Settings = Depends(get_settings)) -> TokenRateLimiter:
+    global _TOKEN_LIMITER
+    if _TOKEN_LIMITER is None:
+        _TOKEN_LIMITER = TokenRateLimiter(
+            parse_plan_limits(settings.TOKEN_LIMITS_PER_MINUTE),
+            max_clients=settings.RATE_LIMIT_MAX_CLIENTS
+        )
+    return _TOKEN_LIMITER
@@ -14,10 +14,24 @@ class AgenticAnthropicClient:
     Claude can propose actions that require user confirmation.
     """
     
-    def __init__(self, api_key: str, model: str = "claude-3-haiku-20240307"):
+    def __init__(self, api_key: str, model: str = "claude-3-haiku-20240307", async_http_client: Optional[Any] = None):
+        """
+        Args:
+            api_key: Anthropic API key.
+            model: Model used for tool-use calls.
+            async_http_client: Optional pooled HTTP client; enables `agenerate_with_tools`.
+        """
         self.client = anthropic.Anthropic(api_key=api_key)
+        self.async_client = None
+        if async_http_client is not None:
+            self.async_client = anthropic.AsyncAnthropic(api_key=api_key, http_client=async_http_client)
         self.model = model
     
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections of the async client."""
+        if self.async_client is not None:
+            await self.async_client.close()
+    
     def generate_with_tools(
         self,
         prompt: str,
@@ -34,6 +48,43 @@ class AgenticAnthropicClient:
                 - tool_proposals: List of tools the AI wants to use
                 - requires_confirmation: Whether user confirmation is needed
         """
+        try:
+            response = self.client.messages.create(
+                **self._tool_request(prompt, max_tokens, temperature, system_prompt)
+            )
+            return self._parse_tool_response(response)
+        except anthropic.APIError as e:
+            return self._error_result(e)
+    
+    async def agenerate_with_tools(
+        self,
+        prompt: str,
+        max_tokens: int = 1024,
+        temperature: float = 0.7,
+        system_prompt: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Async version of `generate_with_tools` over the pooled HTTP client.
+        Requires `async_http_client` to have been passed to the constructor.
+        """
+        if self.async_client is None:
+            raise RuntimeError("Async client not initialized. Pass async_http_client to the constructor.")
+        try:
+            response = await self.async_client.messages.create(
+                **self._tool_request(prompt, max_tokens, temperature, system_prompt)
+            )
+            return self._parse_tool_response(response)
+        except anthropic.APIError as e:
+            return self._error_result(e)
+    
+    def _tool_request(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        system_prompt: Optional[str]
+    ) -> Dict[str, Any]:
+        """Build the messages.create arguments for a tool-use call."""
         messages = [{"role": "user", "content": prompt}]
         
         default_system = """You are a helpful coding assistant. You have access to tools that can:
@@ -47,54 +98,54 @@ class AgenticAnthropicClient:
 When you need to perform an action, use the appropriate tool. Be clear about what you're doing and why.
 Always explain your actions before using tools."""
 
-        try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                system=system_prompt or default_system,
-                tools=TOOL_DEFINITIONS,
-                messages=messages
-            )
-            
-            # Parse the response
-            response_text = ""
-            tool_proposals = []
-            
-            for block in response.content:
-                if block.type == "text":
-                    response_text += block.text
-                elif block.type == "tool_use":
-                    # Claude wants to use a tool - create a proposal
-                    tool_type = self._map_tool_name_to_type(block.name)
-                    proposal = ToolProposal(
-                        tool_id=block.id,
-                        tool_type=tool_type,
-                        description=self._generate_tool_description(block.name, block.input),
-                        parameters=block.input,
-                        requires_confirmation=True,
-                        risk_level=self._assess_risk(block.name, block.input)
-                    )
-                    tool_proposals.append(proposal)
-            
-            return {
-                "request_id": response.id,
-                "response_text": response_text,
-                "tool_proposals": [p.model_dump() for p in tool_proposals],
-                "requires_confirmation": len(tool_proposals) > 0,
-                "stop_reason": response.stop_reason,
-                "model": response.model,
-                "usage": response.usage.model_dump()
-            }
-            
-        except anthropic.APIError as e:
-            return {
-                "request_id": str(uuid.uuid4()),
-                "response_text": f"Error: {str(e)}",
-                "tool_proposals": [],
-                "requires_confirmation": False,
-                "error": str(e)
-            }
+        return {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "system": system_prompt or default_system,
+            "tools": TOOL_DEFINITIONS,
+            "messages": messages
+        }
+    
+    def _parse_tool_response(self, response: Any) -> Dict[str, Any]:
+        """Split a tool-use response into text and tool proposals."""
+        response_text = ""
+        tool_proposals = []
+        
+        for block in response.content:
+            if block.type == "text":
+                response_text += block.text
+            elif block.type == "tool_use":
+                # Claude wants to use a tool - create a proposal
+                tool_type = self._map_tool_name_to_type(block.name)
+                proposal = ToolProposal(
+                    tool_id=block.id,
+                    tool_type=tool_type,
+                    description=self._generate_tool_description(block.name, block.input),
+                    parameters=block.input,
+                    requires_confirmation=True,
+                    risk_level=self._assess_risk(block.name, block.input)
+                )
+                tool_proposals.append(proposal)
+        
+        return {
+            "request_id": response.id,
+            "response_text": response_text,
+            "tool_proposals": [p.model_dump() for p in tool_proposals],
+            "requires_confirmation": len(tool_proposals) > 0,
+            "stop_reason": response.stop_reason,
+            "model": response.model,
+            "usage": response.usage.model_dump()
+        }
+    
+    def _error_result(self, e: Exception) -> Dict[str, Any]:
+        return {
+            "request_id": str(uuid.uuid4()),
+            "response_text": f"Error: {str(e)}",
+            "tool_proposals": [],
+            "requires_confirmation": False,
+            "error": str(e)
+        }
     
     def continue_with_tool_results(
         self,
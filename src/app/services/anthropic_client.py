@@ -1,16 +1,37 @@
 import uuid
+import importlib.util
 import anthropic
 import openai
-from typing import Dict, Any, Protocol, Iterator, Generator
+import httpx
+from types import SimpleNamespace
+from typing import Dict, Any, Protocol, Iterator, Generator, AsyncGenerator, List, Union
 from src.app.config import Settings
 
 class AnthropicClientProtocol(Protocol):
+    """Blocking provider client; safe to iterate from worker threads."""
     def generate_text(self, prompt: str, model: str, max_tokens: int, temperature: float, tools: list = None) -> Dict[str, Any]:
         ...
     
     def stream_generate(self, prompt: str, model: str, max_tokens: int, temperature: float) -> Generator[str, None, None]:
         ...
 
+    def stream_with_tools(self, prompt: str, model: str, max_tokens: int, temperature: float, tools: list = None) -> Generator[Dict[str, Any], None, None]:
+        ...
+
+class AsyncAnthropicClientProtocol(Protocol):
+    """Event-loop provider client: the same methods, awaited / async-iterated."""
+    async def generate_text(self, prompt: str, model: str, max_tokens: int, temperature: float, tools: list = None) -> Dict[str, Any]:
+        ...
+
+    def stream_generate(self, prompt: str, model: str, max_tokens: int, temperature: float) -> AsyncGenerator[str, None]:
+        ...
+
+    def stream_with_tools(self, prompt: str, model: str, max_tokens: int, temperature: float, tools: list = None) -> AsyncGenerator[Dict[str, Any], None]:
+        ...
+
+# What get_anthropic_client may return; async-aware callers dispatch with inspect
+AnyAnthropicClient = Union[AnthropicClientProtocol, AsyncAnthropicClientProtocol]
+
 class MockAnthropicClient:
     """
     Mock client for local development and testing.
@@ -33,6 +54,52 @@ class MockAnthropicClient:
             time.sleep(0.1)  # Simulate delay
             yield word + " "
 
+    def stream_with_tools(self, prompt: str, model: str, max_tokens: int, temperature: float, tools: list = None) -> Generator[Dict[str, Any], None, None]:
+        """Mock tool-aware streaming - text events only, never proposes tools."""
+        output = f"MOCK: {prompt[:50]}..." if len(prompt) > 50 else f"MOCK: {prompt}"
+        for word in output.split(" "):
+            yield {"type": "text", "text": word + " "}
+
+class ToolCallAssembler:
+    """
+    Turns OpenAI streaming chunks into stream_with_tools events.
+    Tool calls arrive as fragments keyed by index; arguments are JSON split across chunks.
+    """
+    def __init__(self):
+        self.partial_calls: Dict[int, Dict[str, Any]] = {}
+
+    def feed(self, chunk: Any) -> List[Dict[str, Any]]:
+        events = []
+        if not chunk.choices:
+            return events
+        delta = chunk.choices[0].delta
+        if delta.content:
+            events.append({"type": "text", "text": delta.content})
+        for fragment in getattr(delta, "tool_calls", None) or []:
+            if not self.partial_calls:
+                events.append({"type": "tool_call_delta"})
+            call = self.partial_calls.setdefault(fragment.index, {"id": None, "name": "", "arguments": ""})
+            if fragment.id:
+                call["id"] = fragment.id
+            if fragment.function:
+                call["name"] += fragment.function.name or ""
+                call["arguments"] += fragment.function.arguments or ""
+        return events
+
+    def finish(self) -> List[Dict[str, Any]]:
+        if not self.partial_calls:
+            return []
+        return [{
+            "type": "tool_calls",
+            "tool_calls": [
+                SimpleNamespace(
+                    id=call["id"],
+                    function=SimpleNamespace(name=call["name"], arguments=call["arguments"])
+                )
+                for _, call in sorted(self.partial_calls.items())
+            ]
+        }]
+
 class RealAnthropicClient:
     """
     Real client wrapper for Anthropic API.
@@ -158,3 +225,206 @@ class RealAnthropicClient:
         except Exception as e:
             yield f"\n\n[Error: {str(e)}]"
 
+    def stream_with_tools(self, prompt: str, model: str, max_tokens: int, temperature: float, tools: list = None) -> Generator[Dict[str, Any], None, None]:
+        """
+        Stream a generation that may end in tool calls.
+
+        Yields event dicts:
+            {"type": "text", "text": str}        - a text delta, as soon as it arrives
+            {"type": "tool_call_delta"}          - once, when the first tool-call fragment shows up
+            {"type": "tool_calls", "tool_calls": [...]} - once, at the end, with the assembled calls
+
+        Assembled tool calls expose `.id`, `.function.name` and `.function.arguments`,
+        the same shape as the non-streaming `generate_text` result.
+        Errors are raised to the caller rather than folded into the text.
+        """
+        target_model = self._map_model(model)
+
+        # === OpenAI SDK (OpenRouter) ===
+        if self.client_type == "openai":
+            kwargs = {
+                "model": target_model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "stream": True
+            }
+            if tools:
+                kwargs["tools"] = tools
+                kwargs["tool_choice"] = "auto"
+
+            assembler = ToolCallAssembler()
+            stream = self.client.chat.completions.create(**kwargs)
+            for chunk in stream:
+                yield from assembler.feed(chunk)
+            yield from assembler.finish()
+            return
+
+        # === Anthropic SDK (Native/Z.AI) ===
+        # Tools are not wired for the native path yet (see generate_text), so this is text only.
+        with self.client.messages.stream(
+            model=target_model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=[{"role": "user", "content": prompt}]
+        ) as stream:
+            for text in stream.text_stream:
+                yield {"type": "text", "text": text}
+
+
+def create_pooled_http_client(
+    sdk: Any,
+    max_connections: int = 100,
+    max_keepalive_connections: int = 20,
+    keepalive_expiry: float = 30.0,
+    http2: bool = True
+) -> Any:
+    """
+    Build a bounded, keep-alive async HTTP client for an SDK module (anthropic or openai).
+    HTTP/2 is only enabled when the optional `h2` package is installed.
+    """
+    return sdk.DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        ),
+        http2=http2 and importlib.util.find_spec("h2") is not None
+    )
+
+class AsyncRealAnthropicClient:
+    """
+    Async client wrapper (AsyncAnthropic / AsyncOpenAI) with a pooled HTTP connection.
+    A single instance per provider is meant to be shared by the whole process,
+    so concurrent requests reuse the same bounded connection pool instead of
+    blocking the event loop on synchronous SDK calls.
+
+    Implements AsyncAnthropicClientProtocol, not AnthropicClientProtocol: its
+    pool is bound to the event loop, so blocking consumers (e.g. StreamingWorker)
+    use get_sync_anthropic_client instead.
+    """
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True
+    ):
+        self.base_url = base_url
+        self.api_key = api_key
+        pool = dict(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            http2=http2
+        )
+        
+        # Detect Client Type
+        if base_url and "openrouter" in base_url:
+            self.client_type = "openai"
+            self.client = openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=create_pooled_http_client(openai, **pool)
+            )
+        else:
+            self.client_type = "anthropic"
+            self.client = anthropic.AsyncAnthropic(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=create_pooled_http_client(anthropic, **pool)
+            )
+
+    _map_model = RealAnthropicClient._map_model
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections."""
+        await self.client.close()
+
+    async def generate_text(self, prompt: str, model: str, max_tokens: int, temperature: float, tools: list = None) -> Dict[str, Any]:
+        target_model = self._map_model(model)
+        
+        # === OpenAI SDK (OpenRouter) ===
+        if self.client_type == "openai":
+            kwargs = {
+                "model": target_model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": max_tokens,
+                "temperature": temperature
+            }
+            if tools:
+                kwargs["tools"] = tools
+                kwargs["tool_choice"] = "auto"
+
+            response = await self.client.chat.completions.create(**kwargs)
+            
+            message = response.choices[0].message
+            return {
+                "request_id": response.id,
+                "output": message.content,
+                "model": response.model,
+                "tool_calls": message.tool_calls if hasattr(message, 'tool_calls') else None,
+                "usage": {"input_tokens": 0, "output_tokens": 0},
+                "warnings": []
+            }
+
+        # === Anthropic SDK (Native/Z.AI) ===
+        response = await self.client.messages.create(
+            model=target_model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return {
+            "request_id": response.id,
+            "output": response.content[0].text,
+            "model": response.model,
+            "usage": response.usage.model_dump(),
+            "warnings": []
+        }
+
+    async def stream_generate(self, prompt: str, model: str, max_tokens: int, temperature: float) -> AsyncGenerator[str, None]:
+        try:
+            async for event in self.stream_with_tools(prompt, model, max_tokens, temperature):
+                if event["type"] == "text":
+                    yield event["text"]
+        except Exception as e:
+            yield f"\n\n[Error: {str(e)}]"
+
+    async def stream_with_tools(self, prompt: str, model: str, max_tokens: int, temperature: float, tools: list = None) -> AsyncGenerator[Dict[str, Any], None]:
+        """Async version of RealAnthropicClient.stream_with_tools (same event shapes)."""
+        target_model = self._map_model(model)
+
+        # === OpenAI SDK (OpenRouter) ===
+        if self.client_type == "openai":
+            kwargs = {
+                "model": target_model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "stream": True
+            }
+            if tools:
+                kwargs["tools"] = tools
+                kwargs["tool_choice"] = "auto"
+
+            assembler = ToolCallAssembler()
+            stream = await self.client.chat.completions.create(**kwargs)
+            async for chunk in stream:
+                for event in assembler.feed(chunk):
+                    yield event
+            for event in assembler.finish():
+                yield event
+            return
+
+        # === Anthropic SDK (Native/Z.AI) ===
+        async with self.client.messages.stream(
+            model=target_model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=[{"role": "user", "content": prompt}]
+        ) as stream:
+            async for text in stream.text_stream:
+                yield {"type": "text", "text": text}
@@ -0,0 +1,169 @@
+"""
+Response Cache - Reuses upstream generate_text results for identical, deterministic requests.
+
+Two tiers:
+- InMemoryLRUTier: per-process LRU with TTL and a byte budget.
+- RedisCacheTier: optional shared tier so replicas reuse each other's results.
+
+Only results without tool calls are cached; tool calls open a confirmation
+session and must always come from a fresh generation.
+"""
+
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple, Callable
+
+from src.app.observability import increment_cache_event
+
+logger = logging.getLogger(__name__)
+
+# Per-request fields (e.g. request_id) are never cached; a hit is a new request
+CACHED_FIELDS = ("output", "model", "usage")
+
+
+def make_cache_key(model: str, prompt: str, max_tokens: int, temperature: float, tools: Optional[List[Dict[str, Any]]] = None) -> str:
+    """
+    Build a cache key from everything that shapes the upstream response.
+    `model` should be the provider-mapped model and `prompt` the full prompt
+    (agent system prompt included).
+    """
+    tools_hash = hashlib.sha256(json.dumps(tools or [], sort_keys=True).encode("utf-8")).hexdigest()
+    material = json.dumps([model, prompt, max_tokens, temperature, tools_hash])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class InMemoryLRUTier:
+    """
+    Thread-safe LRU of serialized responses, bounded by entry count and total bytes.
+    Entries older than `ttl_seconds` are dropped on access.
+    """
+    name = "memory"
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 3600,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at <= self._clock():
+                self._remove(key)
+                increment_cache_event(self.name, "expired")
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def set(self, key: str, payload: bytes) -> None:
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self._clock() + self.ttl_seconds, payload)
+            self._bytes += len(payload)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                increment_cache_event(self.name, "eviction")
+
+    def _remove(self, key: str) -> None:
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+
+class RedisCacheTier:
+    """
+    Shared Redis tier. Expiry is delegated to Redis (SET ... EX).
+    Errors are logged and treated as misses so Redis never fails a request.
+    """
+    name = "redis"
+
+    def __init__(self, redis_url: Optional[str] = None, client: Any = None, ttl_seconds: int = 3600, prefix: str = "response_cache:"):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        if not self.client and redis_url:
+            # Safe import
+            try:
+                import redis
+                self.client = redis.Redis.from_url(redis_url)
+            except ImportError:
+                logger.warning("redis-py not installed. Redis response cache tier disabled.")
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.client:
+            return None
+        try:
+            return self.client.get(self.prefix + key)
+        except Exception as e:
+            logger.error(f"Response cache Redis get error: {e}")
+            return None
+
+    def set(self, key: str, payload: bytes) -> None:
+        if not self.client:
+            return
+        try:
+            self.client.set(self.prefix + key, payload, ex=self.ttl_seconds)
+        except Exception as e:
+            logger.error(f"Response cache Redis set error: {e}")
+
+
+class ResponseCache:
+    """
+    Read-through over the in-process tier, then the optional Redis tier.
+    Redis hits are copied into the local tier.
+    """
+    def __init__(self, local: InMemoryLRUTier, remote: Optional[RedisCacheTier] = None):
+        self.local = local
+        self.remote = remote
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        payload = self.local.get(key)
+        if payload is not None:
+            increment_cache_event(self.local.name, "hit")
+            return json.loads(payload)
+        increment_cache_event(self.local.name, "miss")
+
+        if self.remote is None:
+            return None
+        payload = self.remote.get(key)
+        if payload is None:
+            increment_cache_event(self.remote.name, "miss")
+            return None
+        increment_cache_event(self.remote.name, "hit")
+        self.local.set(key, payload)
+        return json.loads(payload)
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a generate_text result. Results carrying tool calls are skipped."""
+        if result.get("tool_calls"):
+            return
+        payload = json.dumps({field: result.get(field) for field in CACHED_FIELDS}).encode("utf-8")
+        self.local.set(key, payload)
+        if self.remote is not None:
+            self.remote.set(key, payload)
@@ -13,6 +13,7 @@ import logging
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 logger = logging.getLogger(__name__)
@@ -27,18 +28,21 @@ class S3Service:
         secret_access_key: str,
         bucket_name: str,
         region: str = "eu-north-1",
-        endpoint_url: Optional[str] = None
+        endpoint_url: Optional[str] = None,
+        max_pool_connections: int = 32
     ):
         self.bucket_name = bucket_name
         self.region = region
         
-        # Initialize S3 client
+        # Initialize S3 client. The client is shared by concurrent tool actions,
+        # so its connection pool must not be smaller than the tool engine's.
         self.client = boto3.client(
             's3',
             aws_access_key_id=access_key_id,
             aws_secret_access_key=secret_access_key,
             region_name=region,
-            endpoint_url=endpoint_url
+            endpoint_url=endpoint_url,
+            config=Config(max_pool_connections=max_pool_connections)
         )
         
         logger.info(f"S3Service initialized for bucket: {bucket_name}")
@@ -243,6 +247,7 @@ def get_s3_service() -> Optional[S3Service]:
         bucket = os.environ.get("S3_BUCKET_NAME")
         region = os.environ.get("AWS_REGION", "eu-north-1")
         endpoint = os.environ.get("S3_ENDPOINT")
+        max_pool_connections = int(os.environ.get("S3_MAX_POOL_CONNECTIONS", "32"))
         
         if not all([access_key, secret_key, bucket]):
             logger.warning("S3 credentials not configured")
@@ -253,7 +258,8 @@ def get_s3_service() -> Optional[S3Service]:
             secret_access_key=secret_key,
             bucket_name=bucket,
             region=region,
-            endpoint_url=endpoint
+            endpoint_url=endpoint,
+            max_pool_connections=max_pool_connections
         )
     
     return _s3_service
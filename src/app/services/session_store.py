@@ -0,0 +1,174 @@
+"""
+Session Store - Pending tool-confirmation sessions shared by the unified and agentic routers.
+
+Two backends:
+- InMemorySessionStore: per-process LRU with a TTL and an entry cap.
+- RedisSessionStore: shared across workers and replicas, so a confirm can land
+  on any process.
+
+Sessions are stored as compact JSON, so both backends hand out copies and
+callers must `set` a session again after changing it. A session expires
+`ttl_seconds` after it was last read or written.
+"""
+
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Callable
+
+from starlette.concurrency import run_in_threadpool
+
+from src.app.observability import increment_session_event
+
+logger = logging.getLogger(__name__)
+
+Session = Dict[str, Any]
+
+
+def dump_session(session: Session) -> bytes:
+    return json.dumps(session, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def load_session(payload: Any) -> Session:
+    return json.loads(payload)
+
+
+class SessionStore:
+    """Interface for session backends. `blocking` backends do network I/O."""
+    name = "base"
+    blocking = False
+
+    def get(self, session_id: str) -> Optional[Session]:
+        raise NotImplementedError
+
+    def set(self, session_id: str, session: Session) -> None:
+        raise NotImplementedError
+
+    def pop(self, session_id: str) -> Optional[Session]:
+        """Atomically read and delete, so a session is consumed at most once."""
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> bool:
+        return self.pop(session_id) is not None
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Thread-safe LRU of serialized sessions, bounded by `max_entries`.
+    Reads and writes move a session to the end and push its expiry out, so the
+    least recently used session is both the first evicted and the first to
+    expire; expired sessions are swept from the front on every write.
+    """
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            payload = self._take(session_id)
+            if payload is None:
+                return None
+            self._entries[session_id] = (self._clock() + self.ttl_seconds, payload)
+        return load_session(payload)
+
+    def set(self, session_id: str, session: Session) -> None:
+        payload = dump_session(session)
+        with self._lock:
+            now = self._clock()
+            self._sweep(now)
+            if self._entries.pop(session_id, None) is None:
+                increment_session_event(self.name, "created")
+            self._entries[session_id] = (now + self.ttl_seconds, payload)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                increment_session_event(self.name, "evicted")
+
+    def pop(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            payload = self._take(session_id)
+        return load_session(payload) if payload is not None else None
+
+    def _take(self, session_id: str) -> Optional[bytes]:
+        """Remove and return a live session's payload (caller holds the lock)."""
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            increment_session_event(self.name, "miss")
+            return None
+        expires_at, payload = entry
+        if expires_at <= self._clock():
+            increment_session_event(self.name, "expired")
+            return None
+        return payload
+
+    def _sweep(self, now: float) -> None:
+        while self._entries:
+            session_id, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[session_id]
+            increment_session_event(self.name, "expired")
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Shared Redis backend. Expiry is delegated to Redis (SET ... EX, refreshed
+    with EXPIRE on read), so expirations show up as "miss" events here.
+    `pop` uses GETDEL, so two workers cannot both consume one confirmation.
+    """
+    name = "redis"
+    blocking = True
+
+    def __init__(self, redis_url: Optional[str] = None, client: Any = None, ttl_seconds: int = 3600, prefix: str = "session:"):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        if not self.client and redis_url:
+            # Safe import
+            try:
+                import redis
+                self.client = redis.Redis.from_url(redis_url)
+            except ImportError:
+                logger.warning("redis-py not installed. Sessions cannot be stored in Redis.")
+
+    def _check_client(self):
+        if not self.client:
+            raise RuntimeError("Redis client not initialized. Install 'redis' package or inject a client.")
+
+    def get(self, session_id: str) -> Optional[Session]:
+        self._check_client()
+        pipe = self.client.pipeline()
+        pipe.get(self.prefix + session_id)
+        pipe.expire(self.prefix + session_id, self.ttl_seconds)
+        payload, _ = pipe.execute()
+        return self._loaded(payload)
+
+    def set(self, session_id: str, session: Session) -> None:
+        self._check_client()
+        self.client.set(self.prefix + session_id, dump_session(session), ex=self.ttl_seconds)
+
+    def pop(self, session_id: str) -> Optional[Session]:
+        self._check_client()
+        return self._loaded(self.client.getdel(self.prefix + session_id))
+
+    def _loaded(self, payload: Any) -> Optional[Session]:
+        if payload is None:
+            increment_session_event(self.name, "miss")
+            return None
+        return load_session(payload)
+
+
+async def session_call(store: SessionStore, fn: Callable, *args):
+    """Run a session store operation; Redis-backed stores go through the threadpool."""
+    if not store.blocking:
+        return fn(*args)
+    return await run_in_threadpool(fn, *args)
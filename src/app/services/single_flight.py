@@ -0,0 +1,124 @@
+"""
+Single-Flight - Coalesces concurrent identical upstream calls.
+
+The first caller for a key starts the upstream work; callers arriving while
+it is in flight share the same result (or, for streams, the same token
+stream, replayed from the start). Nothing is kept once the call finishes,
+so this complements the response cache rather than replacing it.
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from src.app.observability import increment_single_flight
+
+logger = logging.getLogger(__name__)
+
+
+class SharedStream:
+    """
+    Pumps one upstream event stream into a buffer that any number of
+    subscribers replay and follow. The upstream is cancelled once the last
+    subscriber leaves.
+    """
+    def __init__(self, source: AsyncIterator[Dict[str, Any]], on_done: Callable[["SharedStream"], None]):
+        self.events: List[Dict[str, Any]] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._on_done = on_done
+        self._cond = asyncio.Condition()
+        self._task = asyncio.ensure_future(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[Dict[str, Any]]) -> None:
+        try:
+            async for event in source:
+                async with self._cond:
+                    self.events.append(event)
+                    self._cond.notify_all()
+        except asyncio.CancelledError:
+            self.error = RuntimeError("Upstream stream cancelled")
+        except Exception as e:
+            self.error = e
+        finally:
+            self._on_done(self)
+            async with self._cond:
+                self.done = True
+                self._cond.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[Dict[str, Any]]:
+        self.subscribers += 1
+        position = 0
+        try:
+            while True:
+                async with self._cond:
+                    await self._cond.wait_for(lambda: position < len(self.events) or self.done)
+                    batch = self.events[position:]
+                    position = len(self.events)
+                    finished = self.done
+                for event in batch:
+                    yield event
+                if finished:
+                    if self.error:
+                        raise self.error
+                    return
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                self._task.cancel()
+
+
+class SingleFlight:
+    """
+    Per-process registry of in-flight upstream calls, keyed by request identity
+    (see response_cache.make_cache_key). Entries belong to the event loop that
+    created them.
+    """
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._streams: Dict[str, SharedStream] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await `fn()` once per key. Concurrent callers with the same key get the
+        same result or exception. A cancelled caller does not cancel the call
+        for the others.
+        """
+        task = self._calls.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            increment_single_flight("generate", "follower")
+        else:
+            increment_single_flight("generate", "leader")
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._call_done(key, t))
+        return await asyncio.shield(task)
+
+    def stream(self, key: str, factory: Callable[[], AsyncIterator[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Subscribe to the in-flight stream for `key`, starting `factory()` if none
+        is running. Followers replay every event the leader has seen so far.
+        """
+        shared = self._streams.get(key)
+        if shared is not None and not shared.done and shared._task.get_loop() is asyncio.get_running_loop():
+            increment_single_flight("stream", "follower")
+        else:
+            increment_single_flight("stream", "leader")
+            shared = SharedStream(factory(), on_done=lambda s: self._forget(self._streams, key, s))
+            self._streams[key] = shared
+        return shared.subscribe()
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    def _call_done(self, key: str, task: asyncio.Future) -> None:
+        self._forget(self._calls, key, task)
+        if not task.cancelled():
+            # Mark the exception as retrieved; every waiting caller re-raises it via shield()
+            task.exception()
+
+    @staticmethod
+    def _forget(registry: Dict[str, Any], key: str, entry: Any) -> None:
+        if registry.get(key) is entry:
+            del registry[key]
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from src.app.observability import increment_sse_backpressure
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_TYPES = ("done", "error", "cancelled")
+
+class CoalescingBuffer:
+    """
+    Bounded per-connection buffer between the broker subscription and a slow SSE client.
+
+    When full:
+        - chunk messages are merged into the newest buffered chunk (tokens
+          concatenated, seq advanced), so no text is lost and `id:` stays resumable;
+        - other non-terminal messages are dropped;
+        - terminal messages (done/error/cancelled) are always buffered.
+
+    Not thread-safe; owned by a single event loop.
+    """
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._items: Deque[Dict[str, Any]] = deque()
+        self._ready = asyncio.Event()
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, message: Dict[str, Any]) -> None:
+        if len(self._items) >= self.max_size and message.get("type") not in TERMINAL_TYPES:
+            tail = self._items[-1]
+            if message.get("type") == "chunk" and tail.get("type") == "chunk":
+                self._items[-1] = {**tail, **message, "token": tail.get("token", "") + message.get("token", "")}
+                increment_sse_backpressure("coalesced")
+            else:
+                increment_sse_backpressure("dropped")
+            return
+        self._items.append(message)
+        self._ready.set()
+
+    def close(self) -> None:
+        """No more messages will be put; `get` returns None once drained."""
+        self._closed = True
+        self._ready.set()
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        """Wait for the next message. Safe to cancel (e.g., from asyncio.wait_for)."""
+        while not self._items and not self._closed:
+            self._ready.clear()
+            await self._ready.wait()
+        if self._items:
+            return self._items.popleft()
+        return None
@@ -1,69 +1,123 @@
+import asyncio
 import logging
 import json
-from typing import Optional, Any, Iterator, Dict
+import time
+from typing import Optional, Any, Iterator, AsyncIterator, Dict, List
 
 logger = logging.getLogger(__name__)
 
 class Broker:
     """
-    Abstracts a Pub/Sub broker (e.g., Redis).
+    Abstracts a message broker (e.g., Redis).
     Allows publishing messages to channels and subscribing to them.
+
+    Two modes:
+        - Streams (Redis Streams): every message is XADDed to a capped stream per
+          channel, so late joiners and reconnecting clients can replay from any
+          point. Used when the broker builds its own Redis client from `url`,
+          or when `use_streams=True`.
+        - Pass-through: publish/subscribe are delegated to the injected client
+          (e.g., a pub/sub fake), for simple tests.
+
+    Stream entry IDs:
+        Messages carrying an integer `seq` are added with the explicit ID
+        `{attempt}-{seq}` (attempt 0 when the message has none), so the SSE event
+        id is directly a stream cursor. A redelivered job restarts its seq at 1
+        under a higher attempt, which sorts after everything the earlier attempt
+        wrote instead of colliding with it. Messages without `seq` (e.g., control
+        messages) get auto-generated IDs.
+
+    Async subscriptions (`asubscribe`) use a redis.asyncio client when one is
+    available; with a sync client each read runs in a worker thread.
     """
-    def __init__(self, url: Optional[str] = None, client: Optional[Any] = None):
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        client: Optional[Any] = None,
+        use_streams: Optional[bool] = None,
+        stream_maxlen: int = 10000,
+        stream_ttl_seconds: int = 3600,
+        block_ms: int = 5000,
+        idle_timeout: float = 300.0,
+        async_client: Optional[Any] = None,
+        poll_interval: float = 0.05
+    ):
         """
         Initialize the broker.
-        
+
         Args:
             url: Connection URL (e.g., redis://localhost:6379).
             client: Optional injected client (e.g., redis.Redis or a fake).
+            use_streams: Force Redis Streams mode on/off. Defaults to on when
+                the client is created from `url`, off for injected clients.
+            stream_maxlen: Approximate MAXLEN per channel stream.
+            stream_ttl_seconds: Expiry of a channel stream after its last write.
+            block_ms: How long a single XREAD blocks waiting for new entries.
+            idle_timeout: Stop a subscription after this many seconds without messages.
+            async_client: Optional injected asyncio client (e.g., redis.asyncio.Redis).
+            poll_interval: Sleep between non-blocking reads when `asubscribe`
+                only has a sync client.
         """
         self.url = url
         self.client = client
-        
-        # In a real implementation, we might initialize the redis client here if not provided.
-        # Example:
-        # if not self.client and self.url:
-        #     try:
-        #         import redis
-        #         self.client = redis.from_url(self.url)
-        #     except ImportError:
-        #         logger.warning("redis-py not installed.")
+        self.stream_maxlen = stream_maxlen
+        self.stream_ttl_seconds = stream_ttl_seconds
+        self.block_ms = block_ms
+        self.idle_timeout = idle_timeout
+        self.async_client = async_client
+        self.poll_interval = poll_interval
+
+        created_client = False
+        if not self.client and self.url:
+            try:
+                import redis
+                import redis.asyncio
+                self.client = redis.from_url(self.url)
+                self.async_client = self.async_client or redis.asyncio.from_url(self.url)
+                created_client = True
+            except ImportError:
+                logger.warning("redis-py not installed.")
+
+        self.use_streams = created_client if use_streams is None else use_streams
 
     def publish(self, channel: str, message: Dict[str, Any]) -> None:
         """
         Publish a message to a channel.
+        In streams mode a failed XADD is raised: subscribers replay the stream
+        by ID, so a silently missing entry would be a gap nobody notices.
         """
         payload = json.dumps(message)
         if self.client:
             try:
-                # Real Redis usage:
-                # self.client.publish(channel, payload)
-                
+                if self.use_streams:
+                    self._xadd(channel, message, payload)
                 # For testing with fakes that might expect a dict or string:
-                if hasattr(self.client, "publish"):
+                elif hasattr(self.client, "publish"):
                     self.client.publish(channel, payload)
             except Exception as e:
                 logger.error(f"Broker publish error: {e}")
+                if self.use_streams:
+                    raise
         else:
             # No-op or log if no client configured
             logger.debug(f"Mock publish to {channel}: {payload}")
 
-    def subscribe(self, channel: str) -> Iterator[Dict[str, Any]]:
+    def subscribe(self, channel: str, last_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
         """
         Subscribe to a channel and yield messages.
         This is a generator that yields parsed dictionaries.
+
+        Args:
+            last_id: In streams mode, replay only messages after this ID
+                (a seq such as an SSE Last-Event-ID, or a raw stream ID).
+                None replays the channel from the beginning.
         """
         if self.client:
             try:
-                # Real Redis usage:
-                # pubsub = self.client.pubsub()
-                # pubsub.subscribe(channel)
-                # for message in pubsub.listen():
-                #     if message["type"] == "message":
-                #         yield json.loads(message["data"])
-                
+                if self.use_streams:
+                    yield from self._xread(channel, last_id)
                 # For testing with fakes:
-                if hasattr(self.client, "subscribe"):
+                elif hasattr(self.client, "subscribe"):
                     yield from self.client.subscribe(channel)
             except Exception as e:
                 logger.error(f"Broker subscribe error: {e}")
@@ -71,21 +125,136 @@ class Broker:
             # Yield nothing if no client
             return
 
+    async def asubscribe(self, channel: str, last_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async variant of `subscribe` for event-loop consumers (e.g., the SSE endpoint).
+        Waiting for messages never ties up a worker thread.
+        """
+        if self.client:
+            try:
+                if self.use_streams:
+                    async for message in self._axread(channel, last_id):
+                        yield message
+                # Pass-through clients are in-memory fakes that never block
+                elif hasattr(self.client, "subscribe"):
+                    for message in self.client.subscribe(channel):
+                        yield message
+            except Exception as e:
+                logger.error(f"Broker subscribe error: {e}")
+        else:
+            return
+
     def unsubscribe(self, channel: str) -> None:
         """
         Unsubscribe from a channel.
         """
-        if self.client:
+        if self.client and not self.use_streams:
             try:
-                # Real Redis usage:
-                # pubsub.unsubscribe(channel) (requires keeping track of pubsub instance)
-                # For this simple abstraction, we assume the generator exit handles cleanup
-                # or the underlying client handles it.
+                # Stream readers hold no server-side subscription; closing the
+                # generator is enough. Pass-through clients may track channels.
                 if hasattr(self.client, "unsubscribe"):
                     self.client.unsubscribe(channel)
             except Exception as e:
                 logger.error(f"Broker unsubscribe error: {e}")
 
+    def consume(self, channel: str, group: str, consumer: str) -> Iterator[Dict[str, Any]]:
+        """
+        Consume a channel through a Redis Streams consumer group (streams mode only).
+        Each entry is delivered to one consumer of the group and XACKed once the
+        caller asks for the next message, so a consumer that dies mid-message
+        leaves it pending for the group.
+        """
+        if not (self.client and self.use_streams):
+            return
+        try:
+            self.client.xgroup_create(channel, group, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                logger.error(f"Broker consumer group error: {e}")
+                return
+
+        idle_since = time.monotonic()
+        while True:
+            response = self.client.xreadgroup(group, consumer, {channel: ">"}, count=100, block=self.block_ms)
+            if not response:
+                if time.monotonic() - idle_since >= self.idle_timeout:
+                    return
+                continue
+            idle_since = time.monotonic()
+            for _, entries in response:
+                for entry_id, fields in entries:
+                    yield self._decode(fields)
+                    self.client.xack(channel, group, entry_id)
+
+    def ack(self, channel: str, subscriber_id: str, seq: int) -> None:
+        """
+        Record the last seq delivered to a subscriber (streams mode only).
+        Producers compare it with what they published to measure subscriber lag.
+        """
+        if not (self.client and self.use_streams):
+            return
+        try:
+            key = self._acks_key(channel)
+            pipe = self.client.pipeline()
+            pipe.hset(key, subscriber_id, seq)
+            pipe.expire(key, self.stream_ttl_seconds)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Broker ack error: {e}")
+
+    async def aack(self, channel: str, subscriber_id: str, seq: int) -> None:
+        """Async variant of `ack` for event-loop callers."""
+        if not (self.client and self.use_streams):
+            return
+        if self.async_client is not None:
+            try:
+                key = self._acks_key(channel)
+                pipe = self.async_client.pipeline()
+                pipe.hset(key, subscriber_id, seq)
+                pipe.expire(key, self.stream_ttl_seconds)
+                await pipe.execute()
+            except Exception as e:
+                logger.error(f"Broker ack error: {e}")
+        else:
+            await asyncio.to_thread(self.ack, channel, subscriber_id, seq)
+
+    def release(self, channel: str, subscriber_id: str) -> None:
+        """Forget a subscriber's ack position once it disconnects."""
+        if not (self.client and self.use_streams):
+            return
+        try:
+            self.client.hdel(self._acks_key(channel), subscriber_id)
+        except Exception as e:
+            logger.error(f"Broker release error: {e}")
+
+    async def arelease(self, channel: str, subscriber_id: str) -> None:
+        """Async variant of `release` for event-loop callers."""
+        if not (self.client and self.use_streams):
+            return
+        if self.async_client is not None:
+            try:
+                await self.async_client.hdel(self._acks_key(channel), subscriber_id)
+            except Exception as e:
+                logger.error(f"Broker release error: {e}")
+        else:
+            await asyncio.to_thread(self.release, channel, subscriber_id)
+
+    def subscriber_lag(self, channel: str, seq: int) -> Optional[int]:
+        """
+        How many messages the slowest subscriber is behind `seq`.
+        None when lag is not tracked (pass-through mode) or nobody has acked yet.
+        """
+        if not (self.client and self.use_streams):
+            return None
+        try:
+            acked = self.client.hvals(self._acks_key(channel))
+        except Exception as e:
+            logger.error(f"Broker lag error: {e}")
+            return None
+        if not acked:
+            return None
+        return max(0, seq - min(int(value) for value in acked))
+
     def publish_control(self, request_id: str, message: Dict[str, Any]) -> None:
         """
         Publish a control message (e.g., cancel command).
@@ -97,6 +266,83 @@ class Broker:
     def listen_control(self, request_id: str) -> Iterator[Dict[str, Any]]:
         """
         Listen for control messages for a specific request.
+        In streams mode, control messages sent before the listener started are replayed.
         """
         channel = f"control:request:{request_id}"
         yield from self.subscribe(channel)
+
+    # ------------------------------------------------------------------------
+    # Redis Streams
+    # ------------------------------------------------------------------------
+    @staticmethod
+    def stream_id(message: Dict[str, Any]) -> Optional[str]:
+        """The explicit stream entry ID of a sequenced message, else None."""
+        seq = message.get("seq")
+        if not (isinstance(seq, int) and seq > 0):
+            return None
+        return f"{int(message.get('attempt') or 0)}-{seq}"
+
+    def _xadd(self, channel: str, message: Dict[str, Any], payload: str) -> None:
+        entry_id = self.stream_id(message) or "*"
+
+        # One round trip: append (capped) and refresh the stream's expiry
+        pipe = self.client.pipeline()
+        pipe.xadd(channel, {"data": payload}, id=entry_id, maxlen=self.stream_maxlen, approximate=True)
+        pipe.expire(channel, self.stream_ttl_seconds)
+        pipe.execute()
+
+    def _xread(self, channel: str, last_id: Optional[str]) -> Iterator[Dict[str, Any]]:
+        cursor = self._cursor(last_id)
+        idle_since = time.monotonic()
+        while True:
+            response = self.client.xread({channel: cursor}, count=100, block=self.block_ms)
+            if not response:
+                if time.monotonic() - idle_since >= self.idle_timeout:
+                    return
+                continue
+            idle_since = time.monotonic()
+            for entry_id, message in self._entries(response):
+                cursor = entry_id
+                yield message
+
+    async def _axread(self, channel: str, last_id: Optional[str]) -> AsyncIterator[Dict[str, Any]]:
+        cursor = self._cursor(last_id)
+        idle_since = time.monotonic()
+        while True:
+            if self.async_client is not None:
+                response = await self.async_client.xread({channel: cursor}, count=100, block=self.block_ms)
+            else:
+                response = await asyncio.to_thread(self.client.xread, {channel: cursor}, count=100)
+                if not response:
+                    await asyncio.sleep(self.poll_interval)
+            if not response:
+                if time.monotonic() - idle_since >= self.idle_timeout:
+                    return
+                continue
+            idle_since = time.monotonic()
+            for entry_id, message in self._entries(response):
+                cursor = entry_id
+                yield message
+
+    @classmethod
+    def _entries(cls, response: List[Any]) -> Iterator[Any]:
+        for _, entries in response:
+            for entry_id, fields in entries:
+                yield (entry_id.decode() if isinstance(entry_id, bytes) else entry_id), cls._decode(fields)
+
+    @staticmethod
+    def _acks_key(channel: str) -> str:
+        return f"{channel}:acks"
+
+    @staticmethod
+    def _cursor(last_id: Optional[str]) -> str:
+        if not last_id:
+            return "0-0"
+        if last_id.isdigit():
+            return f"0-{last_id}"
+        return last_id
+
+    @staticmethod
+    def _decode(fields: Dict[Any, Any]) -> Dict[str, Any]:
+        data = fields.get(b"data", fields.get("data"))
+        return json.loads(data)
@@ -1,14 +1,31 @@
 import json
+import time
+import threading
 from collections import deque
-from typing import Dict, Any, Iterator, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from src.app.streaming.lifecycle import CancellationToken
 
+def _parse_stream_id(entry_id: str) -> Tuple[int, int]:
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
 class FakeBroker:
     """
     In-memory fake broker for testing.
+
+    Besides the simple pub/sub methods, it implements the subset of Redis
+    Streams commands used by Broker in streams mode (XADD with MAXLEN, XREAD,
+    consumer groups, hashes, EXPIRE, pipelines). Blocking reads wait on a condition
+    so publishers in other threads wake them up.
     """
     def __init__(self):
         self.channels: Dict[str, deque] = {}
+        self.streams: Dict[str, List[Tuple[str, Dict[str, str]]]] = {}
+        self.groups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.expiries: Dict[str, int] = {}
+        self.hashes: Dict[str, Dict[str, str]] = {}
+        self.xadd_calls = 0
+        self._cond = threading.Condition()
 
     def publish(self, channel: str, message: str) -> None:
         if channel not in self.channels:
@@ -27,6 +44,115 @@ class FakeBroker:
     def unsubscribe(self, channel: str) -> None:
         pass
 
+    # --- Redis Streams subset -------------------------------------------------
+    def xadd(self, name: str, fields: Dict[str, str], id: str = "*", maxlen: Optional[int] = None, approximate: bool = True) -> str:
+        with self._cond:
+            self.xadd_calls += 1
+            entries = self.streams.setdefault(name, [])
+            last = _parse_stream_id(entries[-1][0]) if entries else (0, 0)
+            if id == "*":
+                ms = max(int(time.time() * 1000), last[0])
+                new_id = (ms, last[1] + 1 if ms == last[0] else 0)
+            else:
+                new_id = _parse_stream_id(id)
+                if new_id <= last:
+                    raise ValueError("ERR The ID specified in XADD is equal or smaller than the target stream top item")
+            entry_id = f"{new_id[0]}-{new_id[1]}"
+            entries.append((entry_id, dict(fields)))
+            if maxlen is not None and len(entries) > maxlen:
+                del entries[:len(entries) - maxlen]
+            self._cond.notify_all()
+            return entry_id
+
+    def xread(self, streams: Dict[str, str], count: Optional[int] = None, block: Optional[int] = None) -> List[Any]:
+        deadline = time.monotonic() + (block or 0) / 1000
+        with self._cond:
+            while True:
+                response = []
+                for name, cursor in streams.items():
+                    after = _parse_stream_id(cursor)
+                    entries = [e for e in self.streams.get(name, []) if _parse_stream_id(e[0]) > after]
+                    if entries:
+                        response.append((name, entries[:count] if count else entries))
+                remaining = deadline - time.monotonic()
+                if response or not block or remaining <= 0:
+                    return response
+                self._cond.wait(remaining)
+
+    def xgroup_create(self, name: str, groupname: str, id: str = "$", mkstream: bool = False) -> bool:
+        with self._cond:
+            if (name, groupname) in self.groups:
+                raise ValueError("BUSYGROUP Consumer Group name already exists")
+            entries = self.streams.setdefault(name, []) if mkstream else self.streams[name]
+            start = entries[-1][0] if (id == "$" and entries) else ("0-0" if id == "$" else id)
+            self.groups[(name, groupname)] = {"last": start, "pending": {}}
+            return True
+
+    def xreadgroup(self, groupname: str, consumername: str, streams: Dict[str, str], count: Optional[int] = None, block: Optional[int] = None) -> List[Any]:
+        deadline = time.monotonic() + (block or 0) / 1000
+        with self._cond:
+            while True:
+                response = []
+                for name in streams:
+                    group = self.groups[(name, groupname)]
+                    after = _parse_stream_id(group["last"])
+                    entries = [e for e in self.streams.get(name, []) if _parse_stream_id(e[0]) > after]
+                    if count:
+                        entries = entries[:count]
+                    if entries:
+                        group["last"] = entries[-1][0]
+                        for entry_id, _ in entries:
+                            group["pending"][entry_id] = consumername
+                        response.append((name, entries))
+                remaining = deadline - time.monotonic()
+                if response or not block or remaining <= 0:
+                    return response
+                self._cond.wait(remaining)
+
+    def xack(self, name: str, groupname: str, *ids: str) -> int:
+        with self._cond:
+            pending = self.groups[(name, groupname)]["pending"]
+            return sum(1 for entry_id in ids if pending.pop(entry_id, None) is not None)
+
+    def hset(self, name: str, key: str, value: Any) -> int:
+        fields = self.hashes.setdefault(name, {})
+        added = 0 if key in fields else 1
+        fields[key] = str(value)
+        return added
+
+    def hdel(self, name: str, *keys: str) -> int:
+        fields = self.hashes.get(name, {})
+        return sum(1 for key in keys if fields.pop(key, None) is not None)
+
+    def hvals(self, name: str) -> List[str]:
+        return list(self.hashes.get(name, {}).values())
+
+    def expire(self, name: str, time: int) -> bool:
+        self.expiries[name] = time
+        return True
+
+    def pipeline(self) -> "FakePipeline":
+        return FakePipeline(self)
+
+class FakePipeline:
+    """
+    Buffers FakeBroker commands and runs them on execute(), like a redis-py pipeline.
+    """
+    def __init__(self, broker: FakeBroker):
+        self.broker = broker
+        self.commands: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self) -> List[Any]:
+        results = [getattr(self.broker, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
 class FakeAnthropicStreamer:
     """
     Fake Anthropic client that yields deterministic tokens.
@@ -62,7 +188,7 @@ class FakeStreamingWorker:
         self.broker = broker
         self.cancel_coord = cancel_coord
 
-    async def process_request(self, request_id: str, prompt: str, model: str, stream: bool = True):
+    async def process_request(self, request_id: str, prompt: str, model: str, stream: bool = True, attempt: int = 1):
         # Check cancellation
         token = self.cancel_coord.get_or_create_token(request_id)
         if token.is_cancelled():
@@ -1,19 +1,31 @@
+import asyncio
 import json
 import logging
 import uuid
-from typing import Iterator
-from fastapi import Depends
+from typing import AsyncIterator, Dict, Any, Optional
+from fastapi import Depends, Header
 from fastapi.responses import StreamingResponse
+from src.app.config import Settings
+from src.app.dependencies import get_settings
 from src.app.streaming.broker import Broker
+from src.app.streaming.backpressure import CoalescingBuffer, TERMINAL_TYPES
 from src.app.streaming.lifecycle import ConnectionManager
 from src.app.streaming.cancellation import CancellationCoordinator
 
 # Global Singletons (In a real app, use dependency injection framework)
 _connection_manager = ConnectionManager()
 _cancellation_coordinator = CancellationCoordinator()
+_broker: Optional[Broker] = None
 
-def get_broker() -> Broker:
-    return Broker()
+def get_broker(settings: Settings = Depends(get_settings)) -> Broker:
+    global _broker
+    if _broker is None:
+        _broker = Broker(
+            url=settings.BROKER_REDIS_URL,
+            stream_maxlen=settings.BROKER_STREAM_MAXLEN,
+            stream_ttl_seconds=settings.BROKER_STREAM_TTL_SECONDS
+        )
+    return _broker
 
 def get_connection_manager() -> ConnectionManager:
     return _connection_manager
@@ -23,32 +35,102 @@ def get_cancellation_coordinator() -> CancellationCoordinator:
 
 logger = logging.getLogger(__name__)
 
-def sse_stream(
+def format_sse(message: Dict[str, Any]) -> str:
+    """
+    Format a broker message as an SSE event. The event id is the message's
+    stream ID (`{attempt}-{seq}`) when it has an attempt, else just `seq`.
+    """
+    if message.get("attempt") and "seq" in message:
+        event_id = f"id: {Broker.stream_id(message)}\n"
+    else:
+        event_id = f"id: {message['seq']}\n" if "seq" in message else ""
+    return f"{event_id}data: {json.dumps(message)}\n\n"
+
+async def sse_events(
+    broker: Broker,
+    channel: str,
+    last_event_id: Optional[str] = None,
+    heartbeat_interval: float = 15.0,
+    buffer_size: int = 256,
+    subscriber_id: Optional[str] = None,
+    ack_interval: float = 0.25
+) -> AsyncIterator[str]:
+    """
+    Yield SSE frames for a channel until a terminal message arrives.
+
+    A background task moves broker messages into a bounded CoalescingBuffer, so
+    a slow client never stalls the subscription. A heartbeat comment is sent
+    whenever nothing arrives for `heartbeat_interval` seconds, which keeps
+    proxies and load balancers from closing idle connections.
+
+    With a `subscriber_id`, the seq delivered to the client is acked to the
+    broker at most every `ack_interval` seconds so the worker can see real lag.
+    """
+    buffer = CoalescingBuffer(buffer_size)
+
+    async def pump() -> None:
+        try:
+            async for message in broker.asubscribe(channel, last_id=last_event_id):
+                buffer.put(message)
+                if message.get("type") in TERMINAL_TYPES:
+                    break
+        finally:
+            buffer.close()
+
+    reader = asyncio.ensure_future(pump())
+    loop = asyncio.get_running_loop()
+    last_ack = 0.0
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(buffer.get(), heartbeat_interval)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            if message is None:
+                break
+            yield format_sse(message)
+            terminal = message.get("type") in TERMINAL_TYPES
+            if subscriber_id and "seq" in message and (terminal or loop.time() - last_ack >= ack_interval):
+                last_ack = loop.time()
+                await broker.aack(channel, subscriber_id, message["seq"])
+            # Stop stream if we see a terminal message
+            if terminal:
+                break
+    finally:
+        reader.cancel()
+
+async def sse_stream(
     request_id: str, 
+    last_event_id: Optional[str] = Header(None),
     broker: Broker = Depends(get_broker),
     conn_manager: ConnectionManager = Depends(get_connection_manager),
-    cancel_coord: CancellationCoordinator = Depends(get_cancellation_coordinator)
+    cancel_coord: CancellationCoordinator = Depends(get_cancellation_coordinator),
+    settings: Settings = Depends(get_settings)
 ) -> StreamingResponse:
     """
     SSE Endpoint that subscribes to a request channel and streams events to the client.
     Handles lifecycle registration and cancellation on disconnect.
+    A reconnecting client's Last-Event-ID resumes the stream after that event.
+    Runs on the event loop, so open streams do not hold threadpool threads.
     """
     channel = f"request:{request_id}"
     connection_id = str(uuid.uuid4())
     
-    def event_generator() -> Iterator[str]:
+    async def event_generator() -> AsyncIterator[str]:
         try:
             # Register connection
             conn_manager.register(request_id, connection_id)
             
-            # Subscribe to the broker channel
-            for message in broker.subscribe(channel):
-                yield f"data: {json.dumps(message)}\n\n"
-                
-                # Stop stream if we see a terminal message
-                msg_type = message.get("type")
-                if msg_type in ("done", "error", "cancelled"):
-                    break
+            async for frame in sse_events(
+                broker,
+                channel,
+                last_event_id=last_event_id,
+                heartbeat_interval=settings.SSE_HEARTBEAT_SECONDS,
+                buffer_size=settings.SSE_BUFFER_SIZE,
+                subscriber_id=connection_id
+            ):
+                yield frame
                     
         except Exception as e:
             logger.error(f"SSE stream error for {request_id}: {e}")
@@ -56,10 +138,15 @@ def sse_stream(
         finally:
             # Cleanup
             broker.unsubscribe(channel)
+            await broker.arelease(channel, connection_id)
             conn_manager.unregister(request_id, connection_id)
             
             # Check if we should cancel the backend work
             if conn_manager.cancel_request_if_no_subscribers(request_id):
                 cancel_coord.cancel(request_id)
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
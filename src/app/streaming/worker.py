@@ -1,25 +1,78 @@
+import inspect
 import logging
+import queue
+import threading
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 from src.app.streaming.broker import Broker
+from src.app.observability import observe_stream_flush
+from src.app.logging.redaction import StreamRedactor
 
 logger = logging.getLogger(__name__)
 
+_END = object()
+
 class StreamingWorker:
     """
     Worker that handles generation requests, streams tokens from Anthropic,
     and publishes them to the Broker.
+
+    Micro-batching:
+        Tokens are coalesced into one chunk message per flush instead of one
+        publish per token. A flush happens once `flush_bytes` of text are pending
+        or `flush_interval_ms` has passed since the previous flush, whichever comes
+        first, so the first token goes out immediately. The upstream is read on a
+        helper thread, so the interval flush also fires while it stalls between
+        tokens. `seq` counts published messages, not tokens.
+
+    Backpressure:
+        Each chunk carries a hint from the slowest subscriber's real lag (see
+        Broker.subscriber_lag): "low", "medium" above `lag_medium` messages,
+        "high" above `lag_high`. The lag is read from the broker at most every
+        `lag_refresh_flushes` flushes or `lag_refresh_ms`; in between it is
+        assumed to grow by one per published chunk.
+
+    Redaction:
+        With `redact_output`, tokens pass through a per-request StreamRedactor
+        before they are batched, so secrets spanning token boundaries are caught
+        while only a possible partial match (at most `redact_max_hold` chars) is
+        held back. Redacting here, before the broker, keeps every subscriber and
+        Last-Event-ID replay consistent; `final` is the redacted text.
     """
-    def __init__(self, broker: Broker, anthropic_client: Any, model: str = "claude-3.5"):
+    def __init__(
+        self,
+        broker: Broker,
+        anthropic_client: Any,
+        model: str = "claude-3.5",
+        flush_interval_ms: float = 50,
+        flush_bytes: int = 1024,
+        lag_medium: int = 20,
+        lag_high: int = 50,
+        redact_output: bool = False,
+        redact_max_hold: int = 1024,
+        lag_refresh_flushes: int = 10,
+        lag_refresh_ms: float = 250,
+        clock: Callable[[], float] = time.monotonic
+    ):
         self.broker = broker
         self.client = anthropic_client
         self.model = model
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_bytes = flush_bytes
+        self.lag_medium = lag_medium
+        self.lag_high = lag_high
+        self.redact_output = redact_output
+        self.redact_max_hold = redact_max_hold
+        self.lag_refresh_flushes = lag_refresh_flushes
+        self.lag_refresh = lag_refresh_ms / 1000
+        self._clock = clock
 
     def handle_request(
         self, 
         request_id: str, 
         prompt: str, 
         cancellation_token: Optional[Any] = None,
+        attempt: int = 0,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -29,6 +82,8 @@ class StreamingWorker:
             request_id: Unique ID for the request.
             prompt: The input prompt.
             cancellation_token: Optional CancellationToken to check for abort signals.
+            attempt: Delivery attempt of the job (see QueueAdapter); stamped on
+                every message so a redelivered job's seqs get fresh stream IDs.
             **kwargs: Additional generation parameters.
             
         Returns:
@@ -36,51 +91,102 @@ class StreamingWorker:
         """
         channel = f"request:{request_id}"
         full_text = []
+        # Every message on the channel carries a monotonic seq (terminal messages
+        # included), which the broker uses as the replay cursor.
+        seq = 0
+        pending: List[str] = []
+        pending_bytes = 0
+        last_flush = None
+        # (lag, seq, time) of the last subscriber_lag read
+        measured: Optional[tuple] = None
+        redactor = StreamRedactor(max_hold=self.redact_max_hold) if self.redact_output else None
+
+        def publish(message: Dict[str, Any]) -> None:
+            if attempt:
+                message["attempt"] = attempt
+            self.broker.publish(channel, message)
+
+        def backpressure() -> str:
+            nonlocal measured
+            now = self._clock()
+            if measured is None or seq - measured[1] >= self.lag_refresh_flushes or now - measured[2] >= self.lag_refresh:
+                measured = (self.broker.subscriber_lag(channel, seq), seq, now)
+            lag, measured_seq, _ = measured
+            return self._backpressure_hint(None if lag is None else lag + seq - measured_seq)
+
+        def next_flush_in() -> Optional[float]:
+            if not pending or last_flush is None:
+                return None
+            return max(0.0, last_flush + self.flush_interval - self._clock())
+
+        def flush(reason: str) -> None:
+            nonlocal seq, pending_bytes, last_flush
+            seq += 1
+            publish({
+                "type": "chunk",
+                "token": "".join(pending),
+                "seq": seq,
+                "request_id": request_id,
+                "backpressure": backpressure()
+            })
+            observe_stream_flush(reason, len(pending))
+            pending.clear()
+            pending_bytes = 0
+            last_flush = self._clock()
         
         try:
             # We assume the injected client has a 'stream_generate' method or similar
             if hasattr(self.client, "stream_generate"):
                 stream = self.client.stream_generate(prompt=prompt, model=self.model, **kwargs)
+                if inspect.isasyncgen(stream):
+                    raise TypeError("StreamingWorker needs a blocking client; use get_sync_anthropic_client")
             else:
                 logger.warning("Client does not support stream_generate. Using mock stream.")
                 stream = ["Mock", " ", "stream", " ", "response"]
 
-            seq = 0
-            for token in stream:
+            for token in self._paced(stream, next_flush_in):
+                if token is None:
+                    # The upstream stalled past the flush interval
+                    if pending:
+                        flush("interval")
+                    continue
+
                 # Check cancellation
                 if cancellation_token and cancellation_token.is_cancelled():
                     logger.info(f"Worker detected cancellation for {request_id}")
-                    self.broker.publish(channel, {
+                    publish({
                         "type": "cancelled",
+                        "seq": seq + 1,
                         "request_id": request_id
                     })
                     return {"request_id": request_id, "status": "cancelled"}
 
-                seq += 1
-                
-                # Naive backpressure hint
-                # In a real system, we might check broker queue depth or client ack rate.
-                # Here we just simulate it based on sequence number for demonstration.
-                backpressure_hint = "low"
-                if seq > 50:
-                    backpressure_hint = "high"
-                elif seq > 20:
-                    backpressure_hint = "medium"
-
-                message = {
-                    "type": "chunk",
-                    "token": token,
-                    "seq": seq,
-                    "request_id": request_id,
-                    "backpressure": backpressure_hint
-                }
-                self.broker.publish(channel, message)
+                if redactor:
+                    token = redactor.feed(token)
+                    if not token:
+                        continue
+
+                pending.append(token)
+                pending_bytes += len(token.encode("utf-8"))
                 full_text.append(token)
+
+                if pending_bytes >= self.flush_bytes:
+                    flush("bytes")
+                elif last_flush is None or self._clock() - last_flush >= self.flush_interval:
+                    flush("interval")
+
+            tail = redactor.flush() if redactor else ""
+            if tail:
+                pending.append(tail)
+                full_text.append(tail)
+            if pending:
+                flush("final")
             
             # Publish done message
             final_output = "".join(full_text)
-            self.broker.publish(channel, {
+            publish({
                 "type": "done",
+                "seq": seq + 1,
                 "request_id": request_id,
                 "final": final_output
             })
@@ -89,9 +195,53 @@ class StreamingWorker:
 
         except Exception as e:
             logger.error(f"Streaming error for {request_id}: {e}")
-            self.broker.publish(channel, {
+            publish({
                 "type": "error",
+                "seq": seq + 1,
                 "request_id": request_id,
                 "error": str(e)
             })
             return {"request_id": request_id, "status": "failed", "error": str(e)}
+
+    @staticmethod
+    def _paced(stream: Iterable[str], wait: Callable[[], Optional[float]]) -> Iterator[Optional[str]]:
+        """
+        Yield the stream's tokens, and None whenever `wait()` seconds pass
+        without one (`wait()` returning None waits for the next token).
+        """
+        tokens: "queue.Queue[Any]" = queue.Queue()
+        stop = threading.Event()
+
+        def read() -> None:
+            try:
+                for token in stream:
+                    tokens.put(token)
+                    if stop.is_set():
+                        break
+                tokens.put((_END, None))
+            except Exception as e:
+                tokens.put((_END, e))
+
+        threading.Thread(target=read, name="stream-reader", daemon=True).start()
+        try:
+            while True:
+                try:
+                    item = tokens.get(timeout=wait())
+                except queue.Empty:
+                    yield None
+                    continue
+                if isinstance(item, tuple) and item[0] is _END:
+                    if item[1] is not None:
+                        raise item[1]
+                    return
+                yield item
+        finally:
+            # Cancelled or failed: let the reader drop the upstream at its next token
+            stop.set()
+
+    def _backpressure_hint(self, lag: Optional[int]) -> str:
+        if lag is None or lag <= self.lag_medium:
+            return "low"
+        if lag <= self.lag_high:
+            return "medium"
+        return "high"
@@ -10,6 +10,8 @@ from .definitions import (
     TOOL_DEFINITIONS
 )
 from .executor import ToolExecutor
+from .engine import ToolEngine
+from .command_runner import CommandRunner
 
 __all__ = [
     "ToolType",
@@ -17,5 +19,7 @@ __all__ = [
     "ToolResult",
     "ToolConfirmation",
     "TOOL_DEFINITIONS",
-    "ToolExecutor"
+    "ToolExecutor",
+    "ToolEngine",
+    "CommandRunner"
 ]
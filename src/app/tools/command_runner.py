@@ -0,0 +1,221 @@
+"""
+Command Runner - Runs approved shell commands as asyncio subprocesses.
+
+- stdout and stderr are read as they arrive and handed out line by line, so a
+  long test run shows progress instead of nothing until it exits.
+- Captured output is a ring buffer per stream: only the last
+  `max_output_bytes` are kept, older lines are dropped and counted.
+- Each command runs in its own session with rlimits set by `ulimit` in the
+  command's own shell (CPU seconds and address space; no preexec_fn, which is
+  unsafe in a threaded server) and a wall-clock timeout that kills the whole
+  process group.
+- At most `max_concurrent` commands run at once per event loop (an
+  asyncio.Semaphore), and at most `max_concurrent` blocking run_sync calls.
+"""
+
+import asyncio
+import codecs
+import logging
+import os
+import signal
+import threading
+import weakref
+from collections import deque
+from typing import Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+STDOUT = "stdout"
+STDERR = "stderr"
+
+# Security: Only allow safe commands (customize this list)
+DANGEROUS_PATTERNS = ["rm -rf /", "sudo rm", "> /dev", "mkfs", "dd if="]
+
+OutputCallback = Callable[[str, str], None]
+
+
+def blocked_pattern(command: str) -> Optional[str]:
+    for pattern in DANGEROUS_PATTERNS:
+        if pattern in command:
+            return pattern
+    return None
+
+
+class OutputBuffer:
+    """Keeps the most recent lines of one stream, up to `max_bytes` in total."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.dropped_bytes = 0
+        self._lines = deque()
+        self._bytes = 0
+
+    def append(self, line: str) -> None:
+        size = len(line.encode("utf-8")) + 1
+        self._lines.append((line, size))
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._lines:
+            _, dropped = self._lines.popleft()
+            self._bytes -= dropped
+            self.dropped_bytes += dropped
+
+    def text(self) -> str:
+        text = "\n".join(line for line, _ in self._lines)
+        if self.dropped_bytes:
+            return f"[... {self.dropped_bytes} bytes of earlier output dropped ...]\n{text}"
+        return text
+
+
+class CommandRunner:
+    """
+    Runs shell commands with streamed output and resource limits.
+
+    `run` returns a dict with `success`, `output` and `error` (the shape
+    ToolExecutor results use); `on_output(stream, line)` is called for every
+    line as it arrives. A limit of 0 disables that limit.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        timeout_seconds: float = 300,
+        cpu_seconds: int = 120,
+        memory_bytes: int = 2 * 1024 * 1024 * 1024,
+        max_output_bytes: int = 1024 * 1024,
+        max_line_chars: int = 8192
+    ):
+        self.max_concurrent = max_concurrent
+        self.timeout_seconds = timeout_seconds
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.max_output_bytes = max_output_bytes
+        self.max_line_chars = max_line_chars
+        # Waiting for a slot never parks a thread: async callers wait on their
+        # loop's semaphore, run_sync callers are already on a thread of their own
+        self._loop_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self._sync_slots = threading.BoundedSemaphore(max_concurrent)
+
+    def _slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        slots = self._loop_slots.get(loop)
+        if slots is None:
+            slots = self._loop_slots[loop] = asyncio.Semaphore(self.max_concurrent)
+        return slots
+
+    def _with_limits(self, command: str) -> str:
+        """Prefix the command with `ulimit`s, so the limits apply to the shell and everything it runs."""
+        if os.name != "posix":
+            return command
+        limits = []
+        if self.cpu_seconds:
+            # SIGXCPU at the soft limit, SIGKILL one second later
+            limits.append(f"ulimit -t {self.cpu_seconds + 1} && ulimit -S -t {self.cpu_seconds}")
+        if self.memory_bytes:
+            limits.append(f"ulimit -v {self.memory_bytes // 1024}")
+        if not limits:
+            return command
+        # Never run the command unconfined if a limit cannot be set
+        return " && ".join(limits) + " || exit 126\n" + command
+
+    async def _pump(self, reader: asyncio.StreamReader, emit: Callable[[str], None]) -> None:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        partial = ""
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                break
+            partial += decoder.decode(chunk)
+            *lines, partial = partial.split("\n")
+            for line in lines:
+                emit(line.rstrip("\r"))
+            # Never hold an unterminated line (e.g. a progress bar) indefinitely
+            while len(partial) >= self.max_line_chars:
+                emit(partial[:self.max_line_chars])
+                partial = partial[self.max_line_chars:]
+        partial += decoder.decode(b"", final=True)
+        if partial:
+            emit(partial.rstrip("\r"))
+
+    @staticmethod
+    def _kill(process: asyncio.subprocess.Process) -> None:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError, AttributeError):
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+
+    async def run(
+        self,
+        command: str,
+        working_directory: str = ".",
+        on_output: Optional[OutputCallback] = None
+    ) -> Dict[str, Any]:
+        pattern = blocked_pattern(command)
+        if pattern:
+            return {"success": False, "output": None, "error": f"Dangerous command blocked: {pattern}"}
+        async with self._slots():
+            return await self._run(command, working_directory, on_output)
+
+    async def _run(self, command: str, working_directory: str, on_output: Optional[OutputCallback]) -> Dict[str, Any]:
+        buffers = {STDOUT: OutputBuffer(self.max_output_bytes), STDERR: OutputBuffer(self.max_output_bytes)}
+
+        def emitter(stream: str) -> Callable[[str], None]:
+            def emit(line: str) -> None:
+                buffers[stream].append(line)
+                if on_output:
+                    on_output(stream, line)
+            return emit
+
+        process = None
+        timed_out = False
+        try:
+            process = await asyncio.create_subprocess_shell(
+                self._with_limits(command),
+                cwd=working_directory,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True
+            )
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(
+                        self._pump(process.stdout, emitter(STDOUT)),
+                        self._pump(process.stderr, emitter(STDERR)),
+                        process.wait()
+                    ),
+                    timeout=self.timeout_seconds or None
+                )
+            except asyncio.TimeoutError:
+                timed_out = True
+        finally:
+            # Timed out, or the caller went away: take the whole process group down
+            if process is not None and process.returncode is None:
+                self._kill(process)
+                try:
+                    await asyncio.shield(process.wait())
+                except asyncio.CancelledError:
+                    pass
+
+        output = buffers[STDOUT].text()
+        stderr = buffers[STDERR].text()
+        if stderr:
+            output += f"\nSTDERR: {stderr}"
+
+        if timed_out:
+            return {"success": False, "output": output, "error": f"Command timed out after {self.timeout_seconds} seconds"}
+        returncode = process.returncode
+        if returncode < 0:
+            return {"success": False, "output": output, "error": stderr or f"Command killed by signal {-returncode}"}
+        return {
+            "success": returncode == 0,
+            "output": output,
+            "error": (stderr or f"Command exited with status {returncode}") if returncode != 0 else None
+        }
+
+    def run_sync(self, command: str, working_directory: str = ".") -> Dict[str, Any]:
+        """Blocking variant for callers on a worker thread."""
+        with self._sync_slots:
+            return asyncio.run(self.run(command, working_directory))
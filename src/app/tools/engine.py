@@ -0,0 +1,199 @@
+"""
+Tool Engine - Runs a confirmed batch of tool actions concurrently.
+
+Actions are ordered by a dependency graph built from the paths they touch:
+- Writes (create/edit/delete) to a path run after every earlier action on
+  that path, and reads of it wait for the earlier writes.
+- Directory listings wait for earlier writes below the listed directory, and
+  later writes below it wait for the listing.
+- Actions without a known footprint (run_command) are barriers: they wait for
+  everything before them and everything after waits for them.
+
+Everything else runs at once on a bounded thread pool, so independent S3 and
+filesystem calls overlap instead of queueing behind each other, and results
+are streamed back as each action finishes. Commands run as asyncio
+subprocesses (see CommandRunner) and stream their output lines.
+"""
+
+import asyncio
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple, Callable, AsyncIterator
+
+from .command_runner import CommandRunner, OutputCallback
+
+logger = logging.getLogger(__name__)
+
+Action = Dict[str, Any]
+ActionResult = Dict[str, Any]
+
+WRITE_TOOLS = frozenset({"create_file", "edit_file", "delete_file"})
+READ_TOOLS = frozenset({"read_file"})
+TREE_TOOLS = frozenset({"list_directory", "search_files"})
+
+REJECTED = "Rejected by user"
+
+# (normalized path, writes, covers the whole tree below path)
+Footprint = Tuple[str, bool, bool]
+
+
+def _normalize(path: Any) -> str:
+    path = posixpath.normpath(str(path or ".").replace("\\", "/"))
+    return path.lstrip("/") or "."
+
+
+def footprint(action: Action) -> Optional[Footprint]:
+    """What an action touches, or None when it may touch anything."""
+    tool = action.get("tool_type")
+    params = action.get("parameters") or {}
+    if tool in WRITE_TOOLS or tool in READ_TOOLS:
+        return _normalize(params.get("path")), tool in WRITE_TOOLS, False
+    if tool in TREE_TOOLS:
+        return _normalize(params.get("path")), False, True
+    return None
+
+
+def _covers(root: str, path: str) -> bool:
+    return root == "." or path == root or path.startswith(root + "/")
+
+
+def conflicts(a: Optional[Footprint], b: Optional[Footprint]) -> bool:
+    if a is None or b is None:
+        return True
+    path_a, writes_a, tree_a = a
+    path_b, writes_b, tree_b = b
+    if not (writes_a or writes_b):
+        return False
+    return path_a == path_b or (tree_a and _covers(path_a, path_b)) or (tree_b and _covers(path_b, path_a))
+
+
+def build_dependencies(actions: List[Action]) -> List[List[int]]:
+    """For each action, the indexes of earlier actions it must wait for."""
+    footprints = [footprint(action) for action in actions]
+    return [
+        [j for j in range(i) if conflicts(footprints[j], footprints[i])]
+        for i in range(len(actions))
+    ]
+
+
+def action_result(action: Action, success: bool, output: Optional[str] = None, error: Optional[str] = None) -> ActionResult:
+    return {
+        "tool_id": action.get("tool_id"),
+        "description": action.get("description", ""),
+        "success": success,
+        "output": output,
+        "error": error
+    }
+
+
+class ToolEngine:
+    """
+    Executes approved actions on a shared pool of `max_workers` threads.
+
+    `execute(action)` does the actual work and returns a dict with `success`,
+    `output` and `error`; an exception it raises becomes a failed result.
+    Rejected actions are answered immediately and never wait on anything.
+
+    With a CommandRunner, run_command actions skip the pool: they run as
+    asyncio subprocesses on the loop and their output lines are streamed as
+    `output` events. At most `max_pending_output` of those wait for a slow
+    consumer; beyond that, lines are only kept in the command's own output.
+    """
+
+    def __init__(self, max_workers: int = 16, commands: Optional[CommandRunner] = None, max_pending_output: int = 1000):
+        self.max_workers = max_workers
+        self.commands = commands
+        self.max_pending_output = max_pending_output
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool-engine")
+
+    async def _execute(
+        self,
+        action: Action,
+        execute: Callable[[Action], Dict[str, Any]],
+        working_directory: str,
+        on_output: OutputCallback
+    ) -> Dict[str, Any]:
+        if self.commands and action.get("tool_type") == "run_command":
+            params = action.get("parameters") or {}
+            return await self.commands.run(
+                params.get("command", ""),
+                params.get("working_directory", working_directory),
+                on_output=on_output
+            )
+        return await asyncio.get_running_loop().run_in_executor(self._pool, execute, action)
+
+    async def stream(
+        self,
+        actions: List[Action],
+        approvals: List[Dict[str, Any]],
+        execute: Callable[[Action], Dict[str, Any]],
+        working_directory: str = "."
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield an `action_result` event for every action, in completion order,
+        interleaved with `output` events from running commands. Events carry
+        the action's `index` in `actions`.
+        """
+        approved_ids = {a["tool_id"] for a in approvals if a.get("approved", False)}
+        approved = [i for i, action in enumerate(actions) if action.get("tool_id") in approved_ids]
+
+        for i, action in enumerate(actions):
+            if action.get("tool_id") not in approved_ids:
+                yield {"type": "action_result", "index": i, "result": action_result(action, False, error=REJECTED)}
+
+        dependencies = build_dependencies([actions[i] for i in approved])
+        events: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        tasks: List["asyncio.Task[None]"] = []
+
+        def output_to(index: int) -> OutputCallback:
+            def on_output(stream: str, line: str) -> None:
+                if events.qsize() < self.max_pending_output:
+                    events.put_nowait({"type": "output", "index": index, "stream": stream, "line": line})
+            return on_output
+
+        async def run(position: int) -> None:
+            if dependencies[position]:
+                await asyncio.wait([tasks[j] for j in dependencies[position]])
+            index = approved[position]
+            action = actions[index]
+            try:
+                outcome = await self._execute(action, execute, working_directory, output_to(index))
+                result = action_result(action, bool(outcome.get("success")), outcome.get("output"), outcome.get("error"))
+            except Exception as e:
+                logger.error(f"Tool action {action.get('tool_id')} failed: {e}")
+                result = action_result(action, False, error=str(e))
+            events.put_nowait({"type": "action_result", "index": index, "result": result})
+
+        # Dependencies always point backwards, so each task's prerequisites exist already
+        for position in range(len(approved)):
+            tasks.append(asyncio.ensure_future(run(position)))
+        try:
+            remaining = len(approved)
+            while remaining:
+                event = await events.get()
+                if event["type"] == "action_result":
+                    remaining -= 1
+                yield event
+        finally:
+            # The consumer went away: drop actions that have not started yet and
+            # stop running commands
+            for task in tasks:
+                task.cancel()
+
+    async def run(
+        self,
+        actions: List[Action],
+        approvals: List[Dict[str, Any]],
+        execute: Callable[[Action], Dict[str, Any]],
+        working_directory: str = "."
+    ) -> List[ActionResult]:
+        """Run the batch and return results in the order the actions were proposed."""
+        results: List[Optional[ActionResult]] = [None] * len(actions)
+        async for event in self.stream(actions, approvals, execute, working_directory):
+            if event["type"] == "action_result":
+                results[event["index"]] = event["result"]
+        return results
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
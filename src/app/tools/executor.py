@@ -3,10 +3,10 @@ Tool Executor - Executes approved tool actions.
 """
 
 import os
-import subprocess
 import uuid
 from typing import Dict, Any, Optional
 from .definitions import ToolType, ToolResult
+from .command_runner import CommandRunner
 
 
 class ToolExecutor:
@@ -15,8 +15,9 @@ class ToolExecutor:
     This is a sandboxed executor - in production, add more security checks.
     """
     
-    def __init__(self, base_path: str = "."):
+    def __init__(self, base_path: str = ".", commands: Optional[CommandRunner] = None):
         self.base_path = base_path
+        self.commands = commands or CommandRunner()
     
     def execute(self, tool_type: ToolType, parameters: Dict[str, Any]) -> ToolResult:
         """Execute a tool with the given parameters."""
@@ -114,42 +115,9 @@ class ToolExecutor:
         command = params.get("command", "")
         working_dir = params.get("working_directory", self.base_path)
         
-        # Security: Only allow safe commands (customize this list)
-        dangerous_patterns = ["rm -rf /", "sudo rm", "> /dev", "mkfs", "dd if="]
-        for pattern in dangerous_patterns:
-            if pattern in command:
-                return ToolResult(
-                    tool_id=tool_id,
-                    success=False,
-                    error=f"Dangerous command blocked: {pattern}"
-                )
-        
-        try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                cwd=working_dir,
-                capture_output=True,
-                text=True,
-                timeout=30  # 30 second timeout
-            )
-            
-            output = result.stdout
-            if result.stderr:
-                output += f"\nSTDERR: {result.stderr}"
-            
-            return ToolResult(
-                tool_id=tool_id,
-                success=result.returncode == 0,
-                output=output,
-                error=result.stderr if result.returncode != 0 else None
-            )
-        except subprocess.TimeoutExpired:
-            return ToolResult(
-                tool_id=tool_id,
-                success=False,
-                error="Command timed out after 30 seconds"
-            )
+        # Streams and limits the subprocess; this blocking path just waits for the result
+        result = self.commands.run_sync(command, working_dir)
+        return ToolResult(tool_id=tool_id, **result)
     
     def _read_file(self, tool_id: str, params: Dict[str, Any]) -> ToolResult:
         path = params.get("path", "")
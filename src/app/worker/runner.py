@@ -1,19 +1,70 @@
 import time
+import asyncio
+import signal
 import threading
 import logging
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, List, Set, Tuple
 from src.app.queue.adapter import QueueAdapter
+from src.app.queue.scheduling import PRIORITY_WEIGHTS, job_flow
 from src.app.streaming.broker import Broker
 from src.app.repos.request_repo import RequestRepo
 from src.app.streaming.worker import StreamingWorker
 from src.app.streaming.cancellation import CancellationCoordinator
 from src.app.config import Settings
+from src.app.graceful_shutdown import _run_shutdown_handlers
+from src.app.observability import observe_queue_wait, observe_job_run
+from src.app.metrics.publish_queue_metrics import MetricsPusher
+from src.app.dependencies import get_metrics_pusher
+from src.app.logging.structured_logger import setup_logging
 
 logger = logging.getLogger(__name__)
 
+# Batch jobs reserved over the cap go back to the queue for this long, so the
+# runner does not immediately receive them again
+DEFER_DELAY_SECONDS = 1
+
 class WorkerRunner:
     """
     Polls the queue, reserves jobs, and executes them via StreamingWorker.
+
+    Concurrency:
+        `run_forever` drives one long-lived event loop that keeps up to
+        `concurrency` (default: settings.WORKER_CONCURRENCY) jobs in flight,
+        reserving new jobs (batched with `reserve_many`) whenever slots free up. Generations are almost all
+        I/O wait, so one process can serve many at once. Blocking queue and repo
+        calls run in the default executor so they never stall the loop.
+        Reserves long-poll for up to WORKER_RESERVE_TIMEOUT_SECONDS, so an idle
+        runner picks up new jobs immediately without sleep-polling.
+
+    Shutdown:
+        SIGTERM/SIGINT (or `stop_event`, or `request_stop()`) stop reserving new
+        jobs once the current reserve returns; in-flight jobs get WORKER_DRAIN_TIMEOUT_SECONDS to finish before they
+        are cancelled (their reservations expire and the queue redelivers them).
+        The graceful shutdown handlers run afterwards.
+
+    Priorities:
+        Jobs are dispatched in the queue's fair order (see queue.scheduling).
+        Batch-priority jobs never fill the last WORKER_INTERACTIVE_RESERVED_SLOTS
+        slots: when the free slots exceed the batch headroom, the runner fills
+        them from the higher classes first and lets at most the headroom of any
+        class in, so interactive jobs start immediately even while a batch
+        tenant floods the queue. Adapters that cannot filter by priority
+        (e.g. SQS) may still hand out batch jobs over the cap; those are
+        deferred back to the queue without running or counting an attempt.
+
+    Maintenance:
+        Queues with a `run_maintenance(queue_name)` hook (e.g., RedisAdapter) get
+        it called every WORKER_MAINTENANCE_INTERVAL_SECONDS while the runner is up.
+        Queues with an `extend_leases(queue_name, job_ids)` hook get the leases
+        of all in-flight jobs renewed every third of their `visibility_timeout`,
+        so a long generation is not redelivered to another worker mid-run.
+
+    Metrics:
+        Each job's queue wait, run time (by outcome) and attempt number are
+        collected per (metric, dimensions) and sent to `metrics_pusher` as
+        Values/Counts datums every WORKER_METRICS_INTERVAL_SECONDS and after
+        the drain. `run_forever` uses the process-wide CloudWatch pusher when
+        none is given.
     """
     def __init__(
         self,
@@ -22,7 +73,9 @@ class WorkerRunner:
         request_repo: RequestRepo,
         streaming_worker_factory: Callable[[], StreamingWorker],
         cancellation_coordinator: CancellationCoordinator,
-        settings: Settings = Settings()
+        settings: Settings = Settings(),
+        concurrency: Optional[int] = None,
+        metrics_pusher: Optional[MetricsPusher] = None
     ):
         self.queue = queue_adapter
         self.broker = broker
@@ -30,6 +83,14 @@ class WorkerRunner:
         self.worker_factory = streaming_worker_factory
         self.cancel_coord = cancellation_coordinator
         self.settings = settings
+        self.concurrency = concurrency or settings.WORKER_CONCURRENCY
+        self._stopping: Optional[asyncio.Event] = None
+        self._in_flight: Set[asyncio.Task] = set()
+        self._running_ids: Set[str] = set()
+        self._batch_in_flight = 0
+        self.metrics_pusher = metrics_pusher
+        # (metric name, unit, dimensions) -> samples not yet sent
+        self._samples: Dict[Tuple[str, str, Tuple[Tuple[str, str], ...]], List[float]] = {}
 
     def run_once(self, queue_name: str = "default") -> Optional[Dict[str, Any]]:
         """
@@ -39,7 +100,45 @@ class WorkerRunner:
         job = self.queue.reserve(queue_name)
         if not job:
             return None
+        return asyncio.run(self.process_job(queue_name, job))
+
+    async def process_job(self, queue_name: str, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Executes a reserved job and acks, retries or fails it.
+        Records its queue wait, run duration and attempt number.
+        """
+        enqueued_at = job.get("enqueued_at")
+        if enqueued_at is not None:
+            wait = max(0.0, time.time() - float(enqueued_at))
+            observe_queue_wait(queue_name, wait)
+            self._record("JobQueueWait", wait, "Seconds", Queue=queue_name)
+        started = time.monotonic()
+        result = await self._process(queue_name, job)
+        outcome = result["status"] if result else "invalid"
+        duration = time.monotonic() - started
+        observe_job_run(queue_name, outcome, duration, job.get("attempts", 1))
+        self._record("JobRunTime", duration, "Seconds", Queue=queue_name, Outcome=outcome)
+        self._record("JobAttempts", float(job.get("attempts", 1)), "Count", Queue=queue_name)
+        return result
+
+    def _record(self, name: str, value: float, unit: str, **dimensions: str) -> None:
+        if self.metrics_pusher is not None:
+            self._samples.setdefault((name, unit, tuple(sorted(dimensions.items()))), []).append(value)
+
+    def flush_metrics(self) -> None:
+        """Send the collected samples, one Values/Counts series per metric and dimensions."""
+        samples, self._samples = self._samples, {}
+        self._push_samples(samples)
 
+    def _push_samples(self, samples: Dict[Tuple[str, str, Tuple[Tuple[str, str], ...]], List[float]]) -> None:
+        if not samples:
+            return
+        for (name, unit, dimensions), values in samples.items():
+            self.metrics_pusher.put_values(name, values, unit, dict(dimensions))
+        if hasattr(self.metrics_pusher, "flush"):
+            self.metrics_pusher.flush()
+
+    async def _process(self, queue_name: str, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         job_id = job["id"]
         # Payload structure depends on what we enqueued. 
         # Assuming payload is inside 'payload' key or is the job itself.
@@ -48,76 +147,237 @@ class WorkerRunner:
         request_id = payload.get("request_id")
         if not request_id:
             logger.error(f"Job {job_id} missing request_id. Acknowledging to remove.")
-            self.queue.ack(queue_name, job_id)
+            await asyncio.to_thread(self.queue.ack, queue_name, job_id)
             return None
 
         logger.info(f"Processing job {job_id} for request {request_id}")
 
         try:
             # 2. Update Status
-            self.repo.update_request_status(request_id, "running")
+            await asyncio.to_thread(self.repo.update_request_status, request_id, "running")
 
             # 3. Create Worker & Token
             worker = self.worker_factory()
             token = self.cancel_coord.get_or_create_token(request_id)
 
             # 4. Execute
-            # We need to capture the output. The worker publishes to the broker.
-            # But for the runner, we might want to know if it succeeded.
-            # The worker.handle_request is a generator or async? 
-            # In our previous step, StreamingWorker.process_request was async/generator.
-            # But here we are in a synchronous runner (per requirements).
-            # We'll assume we can run it synchronously or wrap it.
-            # If StreamingWorker is async, we need async runner. 
-            # Requirement says "Keep code synchronous (no async) for simplicity".
-            # But StreamingWorker was designed for FastAPI (async).
-            # We will assume for this step that we can call it synchronously or it has a sync wrapper.
-            # Actually, looking at previous steps, StreamingWorker uses `async def`.
-            # To run async code in sync runner, we need `asyncio.run`.
-            
-            import asyncio
-            
-            async def _execute():
-                # We iterate the generator to ensure it runs to completion
-                async for _ in worker.process_request(
-                    request_id=request_id,
-                    prompt=payload.get("prompt", ""),
-                    model=payload.get("model", self.settings.DEFAULT_MODEL),
-                    stream=payload.get("stream", True)
-                ):
-                    pass # Just consume the stream
-
-            asyncio.run(_execute())
+            # The worker publishes to the broker; we iterate the generator to
+            # ensure it runs to completion.
+            async for _ in worker.process_request(
+                request_id=request_id,
+                prompt=payload.get("prompt", ""),
+                model=payload.get("model", self.settings.DEFAULT_MODEL),
+                stream=payload.get("stream", True),
+                attempt=job.get("attempts", 1)
+            ):
+                pass # Just consume the stream
 
             # 5. Success
-            self.repo.update_request_status(request_id, "done")
-            self.repo.record_usage(request_id, 0, 0, 0.0) # Placeholders
-            self.queue.ack(queue_name, job_id)
+            await asyncio.to_thread(self._complete, queue_name, job_id, request_id)
             
             return {"request_id": request_id, "status": "success", "attempts": job.get("attempts", 1)}
 
         except Exception as e:
             logger.error(f"Error processing request {request_id}: {e}")
-            
-            attempts = job.get("attempts", 1)
-            if attempts < self.settings.QUEUE_MAX_ATTEMPTS:
-                # Retry with backoff
-                delay = 2 ** attempts # 2, 4, 8 seconds...
-                logger.info(f"Retrying job {job_id} in {delay}s (Attempt {attempts})")
-                self.queue.requeue(queue_name, job, delay_seconds=delay)
-                self.repo.update_request_status(request_id, "pending", error_message=str(e))
-                return {"request_id": request_id, "status": "retried", "attempts": attempts}
-            else:
-                # Fail / DLQ
-                logger.error(f"Job {job_id} exceeded max attempts. Moving to DLQ.")
-                self.queue.fail(queue_name, job_id, reason=str(e))
-                self.repo.update_request_status(request_id, "failed", error_message=str(e))
-                return {"request_id": request_id, "status": "failed", "attempts": attempts}
+            return await asyncio.to_thread(self._retry_or_fail, queue_name, job, request_id, e)
+
+    def _complete(self, queue_name: str, job_id: str, request_id: str) -> None:
+        self.repo.update_request_status(request_id, "done")
+        self.repo.record_usage(request_id, 0, 0, 0.0) # Placeholders
+        self.queue.ack(queue_name, job_id)
+
+    def _retry_or_fail(self, queue_name: str, job: Dict[str, Any], request_id: str, error: Exception) -> Dict[str, Any]:
+        job_id = job["id"]
+        attempts = job.get("attempts", 1)
+        if attempts < self.settings.QUEUE_MAX_ATTEMPTS:
+            # Retry with backoff
+            delay = 2 ** attempts # 2, 4, 8 seconds...
+            logger.info(f"Retrying job {job_id} in {delay}s (Attempt {attempts})")
+            self.queue.requeue(queue_name, job, delay_seconds=delay)
+            self.repo.update_request_status(request_id, "pending", error_message=str(error))
+            return {"request_id": request_id, "status": "retried", "attempts": attempts}
+        else:
+            # Fail / DLQ
+            logger.error(f"Job {job_id} exceeded max attempts. Moving to DLQ.")
+            self.queue.fail(queue_name, job_id, reason=str(error))
+            self.repo.update_request_status(request_id, "failed", error_message=str(error))
+            return {"request_id": request_id, "status": "failed", "attempts": attempts}
+
+    async def run(self, queue_name: str = "default", stop_event: Optional[threading.Event] = None) -> None:
+        """
+        Reserve and process jobs until stopped, keeping up to `concurrency` in flight.
+        """
+        self._stopping = asyncio.Event()
+        slots = asyncio.Semaphore(self.concurrency)
+        logger.info(f"Worker runner started for queue: {queue_name} (concurrency={self.concurrency})")
+        background = []
+        if hasattr(self.queue, "run_maintenance"):
+            background.append(asyncio.ensure_future(self._maintain(queue_name)))
+        if hasattr(self.queue, "extend_leases"):
+            background.append(asyncio.ensure_future(self._renew_leases(queue_name)))
+        if self.metrics_pusher is not None:
+            background.append(asyncio.ensure_future(self._publish_metrics()))
+
+        def stopped() -> bool:
+            return self._stopping.is_set() or bool(stop_event and stop_event.is_set())
+
+        try:
+            while not stopped():
+                await slots.acquire()
+                if stopped():
+                    slots.release()
+                    break
+                # Claim every other free slot too, and fill them in one round trip
+                claimed = 1
+                while not slots.locked():
+                    await slots.acquire()
+                    claimed += 1
+                # Blocks (long poll) until a job arrives or the timeout passes
+                jobs = await self._reserve(queue_name, claimed)
+                jobs, over_cap = self._split_over_cap(jobs)
+                if over_cap:
+                    await asyncio.to_thread(self._defer, queue_name, over_cap)
+                for _ in range(claimed - len(jobs)):
+                    slots.release()
+                for job in jobs:
+                    # Counted at dispatch, before the task runs, so the next reservation sees it
+                    is_batch = job_flow(job.get("payload", job))[0] == "batch"
+                    self._batch_in_flight += is_batch
+                    self._running_ids.add(job["id"])
+                    task = asyncio.ensure_future(self._run_job(queue_name, job, slots, is_batch))
+                    self._in_flight.add(task)
+                    task.add_done_callback(self._in_flight.discard)
+        finally:
+            for task in background:
+                task.cancel()
+            await self._drain()
+            await self._flush_metrics()
+
+    async def _maintain(self, queue_name: str) -> None:
+        """Periodically let the queue re-queue expired leases and promote delayed jobs."""
+        while True:
+            try:
+                result = await asyncio.to_thread(self.queue.run_maintenance, queue_name)
+                if any(result.values()):
+                    logger.info(f"Queue maintenance for {queue_name}: {result}")
+            except Exception as e:
+                logger.error(f"Queue maintenance error: {e}")
+            await asyncio.sleep(self.settings.WORKER_MAINTENANCE_INTERVAL_SECONDS)
+
+    async def _publish_metrics(self) -> None:
+        """Periodically send the job metrics collected since the last flush."""
+        while True:
+            await asyncio.sleep(self.settings.WORKER_METRICS_INTERVAL_SECONDS)
+            await self._flush_metrics()
+
+    async def _flush_metrics(self) -> None:
+        # Swapped on the loop, so jobs finishing meanwhile record into the new dict
+        samples, self._samples = self._samples, {}
+        try:
+            await asyncio.to_thread(self._push_samples, samples)
+        except Exception as e:
+            logger.error(f"Metrics flush error: {e}")
+
+    async def _renew_leases(self, queue_name: str) -> None:
+        """Keep the leases of in-flight jobs alive, in one call per interval."""
+        interval = getattr(self.queue, "visibility_timeout", 600) / 3
+        while True:
+            await asyncio.sleep(interval)
+            if not self._running_ids:
+                continue
+            try:
+                await asyncio.to_thread(self.queue.extend_leases, queue_name, list(self._running_ids))
+            except Exception as e:
+                logger.error(f"Lease renewal error: {e}")
+
+    async def _reserve(self, queue_name: str, claimed: int) -> List[Dict[str, Any]]:
+        """Reserve up to `claimed` jobs, keeping batch jobs under their cap."""
+        timeout = self.settings.WORKER_RESERVE_TIMEOUT_SECONDS
+        batch_room = self._batch_room()
+        if batch_room >= claimed:
+            # Even an all-batch reply fits under the cap
+            return await asyncio.to_thread(self.queue.reserve_many, queue_name, claimed, timeout, None)
+        higher = [p for p in PRIORITY_WEIGHTS if p != "batch"]
+        if batch_room <= 0:
+            return await asyncio.to_thread(self.queue.reserve_many, queue_name, claimed, timeout, higher)
+        # Fill every claimed slot from the higher classes first, then let up to
+        # the batch headroom of any class into what is left
+        jobs = await asyncio.to_thread(self.queue.reserve_many, queue_name, claimed, 0, higher)
+        if len(jobs) < claimed:
+            jobs += await asyncio.to_thread(self.queue.reserve_many, queue_name, min(claimed - len(jobs), batch_room), timeout, None)
+        return jobs
+
+    def _batch_room(self) -> int:
+        """How many more batch jobs may start now."""
+        return max(1, self.concurrency - self.settings.WORKER_INTERACTIVE_RESERVED_SLOTS) - self._batch_in_flight
+
+    def _split_over_cap(self, jobs: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Split reserved jobs into those to run and batch jobs beyond the batch headroom."""
+        room = self._batch_room()
+        admitted, over_cap = [], []
+        for job in jobs:
+            if job_flow(job.get("payload", job))[0] == "batch":
+                if room <= 0:
+                    over_cap.append(job)
+                    continue
+                room -= 1
+            admitted.append(job)
+        return admitted, over_cap
+
+    def _defer(self, queue_name: str, jobs: List[Dict[str, Any]]) -> None:
+        for job in jobs:
+            try:
+                self.queue.defer(queue_name, job, delay_seconds=DEFER_DELAY_SECONDS)
+            except Exception as e:
+                # The reservation expires and the queue redelivers the job
+                logger.error(f"Could not defer job {job.get('id')}: {e}")
+
+    async def _run_job(self, queue_name: str, job: Dict[str, Any], slots: asyncio.Semaphore, is_batch: bool = False) -> None:
+        try:
+            await self.process_job(queue_name, job)
+        except Exception as e:
+            logger.error(f"Unhandled error in job {job.get('id')}: {e}")
+        finally:
+            self._batch_in_flight -= is_batch
+            self._running_ids.discard(job.get("id"))
+            slots.release()
+
+    async def _drain(self) -> None:
+        if not self._in_flight:
+            return
+        logger.info(f"Draining {len(self._in_flight)} in-flight jobs...")
+        _, pending = await asyncio.wait(set(self._in_flight), timeout=self.settings.WORKER_DRAIN_TIMEOUT_SECONDS)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Cancelled {len(pending)} jobs still running after the drain timeout.")
+            await asyncio.wait(pending)
+
+    def request_stop(self) -> None:
+        """Stop reserving new jobs; in-flight jobs are drained. Call from the runner's loop."""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
 
     def run_forever(self, queue_name: str = "default", stop_event: Optional[threading.Event] = None):
-        logger.info(f"Worker runner started for queue: {queue_name}")
-        while not (stop_event and stop_event.is_set()):
-            result = self.run_once(queue_name)
-            if not result:
-                # Empty queue, sleep briefly
-                time.sleep(1)
+        """
+        Worker process entrypoint: sets up logging from the settings, runs until
+        SIGTERM/SIGINT (or `stop_event`), then runs the graceful shutdown handlers.
+        """
+        setup_logging(self.settings)
+        if self.metrics_pusher is None:
+            self.metrics_pusher = get_metrics_pusher()
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                try:
+                    loop.add_signal_handler(sig, self.request_stop)
+                except (NotImplementedError, RuntimeError, ValueError):
+                    pass # Not the main thread, or unsupported platform
+            await self.run(queue_name, stop_event)
+            await _run_shutdown_handlers()
+
+        asyncio.run(main())
@@ -1,7 +1,9 @@
 import pytest
 import os
 from fastapi.testclient import TestClient
+from src.app import observability
 from src.app.main import app
+from src.app.observability.fakes import FakeCounter
 from src.app.services.anthropic_client import MockAnthropicClient
 
 @pytest.fixture
@@ -35,3 +37,30 @@ def force_mock_env():
     os.environ["USE_MOCK_CLIENT"] = "true"
     yield
     # Cleanup if necessary, though os.environ changes might persist in the process
+
+class FakeClock:
+    """Clock for injectable `clock=` parameters; time only moves when a test sets `now`."""
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    """
+    Fixture for a FakeClock starting at 1000.0.
+    """
+    return FakeClock()
+
+@pytest.fixture
+def fake_counter(monkeypatch):
+    """
+    Installs a FakeCounter as an observability metric for one test:
+    fake_counter("SESSION_EVENTS") returns the counter.
+    """
+    def install(name):
+        counter = FakeCounter()
+        monkeypatch.setattr(observability, name, counter)
+        return counter
+    return install
@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+import pytest
+from src.app.schemas.security import RequestAudit
+from src.app.security.audit import AuditSink
+
+def make_event(path: str = "/api/generate") -> RequestAudit:
+    return RequestAudit(
+        timestamp=datetime.now(timezone.utc),
+        client_id="client-1",
+        method="POST",
+        path=path,
+        status_code=200,
+        duration_ms=1.5,
+        ip_address="127.0.0.1",
+        user_agent="pytest"
+    )
+
+def read_lines(path) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+@pytest.fixture
+def audit_counter(fake_counter):
+    return fake_counter("AUDIT_LOG_EVENTS")
+
+def test_sink_writes_events_in_batches(tmp_path, audit_counter):
+    path = tmp_path / "audit" / "audit.log"
+    sink = AuditSink(str(path), batch_size=100)
+    writes = []
+
+    # Hold the writer back until everything is queued
+    gate = threading.Event()
+    original_write = sink._write
+    def gated_write(events):
+        gate.wait(5)
+        writes.append(len(events))
+        original_write(events)
+    sink._write = gated_write
+
+    for i in range(250):
+        assert sink.submit(make_event(f"/r/{i}"))
+    gate.set()
+    assert sink.flush()
+    sink.close()
+
+    lines = read_lines(path)
+    assert [line["path"] for line in lines] == [f"/r/{i}" for i in range(250)]
+    assert "T" in lines[0]["timestamp"]
+    # First batch may be a single event (taken before the rest were queued)
+    assert len(writes) <= 4
+    assert max(writes) == 100
+    assert sink.written == 250
+    assert audit_counter.data[(("outcome", "written"),)] == 250
+
+def test_sink_drops_and_counts_when_queue_is_full(tmp_path, audit_counter):
+    path = tmp_path / "audit.log"
+    sink = AuditSink(str(path), max_queue=5, batch_size=1)
+    gate = threading.Event()
+    original_write = sink._write
+    sink._write = lambda events: (gate.wait(5), original_write(events))
+
+    results = [sink.submit(make_event()) for _ in range(20)]
+    gate.set()
+    assert sink.flush()
+    sink.close()
+
+    # The writer may already hold one batch while the queue fills up
+    assert results.count(False) == sink.dropped
+    assert 20 - 6 <= sink.dropped <= 20 - 5
+    assert len(read_lines(path)) == 20 - sink.dropped
+    assert audit_counter.data[(("outcome", "dropped"),)] == sink.dropped
+
+def test_sink_rotates_by_size(tmp_path):
+    path = tmp_path / "audit.log"
+    sink = AuditSink(str(path), batch_size=1, max_bytes=500, backup_count=2)
+    for _ in range(20):
+        sink.submit(make_event())
+        assert sink.flush()
+    sink.close()
+
+    assert sink.rotations >= 2
+    assert os.path.exists(f"{path}.1")
+    assert os.path.exists(f"{path}.2")
+    assert not os.path.exists(f"{path}.3")
+    for name in (f"{path}.1", f"{path}.2"):
+        assert os.path.getsize(name) >= 500
+
+def test_sink_rotates_by_age(tmp_path):
+    now = [0.0]
+    path = tmp_path / "audit.log"
+    sink = AuditSink(str(path), rotate_seconds=60, clock=lambda: now[0])
+
+    sink.submit(make_event("/first"))
+    assert sink.flush()
+    now[0] = 61.0
+    sink.submit(make_event("/second"))
+    assert sink.flush()
+    sink.close()
+
+    assert [line["path"] for line in read_lines(f"{path}.1")] == ["/first", "/second"]
+    assert sink.rotations == 1
+
+def test_sink_close_writes_pending_events_and_can_restart(tmp_path):
+    path = tmp_path / "audit.log"
+    sink = AuditSink(str(path))
+    for _ in range(10):
+        sink.submit(make_event())
+    sink.close()
+    assert len(read_lines(path)) == 10
+
+    sink.submit(make_event("/after-close"))
+    sink.close()
+    assert read_lines(path)[-1]["path"] == "/after-close"
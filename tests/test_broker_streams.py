@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import pytest
+from src.app.streaming.broker import Broker
+from src.app.streaming.worker import StreamingWorker
+from src.app.streaming.fakes import FakeBroker, FakeAnthropicStreamer
+
+def make_broker(backend, **kwargs):
+    return Broker(client=backend, use_streams=True, block_ms=10, idle_timeout=0.05, **kwargs)
+
+def publish_tokens(broker, request_id="req-1", tokens=("a", "b", "c")):
+    worker = StreamingWorker(broker, FakeAnthropicStreamer(tokens=list(tokens)), flush_bytes=1)
+    worker.handle_request(request_id, "prompt")
+    return f"request:{request_id}"
+
+def test_late_subscriber_replays_from_start():
+    backend = FakeBroker()
+    broker = make_broker(backend)
+    channel = publish_tokens(broker)
+
+    messages = list(broker.subscribe(channel))
+
+    assert [m["type"] for m in messages] == ["chunk", "chunk", "chunk", "done"]
+    assert [m["seq"] for m in messages] == [1, 2, 3, 4]
+    assert [entry_id for entry_id, _ in backend.streams[channel]] == ["0-1", "0-2", "0-3", "0-4"]
+    assert backend.expiries[channel] == 3600
+
+def test_resume_after_last_event_id():
+    broker = make_broker(FakeBroker())
+    channel = publish_tokens(broker)
+
+    messages = list(broker.subscribe(channel, last_id="2"))
+
+    assert [m["seq"] for m in messages] == [3, 4]
+    assert messages[-1]["final"] == "abc"
+
+def test_subscriber_follows_live_publishes():
+    broker = make_broker(FakeBroker())
+    broker.idle_timeout = 1.0
+    received = []
+
+    def read():
+        for message in broker.subscribe("request:live"):
+            received.append(message)
+            if message["type"] == "done":
+                return
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    publish_tokens(broker, request_id="live")
+    reader.join(timeout=2)
+
+    assert [m["type"] for m in received] == ["chunk", "chunk", "chunk", "done"]
+
+def test_stream_is_capped_by_maxlen():
+    backend = FakeBroker()
+    broker = make_broker(backend, stream_maxlen=2)
+    channel = publish_tokens(broker)
+
+    assert [m["seq"] for m in broker.subscribe(channel)] == [3, 4]
+
+def test_consumer_group_acks_delivered_entries():
+    backend = FakeBroker()
+    broker = make_broker(backend)
+    channel = publish_tokens(broker)
+
+    messages = list(broker.consume(channel, "persisters", "worker-1"))
+    # A second consumer in the same group sees nothing new
+    assert list(broker.consume(channel, "persisters", "worker-2")) == []
+
+    assert len(messages) == 4
+    assert backend.groups[(channel, "persisters")]["pending"] == {}
+
+def test_control_messages_replay_in_streams_mode():
+    broker = make_broker(FakeBroker())
+    broker.publish_control("req-1", {"type": "cancel"})
+
+    assert list(broker.listen_control("req-1")) == [{"type": "cancel"}]
+
+def test_redelivered_job_publishes_under_a_new_attempt():
+    backend = FakeBroker()
+    broker = make_broker(backend)
+    worker = StreamingWorker(broker, FakeAnthropicStreamer(tokens=["a", "b"]), flush_bytes=1)
+    channel = "request:req-retry"
+
+    assert worker.handle_request("req-retry", "prompt", attempt=1)["status"] == "done"
+    assert worker.handle_request("req-retry", "prompt", attempt=2)["status"] == "done"
+
+    assert [entry_id for entry_id, _ in backend.streams[channel]] == ["1-1", "1-2", "1-3", "2-1", "2-2", "2-3"]
+    # A client that saw the first attempt resumes straight into the second
+    resumed = list(broker.subscribe(channel, last_id="1-3"))
+    assert [(m["attempt"], m["seq"]) for m in resumed] == [(2, 1), (2, 2), (2, 3)]
+
+def test_colliding_stream_ids_are_raised_not_swallowed():
+    broker = make_broker(FakeBroker())
+    broker.publish("request:dup", {"type": "chunk", "seq": 1})
+
+    with pytest.raises(ValueError, match="equal or smaller"):
+        broker.publish("request:dup", {"type": "chunk", "seq": 1})
+
+def test_ack_without_async_client_runs_off_the_event_loop():
+    backend = FakeBroker()
+    broker = make_broker(backend)
+    threads = []
+    hset = backend.hset
+    backend.hset = lambda *args: threads.append(threading.current_thread()) or hset(*args)
+
+    asyncio.run(broker.aack("request:req-1", "conn-1", 7))
+
+    assert backend.hashes["request:req-1:acks"] == {"conn-1": "7"}
+    assert backend.expiries["request:req-1:acks"] == 3600
+    assert threads and threads[0] is not threading.main_thread()
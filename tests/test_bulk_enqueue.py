@@ -0,0 +1,107 @@
+import pytest
+from unittest.mock import MagicMock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.app.api import enqueue
+from src.app.config import Settings
+from src.app.dependencies import get_settings
+from src.app.schemas.security import Client
+from src.app.security.auth import get_current_client
+from src.app.queue.fake_queue import FakeQueue
+from src.app.queue.fake_redis import FakeRedis
+from src.app.queue.redis_adapter import RedisAdapter
+from src.app.queue.adapter import EnqueueBatchError
+from src.app.queue.sqs_adapter import SQSAdapter
+from src.app.repos.fake_request_repo import FakeRequestRepo
+
+def make_client(queue, repo, settings=None):
+    app = FastAPI()
+    app.include_router(enqueue.router)
+    app.dependency_overrides[enqueue.get_queue] = lambda: queue
+    app.dependency_overrides[enqueue.get_repo] = lambda: repo
+    app.dependency_overrides[get_current_client] = lambda: Client(id="eval-runner", plan="free")
+    if settings:
+        app.dependency_overrides[get_settings] = lambda: settings
+    return TestClient(app)
+
+def test_batch_enqueue_uses_one_insert_and_one_queue_call():
+    queue = FakeQueue()
+    queue.enqueue_many = MagicMock(wraps=queue.enqueue_many)
+    repo = FakeRequestRepo()
+    prompts = [{"prompt": f"question {i}"} for i in range(300)]
+
+    response = make_client(queue, repo).post("/api/enqueue/batch", json={"requests": prompts})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["queued"] == 300
+    assert repo.bulk_inserts == 1
+    assert queue.enqueue_many.call_count == 1
+    assert set(repo.requests) == set(body["request_ids"])
+    first = queue.reserve("default")["payload"]
+    assert first["request_id"] == body["request_ids"][0]
+    assert first["priority"] == "batch"
+
+def test_batch_enqueue_rejects_oversized_batches():
+    repo = FakeRequestRepo()
+    client = make_client(FakeQueue(), repo, Settings(ENQUEUE_BATCH_MAX_ITEMS=2))
+
+    response = client.post("/api/enqueue/batch", json={"requests": [{"prompt": "a"}] * 3})
+
+    assert response.status_code == 413
+    assert repo.requests == {}
+
+def test_sqs_enqueue_many_sends_batches_of_ten():
+    sqs = MagicMock()
+    sqs.send_message_batch.return_value = {"Successful": [], "Failed": []}
+    adapter = SQSAdapter("https://sqs/queue", client=sqs)
+
+    ids = adapter.enqueue_many("default", [{"n": i} for i in range(25)])
+
+    assert len(ids) == 25
+    sizes = [len(call.kwargs["Entries"]) for call in sqs.send_message_batch.call_args_list]
+    assert sizes == [10, 10, 5]
+    sqs.send_message.assert_not_called()
+
+def test_sqs_enqueue_many_reports_partial_failures():
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = [
+        {"Successful": [], "Failed": [{"Id": "3", "Code": "InternalError", "Message": "try again"}]},
+        ConnectionError("connection reset"),
+        {"Successful": [], "Failed": []},
+    ]
+    adapter = SQSAdapter("https://sqs/queue", client=sqs)
+
+    with pytest.raises(EnqueueBatchError) as error:
+        adapter.enqueue_many("default", [{"n": i} for i in range(25)])
+
+    # Later chunks are still sent after one fails
+    assert sqs.send_message_batch.call_count == 3
+    assert sorted(error.value.failed) == [3] + list(range(10, 20))
+    assert error.value.failed[3] == "try again"
+    assert len(error.value.job_ids) == 25
+
+def test_batch_endpoint_reports_partial_success():
+    sqs = MagicMock()
+    sqs.send_message_batch.side_effect = [{"Successful": [], "Failed": []}, ConnectionError("connection reset")]
+    repo = FakeRequestRepo()
+    client = make_client(SQSAdapter("https://sqs/queue", client=sqs), repo)
+
+    response = client.post("/api/enqueue/batch", json={"requests": [{"prompt": f"q{i}"} for i in range(12)]})
+
+    assert response.status_code == 207
+    body = response.json()
+    assert body["queued"] == 10
+    assert [f["index"] for f in body["failed"]] == [10, 11]
+    failed_ids = {f["request_id"] for f in body["failed"]}
+    assert failed_ids == set(body["request_ids"][10:])
+    assert {rid for rid, row in repo.requests.items() if row.get("status") == "failed"} == failed_ids
+
+def test_redis_enqueue_many_preserves_order():
+    adapter = RedisAdapter(client=FakeRedis(), worker_id="w1")
+
+    ids = adapter.enqueue_many("default", [{"payload": {"n": i}} for i in range(5)])
+
+    jobs = adapter.reserve_many("default", 5)
+    assert [job["id"] for job in jobs] == ids
+    assert [job["payload"]["n"] for job in jobs] == [0, 1, 2, 3, 4]
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import sys
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.app.api import unified
+from src.app.dependencies import get_session_store, get_tool_engine
+from src.app.services.session_store import InMemorySessionStore
+from src.app.tools import ToolExecutor, ToolType
+from src.app.tools.command_runner import CommandRunner, OutputBuffer
+from src.app.tools.engine import ToolEngine
+
+PY = sys.executable
+
+def py(code):
+    return f'"{PY}" -c "{code}"'
+
+def test_output_buffer_keeps_the_most_recent_lines():
+    buffer = OutputBuffer(max_bytes=20)
+    for i in range(10):
+        buffer.append(f"line {i}")
+
+    assert buffer.text() == "[... 56 bytes of earlier output dropped ...]\nline 8\nline 9"
+
+def test_lines_are_streamed_before_the_command_exits():
+    runner = CommandRunner()
+    command = py("import time; print('first', flush=True); time.sleep(0.5); print('second')")
+
+    started = time.monotonic()
+    seen = []
+    result = asyncio.run(runner.run(command, on_output=lambda stream, line: seen.append((line, time.monotonic() - started))))
+
+    assert [line for line, _ in seen] == ["first", "second"]
+    assert seen[0][1] < 0.4 < seen[1][1]
+    assert result["output"] == "first\nsecond"
+
+def test_stdout_and_stderr_are_captured_separately():
+    runner = CommandRunner()
+    lines = []
+    result = asyncio.run(runner.run(
+        py("import sys; print('out'); print('err', file=sys.stderr); sys.exit(3)"),
+        on_output=lambda stream, line: lines.append((stream, line))
+    ))
+
+    assert sorted(lines) == [("stderr", "err"), ("stdout", "out")]
+    assert result == {"success": False, "output": "out\nSTDERR: err", "error": "err"}
+
+def test_captured_output_is_capped():
+    runner = CommandRunner(max_output_bytes=1000)
+    result = asyncio.run(runner.run(py("[print(i) for i in range(100000)]")))
+
+    assert result["success"] is True
+    assert result["output"].startswith("[... ")
+    assert result["output"].endswith("\n99999")
+    assert len(result["output"]) < 1100
+
+def test_wall_timeout_kills_the_process_group_and_keeps_partial_output():
+    runner = CommandRunner(timeout_seconds=0.5)
+    started = time.monotonic()
+    result = asyncio.run(runner.run(f"echo started; {py('import time; time.sleep(30)')} & wait"))
+
+    assert time.monotonic() - started < 5
+    assert result["success"] is False
+    assert result["error"] == "Command timed out after 0.5 seconds"
+    assert result["output"] == "started"
+
+@pytest.mark.skipif(sys.platform != "linux", reason="needs POSIX rlimits")
+def test_cpu_and_memory_limits_are_enforced():
+    cpu_bound = asyncio.run(CommandRunner(cpu_seconds=1, timeout_seconds=20).run(py("while True: pass")))
+    assert cpu_bound["success"] is False
+
+    memory_hog = asyncio.run(CommandRunner(memory_bytes=512 * 1024 * 1024).run(py("b = bytearray(1024 * 1024 * 1024)")))
+    assert memory_hog["success"] is False
+    assert "MemoryError" in memory_hog["output"]
+
+def test_commands_run_concurrently_up_to_the_cap():
+    async def run_all(runner, count):
+        started = time.monotonic()
+        await asyncio.gather(*(runner.run(py("import time; time.sleep(0.4)")) for _ in range(count)))
+        return time.monotonic() - started
+
+    assert asyncio.run(run_all(CommandRunner(max_concurrent=4), 4)) < 1.2
+    assert asyncio.run(run_all(CommandRunner(max_concurrent=1), 3)) >= 1.2
+
+def test_dangerous_commands_are_blocked():
+    result = asyncio.run(CommandRunner().run("sudo rm notes.txt"))
+    assert result["error"] == "Dangerous command blocked: sudo rm"
+
+def test_tool_executor_runs_commands_through_the_runner(tmp_path):
+    result = ToolExecutor(base_path=str(tmp_path)).execute(ToolType.RUN_COMMAND, {"command": py("import os; print(os.getcwd())")})
+
+    assert result.success is True
+    assert result.output.strip() == str(tmp_path)
+
+def test_local_tool_runner_uses_the_injected_runner(tmp_path):
+    run = unified.local_tool_runner(str(tmp_path), commands=CommandRunner(timeout_seconds=0.3))
+
+    result = run({"tool_type": "run_command", "parameters": {"command": py("import time; time.sleep(5)")}})
+
+    assert result["error"] == "Command timed out after 0.3 seconds"
+
+class FakeDb:
+    def create_request(self, **kwargs):
+        return {"id": "fake-id"}
+
+def test_unified_confirm_streams_command_output(monkeypatch):
+    monkeypatch.setattr(unified, "get_db_client", lambda settings: FakeDb())
+    sessions = InMemorySessionStore()
+    app = FastAPI()
+    app.include_router(unified.router, prefix="/api")
+    app.dependency_overrides[get_session_store] = lambda: sessions
+    app.dependency_overrides[get_tool_engine] = lambda: ToolEngine(commands=CommandRunner())
+
+    sessions.set("s1", {"prompt": "run tests", "pending_actions": [{
+        "tool_id": "t1", "tool_type": "run_command", "description": "Run tests",
+        "parameters": {"command": py("print('collected 2 items'); print('2 passed')")}
+    }]})
+    body = {"prompt": "", "session_id": "s1", "confirm": True, "approvals": [{"tool_id": "t1", "approved": True}]}
+    response = TestClient(app).post("/api/generate", json=body, headers={"Accept": "text/event-stream"})
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+
+    assert [(e["type"], e.get("line")) for e in events] == [
+        ("output", "collected 2 items"), ("output", "2 passed"), ("action_result", None), ("done", None)
+    ]
+    assert events[2]["result"]["success"] is True
+    assert [e["seq"] for e in events] == [1, 2, 3, 4]
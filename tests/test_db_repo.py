@@ -87,3 +87,18 @@ def test_add_usage():
     args, _ = fake_client.insert_mock.call_args
     assert args[0]["tokens"] == 100
     assert args[0]["cost"] == 0.002
+
+def test_create_requests_is_one_bulk_insert():
+    fake_client = FakeSupabaseClient()
+    db = SupabaseClientWrapper("url", "key", client=fake_client)
+    repo = RequestRepo(db)
+
+    repo.create_requests([
+        {"id": "a", "prompt": "p1", "model": "m", "stream": False, "user_id": None},
+        {"id": "b", "prompt": "p2", "model": "m", "stream": False, "user_id": None},
+    ])
+
+    fake_client.insert_mock.assert_called_once()
+    rows = fake_client.insert_mock.call_args[0][0]
+    assert [row["id"] for row in rows] == ["a", "b"]
+    assert all(row["status"] == "queued" for row in rows)
@@ -0,0 +1,201 @@
+import asyncio
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.app.api import enqueue
+from src.app.config import Settings
+from src.app.schemas.security import Client
+from src.app.queue.fake_queue import FakeQueue
+from src.app.queue.scheduling import FairScheduler, priority_for_plan
+from src.app.repos.fake_request_repo import FakeRequestRepo
+from src.app.streaming.fakes import FakeBroker, FakeCancellationCoordinator
+from src.app.worker.runner import WorkerRunner
+from src.app.metrics.publish_queue_metrics import publish_queue_metrics, FakeMetricsPusher
+
+def test_late_tenant_is_not_stuck_behind_a_flood():
+    scheduler = FairScheduler()
+    for i in range(5000):
+        scheduler.push(f"flood-{i}", "standard", "bulk-user")
+    scheduler.push("mine-1", "standard", "other-user")
+    scheduler.push("mine-2", "standard", "other-user")
+
+    first = [scheduler.pop() for _ in range(4)]
+
+    assert "mine-1" in first and "mine-2" in first
+
+def test_weights_split_dispatches_between_priority_classes():
+    scheduler = FairScheduler()
+    for i in range(100):
+        scheduler.push("batch", "batch", "a")
+        scheduler.push("interactive", "interactive", "b")
+
+    first = [scheduler.pop() for _ in range(45)]
+
+    assert first.count("interactive") == 40
+    assert first.count("batch") == 5
+
+def test_pop_can_skip_priority_classes():
+    scheduler = FairScheduler()
+    scheduler.push("batch-job", "batch", "a")
+    scheduler.push("standard-job", "standard", "b")
+
+    assert scheduler.pop(["interactive", "standard"]) == "standard-job"
+    assert scheduler.pop(["interactive", "standard"]) is None
+    assert scheduler.pop() == "batch-job"
+
+def test_plan_maps_to_priority_class():
+    assert priority_for_plan("premium") == "interactive"
+    assert priority_for_plan("standard") == "standard"
+    assert priority_for_plan("free") == "batch"
+    assert priority_for_plan("unknown") == "standard"
+
+def test_runner_keeps_slots_free_for_interactive_jobs():
+    queue = FakeQueue()
+    repo = FakeRequestRepo()
+    for i in range(10):
+        repo.create_request(f"batch-{i}", prompt="hi")
+        queue.enqueue("default", {"request_id": f"batch-{i}", "tenant": "bulk", "priority": "batch"})
+    repo.create_request("urgent", prompt="hi")
+    started = []
+    release = asyncio.Event()
+
+    class BlockingWorker:
+        async def process_request(self, request_id, **kwargs):
+            started.append(request_id)
+            await release.wait()
+            yield "token"
+
+    settings = Settings(WORKER_RESERVE_TIMEOUT_SECONDS=0.02, WORKER_INTERACTIVE_RESERVED_SLOTS=2)
+    runner = WorkerRunner(queue, FakeBroker(), repo, BlockingWorker, FakeCancellationCoordinator(), settings, concurrency=4)
+
+    async def main():
+        run = asyncio.ensure_future(runner.run("default"))
+        await asyncio.sleep(0.1)
+        batch_started = list(started)
+        queue.enqueue("default", {"request_id": "urgent", "tenant": "vip", "priority": "interactive"})
+        await asyncio.sleep(0.1)
+        release.set()
+        runner.request_stop()
+        await run
+        return batch_started
+
+    batch_started = asyncio.run(main())
+
+    assert len(batch_started) == 2
+    assert "urgent" in started
+
+def test_small_batch_headroom_does_not_throttle_other_classes():
+    queue = FakeQueue()
+    repo = FakeRequestRepo()
+    for i in range(4):
+        repo.create_request(f"chat-{i}", prompt="hi")
+        queue.enqueue("default", {"request_id": f"chat-{i}", "tenant": f"u{i}", "priority": "interactive"})
+    calls = []
+    reserve_many = queue.reserve_many
+    queue.reserve_many = lambda *args: calls.append(args[1:]) or reserve_many(*args)
+    started = []
+
+    class Worker:
+        async def process_request(self, request_id, **kwargs):
+            started.append(request_id)
+            yield "token"
+
+    # Only one slot may hold a batch job
+    settings = Settings(WORKER_RESERVE_TIMEOUT_SECONDS=0.02, WORKER_INTERACTIVE_RESERVED_SLOTS=3)
+    runner = WorkerRunner(queue, FakeBroker(), repo, Worker, FakeCancellationCoordinator(), settings, concurrency=4)
+
+    async def main():
+        run = asyncio.ensure_future(runner.run("default"))
+        await asyncio.sleep(0.1)
+        runner.request_stop()
+        await run
+
+    asyncio.run(main())
+
+    assert sorted(started) == [f"chat-{i}" for i in range(4)]
+    # All four interactive jobs came from the first reserve, not one per call
+    assert calls[0] == (4, 0, ["interactive", "standard"])
+
+def test_runner_defers_batch_jobs_over_the_cap_from_a_fifo_adapter():
+    class FifoQueue(FakeQueue):
+        """Ignores `priorities`, like SQS."""
+        def reserve_many(self, queue_name, max_n, timeout=0, priorities=None):
+            return super().reserve_many(queue_name, max_n, timeout, None)
+
+    queue = FifoQueue()
+    repo = FakeRequestRepo()
+    for i in range(10):
+        repo.create_request(f"batch-{i}", prompt="hi")
+        queue.enqueue("default", {"request_id": f"batch-{i}", "tenant": "bulk", "priority": "batch"})
+    started = []
+    release = asyncio.Event()
+
+    class BlockingWorker:
+        async def process_request(self, request_id, **kwargs):
+            started.append(request_id)
+            await release.wait()
+            yield "token"
+
+    settings = Settings(WORKER_RESERVE_TIMEOUT_SECONDS=0.02, WORKER_INTERACTIVE_RESERVED_SLOTS=2)
+    runner = WorkerRunner(queue, FakeBroker(), repo, BlockingWorker, FakeCancellationCoordinator(), settings, concurrency=4)
+
+    async def main():
+        run = asyncio.ensure_future(runner.run("default"))
+        await asyncio.sleep(0.1)
+        running = list(started)
+        release.set()
+        runner.request_stop()
+        await run
+        return running
+
+    running = asyncio.run(main())
+
+    assert len(running) == 2
+    # The rest went back to the queue unrun, with no attempt counted
+    assert queue.inspect_queue_length("default") == 8
+    assert all(job.attempts == 0 for job in queue.queues["default"])
+
+def test_scheduling_metrics_are_published():
+    queue = FakeQueue()
+    queue.enqueue("default", {"request_id": "a", "tenant": "u1", "priority": "batch"})
+    queue.enqueue("default", {"request_id": "b", "tenant": "u2", "priority": "interactive"})
+    pusher = FakeMetricsPusher()
+
+    publish_queue_metrics(queue, pusher)
+
+    assert pusher.metrics["QueueDepth.batch"] == [1.0]
+    assert pusher.metrics["QueueDepth.interactive"] == [1.0]
+    assert pusher.metrics["ActiveTenants"] == [2.0]
+    assert "OldestWait.batch" in pusher.metrics
+    assert pusher.metrics["TenantFairnessIndex"] == [1.0]
+
+def test_enqueue_endpoint_tags_priority_and_tenant():
+    app = FastAPI()
+    app.include_router(enqueue.router)
+    queue = FakeQueue()
+    app.dependency_overrides[enqueue.get_queue] = lambda: queue
+    app.dependency_overrides[enqueue.get_repo] = lambda: FakeRequestRepo()
+
+    app.dependency_overrides[enqueue.get_optional_client] = lambda: Client(id="client-1", plan="premium")
+
+    response = TestClient(app).post("/api/enqueue", json={"prompt": "hi", "user_id": "someone-else"})
+
+    assert response.status_code == 200
+    payload = queue.reserve("default")["payload"]
+    assert payload["priority"] == "interactive"
+    # The body's user_id is recorded but never picks the fair-queuing tenant
+    assert payload["user_id"] == "someone-else"
+    assert payload["tenant"] == "client-1"
+
+def test_enqueue_endpoint_still_accepts_anonymous_callers():
+    app = FastAPI()
+    app.include_router(enqueue.router)
+    queue = FakeQueue()
+    app.dependency_overrides[enqueue.get_queue] = lambda: queue
+    app.dependency_overrides[enqueue.get_repo] = lambda: FakeRequestRepo()
+
+    response = TestClient(app).post("/api/enqueue", json={"prompt": "hi", "user_id": "u1"})
+
+    assert response.status_code == 200
+    payload = queue.reserve("default")["payload"]
+    assert payload["priority"] == "standard"
+    assert payload["tenant"] == "testclient"
@@ -0,0 +1,40 @@
+import time
+from datetime import datetime, timedelta
+from src.app.queue.fake_queue import FakeQueue
+
+RESERVES = 200
+
+def time_reserves(delayed_backlog: int) -> float:
+    """Best-of-3 time for RESERVES reserves behind `delayed_backlog` not-yet-visible jobs."""
+    best = float("inf")
+    for _ in range(3):
+        queue = FakeQueue()
+        later = datetime.now() + timedelta(hours=1)
+        for i in range(delayed_backlog):
+            queue.enqueue("bench", {"id": f"delayed-{i}", "payload": {}, "visible_after": later})
+        for i in range(RESERVES):
+            queue.enqueue("bench", {"id": f"ready-{i}", "payload": {}})
+
+        started = time.perf_counter()
+        for _ in range(RESERVES):
+            assert queue.reserve("bench") is not None
+        best = min(best, time.perf_counter() - started)
+        assert queue.inspect_queue_length("bench") == delayed_backlog
+    return best
+
+def test_reserve_cost_stays_flat_as_delayed_backlog_grows():
+    small = time_reserves(1_000)
+    large = time_reserves(20_000)
+
+    # A linear scan would be ~20x slower; allow generous noise for shared CI hosts
+    assert large < small * 5, f"reserve slowed from {small:.4f}s to {large:.4f}s"
+
+def test_delayed_jobs_become_visible_in_order():
+    queue = FakeQueue()
+    now = datetime.now()
+    queue.enqueue("q", {"id": "late", "payload": {}, "visible_after": now + timedelta(milliseconds=60)})
+    queue.enqueue("q", {"id": "soon", "payload": {}, "visible_after": now + timedelta(milliseconds=30)})
+
+    assert queue.reserve("q") is None
+    assert queue.reserve("q", timeout=1)["id"] == "soon"
+    assert queue.reserve("q", timeout=1)["id"] == "late"
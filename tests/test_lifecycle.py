@@ -1,7 +1,10 @@
 import pytest
 import json
+import time
 from fastapi.testclient import TestClient
 from fastapi import FastAPI
+from src.app import observability
+from src.app.observability.fakes import FakeHistogram
 from src.app.streaming.broker import Broker
 from src.app.streaming.worker import StreamingWorker
 from src.app.streaming.sse_endpoint import sse_stream, get_broker, get_connection_manager, get_cancellation_coordinator
@@ -51,26 +54,97 @@ def test_worker_cancellation():
 
 def test_worker_backpressure_hint():
     """
-    Test that worker adds backpressure hints for long sequences.
+    Test that the backpressure hint follows the slowest subscriber's acked seq.
     """
     fake_backend = FakeBroker()
-    broker = Broker(client=fake_backend)
-    # 60 tokens to trigger 'high' backpressure
-    tokens = ["x"] * 60
-    streamer = FakeAnthropicStreamer(tokens=tokens)
-    worker = StreamingWorker(broker, streamer)
+    broker = Broker(client=fake_backend, use_streams=True)
+    channel = "request:req-bp"
+    # One subscriber keeps up until seq 10, then stalls
+    fake_backend.hset(f"{channel}:acks", "conn-1", 10)
+    streamer = FakeAnthropicStreamer(tokens=["x"] * 70)
+    worker = StreamingWorker(broker, streamer, flush_bytes=1)
     
     worker.handle_request("req-bp", "prompt")
     
-    channel = "request:req-bp"
-    messages = list(fake_backend.subscribe(channel))
+    messages = [json.loads(fields["data"]) for _, fields in fake_backend.streams[channel]]
     
     # Check early message (low)
     assert messages[0]["backpressure"] == "low"
     # Check middle message (medium)
-    assert messages[25]["backpressure"] == "medium"
+    assert messages[40]["backpressure"] == "medium"
     # Check late message (high)
-    assert messages[55]["backpressure"] == "high"
+    assert messages[65]["backpressure"] == "high"
+
+def test_worker_reads_subscriber_lag_every_few_flushes():
+    """
+    Test that the lag is not fetched from the broker on every flush.
+    """
+    fake_backend = FakeBroker()
+    broker = Broker(client=fake_backend, use_streams=True)
+    fake_backend.hset("request:req-lag:acks", "conn-1", 10)
+    reads = []
+    lag = broker.subscriber_lag
+    broker.subscriber_lag = lambda channel, seq: reads.append(seq) or lag(channel, seq)
+    worker = StreamingWorker(broker, FakeAnthropicStreamer(tokens=["x"] * 70), flush_bytes=1, lag_refresh_flushes=10, lag_refresh_ms=60000)
+
+    worker.handle_request("req-lag", "prompt")
+
+    messages = [json.loads(fields["data"]) for _, fields in fake_backend.streams["request:req-lag"]]
+    assert reads == [1, 11, 21, 31, 41, 51, 61]
+    # Between reads the lag is extrapolated, so the hints match a per-flush read
+    assert messages[40]["backpressure"] == "medium"
+    assert messages[65]["backpressure"] == "high"
+
+class StallingStreamer:
+    def stream_generate(self, prompt, model, **kwargs):
+        yield "a"
+        yield "b"
+        time.sleep(0.5)
+        yield "c"
+
+def test_worker_flushes_on_time_while_upstream_stalls():
+    """
+    Test that pending tokens go out after the flush interval even if no new token arrives.
+    """
+    fake_backend = FakeBroker()
+    broker = Broker(client=fake_backend)
+    published = []
+    publish = broker.publish
+    broker.publish = lambda channel, message: published.append((time.monotonic(), message)) or publish(channel, message)
+    worker = StreamingWorker(broker, StallingStreamer(), flush_interval_ms=50, flush_bytes=1024)
+
+    started = time.monotonic()
+    worker.handle_request("req-stall", "prompt")
+
+    chunks = [(at - started, m["token"]) for at, m in published if m["type"] == "chunk"]
+    assert [token for _, token in chunks] == ["a", "b", "c"]
+    # "b" was flushed by the timer, well before "c" arrived
+    assert chunks[1][0] < 0.3
+
+def test_worker_coalesces_tokens_into_chunks():
+    """
+    Test that tokens are micro-batched by size and the final flush drains the rest.
+    """
+    fake_backend = FakeBroker()
+    broker = Broker(client=fake_backend)
+    streamer = FakeAnthropicStreamer(tokens=["ab"] * 10)
+    worker = StreamingWorker(broker, streamer, flush_interval_ms=60000, flush_bytes=8)
+    flushes = FakeHistogram()
+    observability.STREAM_FLUSH_TOKENS = flushes
+    
+    try:
+        worker.handle_request("req-batch", "prompt")
+    finally:
+        observability.STREAM_FLUSH_TOKENS = None
+    
+    messages = list(fake_backend.subscribe("request:req-batch"))
+    
+    # First token flushes immediately, then every 8 bytes, then the remainder
+    assert [m["token"] for m in messages[:-1]] == ["ab", "abababab", "abababab", "ab"]
+    assert [m["seq"] for m in messages] == [1, 2, 3, 4, 5]
+    assert messages[-1]["final"] == "ab" * 10
+    assert flushes.data[(("reason", "bytes"),)] == [4, 4]
+    assert flushes.data[(("reason", "final"),)] == [1]
 
 def test_sse_endpoint_disconnect_triggers_cancel():
     """
@@ -0,0 +1,51 @@
+import asyncio
+from src.app.config import Settings
+from src.app import dependencies
+from src.app.dependencies import get_anthropic_client, get_sync_anthropic_client
+from src.app.services.anthropic_client import AsyncRealAnthropicClient, RealAnthropicClient
+from src.app.streaming.broker import Broker
+from src.app.streaming.fakes import FakeBroker
+from src.app.streaming.worker import StreamingWorker
+
+def test_async_provider_client_is_shared():
+    dependencies._pooled_clients.clear()
+    settings = Settings(USE_MOCK_CLIENT=False, OPENROUTER_API_KEY="test-key", PROVIDER_ASYNC_CLIENT=True)
+
+    first = get_anthropic_client(settings)
+    second = get_anthropic_client(settings)
+
+    assert isinstance(first, AsyncRealAnthropicClient)
+    assert first is second
+    assert first.client_type == "openai"
+    assert first._map_model("anything") == "deepseek/deepseek-chat"
+
+    asyncio.run(first.aclose())
+    dependencies._pooled_clients.clear()
+
+def test_sync_provider_client_when_disabled():
+    settings = Settings(USE_MOCK_CLIENT=False, ZAI_API_KEY="test-key", PROVIDER_ASYNC_CLIENT=False)
+
+    client = get_anthropic_client(settings)
+
+    assert isinstance(client, RealAnthropicClient)
+    assert client.client_type == "anthropic"
+
+def test_blocking_consumers_get_a_sync_client():
+    dependencies._pooled_clients.clear()
+    settings = Settings(USE_MOCK_CLIENT=False, OPENROUTER_API_KEY="test-key", PROVIDER_ASYNC_CLIENT=True)
+
+    client = get_sync_anthropic_client(settings)
+
+    assert isinstance(client, RealAnthropicClient)
+    assert not dependencies._pooled_clients
+
+def test_streaming_worker_rejects_an_async_client():
+    class AsyncStreamer:
+        async def stream_generate(self, prompt, model, **kwargs):
+            yield "never"
+
+    backend = FakeBroker()
+    result = StreamingWorker(Broker(client=backend), AsyncStreamer()).handle_request("req-async", "prompt")
+
+    assert result["status"] == "failed"
+    assert "get_sync_anthropic_client" in result["error"]
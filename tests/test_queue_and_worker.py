@@ -1,7 +1,11 @@
+import asyncio
+import json
+import threading
 import pytest
 import time
 from unittest.mock import MagicMock
 from src.app.queue.fake_queue import FakeQueue
+from src.app.queue.sqs_adapter import SQSAdapter
 from src.app.worker.runner import WorkerRunner
 from src.app.repos.fake_request_repo import FakeRequestRepo
 from src.app.streaming.fakes import FakeBroker, FakeCancellationCoordinator, FakeStreamingWorker
@@ -116,3 +120,197 @@ def test_worker_runner_retry_flow():
     assert result["status"] == "failed"
     assert repo.get_request_status(request_id)["status"] == "failed"
     assert len(queue.dlq) == 1
+
+class SlowWorker:
+    """Simulates an I/O-bound generation and tracks peak concurrency."""
+    active = 0
+    peak = 0
+
+    async def process_request(self, *args, **kwargs):
+        SlowWorker.active += 1
+        SlowWorker.peak = max(SlowWorker.peak, SlowWorker.active)
+        try:
+            await asyncio.sleep(0.05)
+            yield "token"
+        finally:
+            SlowWorker.active -= 1
+
+def make_slow_runner(queue, repo, jobs, concurrency):
+    SlowWorker.active = SlowWorker.peak = 0
+    for i in range(jobs):
+        repo.create_request(f"req-{i}", prompt="hi")
+        queue.enqueue("default", {"request_id": f"req-{i}", "prompt": "hi"})
+    settings = Settings(WORKER_RESERVE_TIMEOUT_SECONDS=0.05)
+    return WorkerRunner(queue, FakeBroker(), repo, SlowWorker, FakeCancellationCoordinator(), settings, concurrency=concurrency)
+
+def test_worker_runner_keeps_jobs_in_flight_concurrently():
+    queue = FakeQueue()
+    repo = FakeRequestRepo()
+    runner = make_slow_runner(queue, repo, jobs=20, concurrency=10)
+    stop = threading.Event()
+
+    async def main():
+        run = asyncio.ensure_future(runner.run("default", stop_event=stop))
+        while any(repo.get_request_status(f"req-{i}")["status"] != "done" for i in range(20)):
+            await asyncio.sleep(0.01)
+        stop.set()
+        runner.request_stop()
+        await run
+
+    started = time.monotonic()
+    asyncio.run(main())
+
+    assert SlowWorker.peak == 10
+    assert time.monotonic() - started < 0.5  # 2 waves of 0.05s, not 20 sequential jobs
+    assert len(queue.reserved) == 0
+
+def test_worker_runner_drains_in_flight_jobs_on_stop():
+    queue = FakeQueue()
+    repo = FakeRequestRepo()
+    runner = make_slow_runner(queue, repo, jobs=5, concurrency=5)
+
+    async def main():
+        run = asyncio.ensure_future(runner.run("default"))
+        while SlowWorker.active < 5:
+            await asyncio.sleep(0.005)
+        runner.request_stop()
+        await run
+
+    asyncio.run(main())
+
+    assert runner.in_flight() == 0
+    assert all(repo.get_request_status(f"req-{i}")["status"] == "done" for i in range(5))
+
+def test_fake_queue_reserve_blocks_until_enqueue():
+    queue = FakeQueue()
+    threading.Timer(0.05, queue.enqueue, args=("test-queue", {"data": 1})).start()
+
+    started = time.monotonic()
+    job = queue.reserve("test-queue", timeout=2)
+
+    assert job["payload"]["data"] == 1
+    assert time.monotonic() - started < 1
+    assert queue.reserve("test-queue", timeout=0.01) is None
+
+def test_worker_runner_picks_up_jobs_without_polling_delay():
+    queue = FakeQueue()
+    repo = FakeRequestRepo()
+    runner = make_slow_runner(queue, repo, jobs=0, concurrency=2)
+    runner.settings = Settings(WORKER_RESERVE_TIMEOUT_SECONDS=5)
+    repo.create_request("req-late", prompt="hi")
+
+    async def main():
+        run = asyncio.ensure_future(runner.run("default"))
+        await asyncio.sleep(0.05)  # runner is idle, blocked in reserve
+        enqueued = time.monotonic()
+        queue.enqueue("default", {"request_id": "req-late", "prompt": "hi"})
+        while repo.get_request_status("req-late")["status"] != "done":
+            await asyncio.sleep(0.005)
+        picked_up = time.monotonic() - enqueued
+        runner.request_stop()
+        queue.enqueue("default", {"id": "wake", "payload": {}})  # unblock the pending reserve
+        await run
+        return picked_up
+
+    assert asyncio.run(main()) < 0.5
+
+def test_sqs_adapter_reserve_long_polls():
+    client = MagicMock()
+    client.receive_message.return_value = {"Messages": []}
+    adapter = SQSAdapter("https://sqs.example/queue", client=client)
+
+    assert adapter.reserve("default", timeout=60) is None
+    assert client.receive_message.call_args.kwargs["WaitTimeSeconds"] == 20
+
+def test_fake_queue_reserve_many_and_ack_many():
+    queue = FakeQueue()
+    ids = [queue.enqueue("test-queue", {"n": i}) for i in range(5)]
+
+    jobs = queue.reserve_many("test-queue", 3)
+    assert [job["id"] for job in jobs] == ids[:3]
+    assert queue.inspect_queue_length("test-queue") == 2
+
+    queue.ack_many("test-queue", [job["id"] for job in jobs])
+    assert len(queue.reserved) == 0
+    assert queue.reserve_many("empty", 3, timeout=0.01) == []
+
+def test_sqs_adapter_batches_receive_and_delete():
+    client = MagicMock()
+    client.receive_message.return_value = {"Messages": [
+        {"Body": json.dumps({"id": f"job-{i}"}), "ReceiptHandle": f"rh-{i}"} for i in range(10)
+    ]}
+    adapter = SQSAdapter("https://sqs.example/queue", client=client)
+
+    jobs = adapter.reserve_many("default", 50, timeout=5)
+    adapter.ack_many("default", [job["id"] for job in jobs])
+
+    assert len(jobs) == 10
+    assert client.receive_message.call_args.kwargs["MaxNumberOfMessages"] == 10
+    entries = client.delete_message_batch.call_args.kwargs["Entries"]
+    assert [entry["ReceiptHandle"] for entry in entries] == [f"rh-{i}" for i in range(10)]
+    assert client.delete_message_batch.call_count == 1
+
+class InMemorySQS:
+    """Just enough of the SQS client for SQSAdapter: delays are ignored."""
+    def __init__(self):
+        self.queues = {}
+        self.handles = 0
+
+    def send_message(self, QueueUrl, MessageBody, DelaySeconds=0):
+        self.queues.setdefault(QueueUrl, []).append({"Body": MessageBody, "receives": 0, "handle": None})
+
+    def receive_message(self, QueueUrl, MaxNumberOfMessages, **kwargs):
+        messages = []
+        for message in self.queues.get(QueueUrl, []):
+            if message["handle"] is None and len(messages) < MaxNumberOfMessages:
+                self.handles += 1
+                message["handle"] = f"rh-{self.handles}"
+                message["receives"] += 1
+                messages.append({
+                    "Body": message["Body"],
+                    "ReceiptHandle": message["handle"],
+                    "Attributes": {"ApproximateReceiveCount": str(message["receives"])}
+                })
+        return {"Messages": messages}
+
+    def delete_message(self, QueueUrl, ReceiptHandle):
+        self.queues[QueueUrl] = [m for m in self.queues[QueueUrl] if m["handle"] != ReceiptHandle]
+
+class AlwaysFailingWorker:
+    async def process_request(self, *args, **kwargs):
+        raise ValueError("Boom")
+        yield
+
+def test_sqs_failing_job_is_retried_then_dead_lettered():
+    sqs = InMemorySQS()
+    adapter = SQSAdapter("https://sqs.example/queue", client=sqs, dlq_url="https://sqs.example/dlq")
+    repo = FakeRequestRepo()
+    repo.create_request("req-poison", prompt="x")
+    adapter.enqueue("default", {"payload": {"request_id": "req-poison"}})
+    runner = WorkerRunner(adapter, FakeBroker(), repo, AlwaysFailingWorker, FakeCancellationCoordinator(), Settings(QUEUE_MAX_ATTEMPTS=3))
+
+    outcomes = []
+    for _ in range(10):
+        result = runner.run_once("default")
+        if result is None:
+            break
+        outcomes.append((result["status"], result["attempts"]))
+
+    assert outcomes == [("retried", 1), ("retried", 2), ("failed", 3)]
+    assert sqs.queues["https://sqs.example/queue"] == []
+    [dead] = sqs.queues["https://sqs.example/dlq"]
+    body = json.loads(dead["Body"])
+    assert body["attempts"] == 3
+    assert "_receipt_handle" not in body and "enqueued_at" not in body
+    assert repo.get_request_status("req-poison")["status"] == "failed"
+
+def test_sqs_attempts_count_redeliveries_of_the_same_message():
+    client = MagicMock()
+    client.receive_message.return_value = {"Messages": [{
+        "Body": json.dumps({"id": "job-1", "attempts": 2}),
+        "ReceiptHandle": "rh",
+        "Attributes": {"ApproximateReceiveCount": "3"}
+    }]}
+    adapter = SQSAdapter("https://sqs.example/queue", client=client)
+
+    assert adapter.reserve("default")["attempts"] == 4
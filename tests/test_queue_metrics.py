@@ -0,0 +1,158 @@
+import asyncio
+import json
+import time
+import pytest
+from unittest.mock import MagicMock
+from src.app import observability
+from src.app.observability.fakes import FakeHistogram
+from src.app.metrics.publish_queue_metrics import CloudWatchPusher, publish_queue_metrics
+from src.app.config import Settings
+from src.app.queue.fake_queue import FakeQueue
+from src.app.queue.fake_redis import FakeRedis
+from src.app.queue.redis_adapter import RedisAdapter
+from src.app.queue.sqs_adapter import SQSAdapter
+from src.app.repos.fake_request_repo import FakeRequestRepo
+from src.app.streaming.fakes import FakeBroker, FakeCancellationCoordinator, FakeStreamingWorker
+from src.app.worker.runner import WorkerRunner
+
+@pytest.fixture
+def job_histograms():
+    histograms = {
+        "QUEUE_WAIT_SECONDS": FakeHistogram(),
+        "JOB_RUN_SECONDS": FakeHistogram(),
+        "JOB_ATTEMPTS": FakeHistogram(),
+    }
+    for name, histogram in histograms.items():
+        setattr(observability, name, histogram)
+    yield histograms
+    for name in histograms:
+        setattr(observability, name, None)
+
+def test_fake_queue_reports_oldest_job_age():
+    queue = FakeQueue()
+    assert queue.oldest_job_age("default") == 0.0
+
+    queue.enqueue("default", {"request_id": "a"})
+    time.sleep(0.05)
+    queue.enqueue("default", {"request_id": "b"})
+
+    assert queue.oldest_job_age("default") >= 0.05
+
+def test_redis_adapter_reports_oldest_job_age():
+    now = [1000.0]
+    adapter = RedisAdapter(client=FakeRedis(), worker_id="w1", clock=lambda: now[0])
+    adapter.enqueue("default", {"payload": {}})
+    now[0] += 30
+    adapter.enqueue("default", {"payload": {}})
+    now[0] += 12
+
+    assert adapter.oldest_job_age("default") == 42.0
+
+def test_sqs_adapter_attaches_sent_timestamp():
+    client = MagicMock()
+    client.receive_message.return_value = {"Messages": [
+        {"Body": json.dumps({"id": "job-1"}), "ReceiptHandle": "rh", "Attributes": {"SentTimestamp": "1700000000500"}}
+    ]}
+    adapter = SQSAdapter("https://sqs.example/queue", client=client)
+
+    job = adapter.reserve("default")
+
+    assert job["enqueued_at"] == 1700000000.5
+    assert adapter.oldest_job_age("default") is None
+
+def test_cloudwatch_pusher_batches_datums():
+    client = MagicMock()
+    pusher = CloudWatchPusher(client=client)
+
+    for i in range(2500):
+        pusher.put_metric("QueueDepth", float(i))
+    pusher.flush()
+
+    sizes = [len(call.kwargs["MetricData"]) for call in client.put_metric_data.call_args_list]
+    assert sizes == [1000, 1000, 500]
+
+def test_publish_queue_metrics_sends_one_batch():
+    queue = FakeQueue()
+    queue.enqueue("default", {"request_id": "a"})
+    client = MagicMock()
+
+    publish_queue_metrics(queue, CloudWatchPusher(client=client))
+
+    assert client.put_metric_data.call_count == 1
+    names = [datum["MetricName"] for datum in client.put_metric_data.call_args.kwargs["MetricData"]]
+    assert "QueueDepth" in names
+    assert "OldestMessageAge" in names
+
+def test_runner_records_wait_run_and_attempts(job_histograms):
+    queue, broker, repo, cancel_coord = FakeQueue(), FakeBroker(), FakeRequestRepo(), FakeCancellationCoordinator()
+    repo.create_request("req-1", prompt="hello")
+    queue.enqueue("default", {"request_id": "req-1", "prompt": "hello"})
+    runner = WorkerRunner(queue, broker, repo, lambda: FakeStreamingWorker(broker, cancel_coord), cancel_coord)
+
+    runner.run_once("default")
+
+    waits = job_histograms["QUEUE_WAIT_SECONDS"].data[(("queue", "default"),)]
+    assert len(waits) == 1 and waits[0] >= 0
+    assert len(job_histograms["JOB_RUN_SECONDS"].data[(("outcome", "success"), ("queue", "default"))]) == 1
+    assert job_histograms["JOB_ATTEMPTS"].data[(("queue", "default"),)] == [1]
+
+def test_cloudwatch_pusher_sends_samples_as_values_and_counts():
+    client = MagicMock()
+    pusher = CloudWatchPusher(client=client)
+
+    pusher.put_values("JobAttempts", [1.0, 1.0, 2.0] + [float(i) for i in range(3, 303)], "Count", {"Queue": "default"})
+    pusher.flush()
+
+    datums = client.put_metric_data.call_args.kwargs["MetricData"]
+    assert [len(datum["Values"]) for datum in datums] == [150, 150, 2]
+    assert datums[0]["Values"][:2] == [1.0, 2.0] and datums[0]["Counts"][:2] == [2.0, 1.0]
+    assert datums[0]["Dimensions"] == [{"Name": "Queue", "Value": "default"}]
+
+def make_runner_with_pusher(jobs, settings):
+    queue, broker, repo, cancel_coord = FakeQueue(), FakeBroker(), FakeRequestRepo(), FakeCancellationCoordinator()
+    for i in range(jobs):
+        repo.create_request(f"req-{i}", prompt="hello")
+        queue.enqueue("default", {"request_id": f"req-{i}", "prompt": "hello"})
+    client = MagicMock()
+    runner = WorkerRunner(
+        queue, broker, repo, lambda: FakeStreamingWorker(broker, cancel_coord), cancel_coord, settings,
+        metrics_pusher=CloudWatchPusher(client=client)
+    )
+    return runner, repo, client
+
+def test_runner_sends_job_metrics_in_one_batch_at_drain():
+    runner, repo, client = make_runner_with_pusher(5, Settings(WORKER_RESERVE_TIMEOUT_SECONDS=0.02))
+
+    async def main():
+        run = asyncio.ensure_future(runner.run("default"))
+        while any(repo.get_request_status(f"req-{i}")["status"] != "done" for i in range(5)):
+            await asyncio.sleep(0.01)
+        assert not client.put_metric_data.called  # still buffered until the interval or the drain
+        runner.request_stop()
+        await run
+
+    asyncio.run(main())
+
+    assert client.put_metric_data.call_count == 1
+    datums = {datum["MetricName"]: datum for datum in client.put_metric_data.call_args.kwargs["MetricData"]}
+    assert set(datums) == {"JobQueueWait", "JobRunTime", "JobAttempts"}
+    assert (datums["JobAttempts"]["Values"], datums["JobAttempts"]["Counts"]) == ([1.0], [5.0])
+    assert sum(datums["JobQueueWait"]["Counts"]) == 5
+    assert {"Name": "Outcome", "Value": "success"} in datums["JobRunTime"]["Dimensions"]
+
+def test_runner_flushes_job_metrics_on_an_interval():
+    runner, _, client = make_runner_with_pusher(2, Settings(WORKER_RESERVE_TIMEOUT_SECONDS=0.02, WORKER_METRICS_INTERVAL_SECONDS=0.05))
+
+    async def main():
+        run = asyncio.ensure_future(runner.run("default"))
+        for _ in range(200):
+            if client.put_metric_data.called:
+                break
+            await asyncio.sleep(0.01)
+        runner.request_stop()
+        await run
+
+    asyncio.run(main())
+
+    first = client.put_metric_data.call_args_list[0].kwargs["MetricData"]
+    assert sum(sum(d["Counts"]) for d in first if d["MetricName"] == "JobAttempts") == 2
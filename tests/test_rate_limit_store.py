@@ -0,0 +1,73 @@
+import time
+import threading
+import tracemalloc
+from src.app.security.rate_limit_store import RateLimitStore
+from src.app.security.rate_limiter import InMemoryRateLimiter
+
+def fill(store, ids, now=1000.0, ttl=60.0):
+    for i in range(ids):
+        store.update(f"ip-{i}", now, lambda value: (1, now + ttl, None))
+
+def test_one_million_client_ids_stay_within_budget():
+    store = RateLimitStore(max_entries=10_000)
+
+    started = time.perf_counter()
+    fill(store, 1_000_000)
+    elapsed = time.perf_counter() - started
+
+    assert len(store) <= 10_000
+    assert store.evictions >= 990_000
+    # ~4us per update on a slow CI host; a linear scan per insert would never finish
+    assert elapsed < 30, f"1M updates took {elapsed:.1f}s"
+
+def test_memory_does_not_grow_with_distinct_ids():
+    def peak(ids):
+        tracemalloc.start()
+        fill(RateLimitStore(max_entries=5_000), ids)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak_bytes
+
+    small, large = peak(20_000), peak(200_000)
+
+    assert large < small * 1.5, f"peak grew from {small} to {large} bytes"
+
+def test_expired_entries_are_swept_without_evicting_live_ones():
+    store = RateLimitStore(max_entries=1_000, shards=1)  # one shard: the update below sweeps it
+    fill(store, 500, now=1000.0, ttl=5.0)
+    fill(store, 10, now=1000.0, ttl=600.0)  # overwrites ip-0..ip-9 with a long TTL
+
+    store.update("late", 1010.0, lambda value: (1, 1070.0, None))
+
+    assert len(store) == 11
+    assert store.get("ip-3", 1010.0) == 1
+    assert store.get("ip-300", 1010.0) is None
+    assert store.evictions == 0
+
+def test_limiter_keeps_enforcing_hot_clients_during_a_scan():
+    now = [1000.0]
+    limiter = InMemoryRateLimiter(5, clock=lambda: now[0], max_clients=2_000)
+    for _ in range(5):
+        assert limiter.check("abuser")["allowed"]
+
+    for i in range(500):
+        limiter.check(f"scan-{i}")
+        limiter.check("abuser")  # keeps the hot client recently used
+
+    assert not limiter.check("abuser")["allowed"]
+    assert len(limiter.tats) <= 2_000
+
+def test_concurrent_updates_are_not_lost():
+    store = RateLimitStore(max_entries=1_000)
+
+    def bump():
+        for _ in range(2_000):
+            store.update("shared", 1000.0, lambda value: ((value or 0) + 1, 2000.0, None))
+
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.get("shared", 1000.0) == 8_000
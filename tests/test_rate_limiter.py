@@ -0,0 +1,72 @@
+from unittest.mock import MagicMock
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from src.app.config import Settings
+from src.app.middleware.security_middleware import SecurityMiddleware
+from src.app.queue.fake_redis import FakeRedis
+from src.app.security import rate_limiter
+from src.app.security.rate_limiter import InMemoryRateLimiter
+from src.app.security.redis_rate_limiter import RedisRateLimiter
+
+def drain(limiter, client_id, attempts):
+    return sum(1 for _ in range(attempts) if limiter.check(client_id)["allowed"])
+
+def test_gcra_has_no_burst_at_window_boundary(clock):
+    clock.now = 59.9
+    limiter = InMemoryRateLimiter(10, clock=clock)
+
+    assert drain(limiter, "c", 20) == 10
+    clock.now = 60.1  # a fixed window would allow another 10 here
+    assert drain(limiter, "c", 20) == 0
+
+    clock.now = 59.9 + 6.0  # one emission interval later
+    assert drain(limiter, "c", 20) == 1
+
+def test_rejection_reports_retry_after(clock):
+    limiter = InMemoryRateLimiter(2, clock=clock)
+    limiter.check("c")
+    limiter.check("c")
+
+    result = limiter.check("c")
+
+    assert result["allowed"] is False
+    assert result["remaining"] == 0
+    assert result["retry_after"] == 30
+
+def test_redis_limiter_is_shared_and_one_script_call_per_check(clock):
+    redis = FakeRedis()
+    replica_a = RedisRateLimiter(redis, limit=5, window=60, clock=clock)
+    replica_b = RedisRateLimiter(redis, limit=5, window=60, clock=clock)
+
+    allowed = drain(replica_a, "c", 3) + drain(replica_b, "c", 5)
+
+    assert allowed == 5
+    assert redis.script_calls == 8
+
+def test_local_tokens_skip_redis_without_exceeding_limit(clock):
+    redis = FakeRedis()
+    replicas = [RedisRateLimiter(redis, limit=30, window=60, local_tokens=10, clock=clock) for _ in range(2)]
+
+    allowed = sum(drain(replica, "c", 20) for replica in replicas)
+
+    assert allowed == 30
+    # 3 grants of 10 tokens, then one rejected round trip per blocked request
+    assert redis.script_calls < 20
+
+def test_middleware_checks_once_and_sets_headers():
+    limiter = InMemoryRateLimiter(5)
+    limiter.get_usage = MagicMock(side_effect=AssertionError("usage must come from check()"))
+    rate_limiter._LIMITER = limiter
+    app = FastAPI()
+    app.add_middleware(SecurityMiddleware, settings=Settings(AUTH_MODE="none", RATE_LIMIT_PER_MINUTE=5))
+
+    @app.get("/secure")
+    def secure(request: Request):
+        return {"ok": True}
+
+    response = TestClient(app).get("/secure")
+
+    assert response.status_code == 200
+    assert response.headers["X-RateLimit-Limit"] == "5"
+    assert response.headers["X-RateLimit-Remaining"] == "4"
+    rate_limiter._LIMITER = None
@@ -0,0 +1,235 @@
+import asyncio
+import threading
+import time
+from src.app.config import Settings
+from src.app.queue.redis_adapter import RedisAdapter
+from src.app.queue.fake_redis import FakeRedis
+from src.app.repos.fake_request_repo import FakeRequestRepo
+from src.app.streaming.fakes import FakeBroker, FakeCancellationCoordinator
+from src.app.worker.runner import WorkerRunner
+from src.app.metrics.publish_queue_metrics import publish_queue_metrics, FakeMetricsPusher
+
+def make_adapter(redis, clock, worker_id="worker-a"):
+    return RedisAdapter(client=redis, worker_id=worker_id, visibility_timeout=30, clock=clock)
+
+def test_reserve_leases_job_until_ack(clock):
+    redis = FakeRedis()
+    adapter = make_adapter(redis, clock)
+    job_id = adapter.enqueue("default", {"payload": {"n": 1}})
+
+    job = adapter.reserve("default")
+
+    assert job["id"] == job_id
+    assert redis.llen("queue:default:processing:worker-a") == 1
+    assert redis.zcard("queue:default:leases") == 1
+
+    adapter.ack("default", job_id)
+
+    assert redis.llen("queue:default:processing:worker-a") == 0
+    assert redis.zcard("queue:default:leases") == 0
+
+def test_expired_lease_of_crashed_worker_is_requeued(clock):
+    redis = FakeRedis()
+    crashed = make_adapter(redis, clock, worker_id="worker-a")
+    survivor = make_adapter(redis, clock, worker_id="worker-b")
+    job_id = crashed.enqueue("default", {"payload": {}})
+    crashed.reserve("default")
+
+    # Lease still valid: nothing to reap
+    assert survivor.run_maintenance("default") == {"reaped": 0, "promoted": 0, "dead_lettered": 0}
+    assert survivor.reserve("default") is None
+
+    clock.now += 31
+    assert survivor.run_maintenance("default")["reaped"] == 1
+
+    assert redis.llen("queue:default:processing:worker-a") == 0
+    assert survivor.reserve("default")["id"] == job_id
+
+def test_delayed_requeue_is_promoted_once_due(clock):
+    redis = FakeRedis()
+    adapter = make_adapter(redis, clock)
+    adapter.enqueue("default", {"payload": {}})
+    job = adapter.reserve("default")
+
+    adapter.requeue("default", job, delay_seconds=4)
+
+    assert redis.zcard("queue:default:leases") == 0
+    assert adapter.run_maintenance("default")["promoted"] == 0
+    assert adapter.reserve("default") is None
+
+    clock.now += 4
+    assert adapter.run_maintenance("default")["promoted"] == 1
+    assert adapter.reserve("default")["id"] == job["id"]
+
+def test_fail_moves_job_to_dlq(clock):
+    redis = FakeRedis()
+    adapter = make_adapter(redis, clock)
+    job_id = adapter.enqueue("default", {"payload": {}})
+    adapter.reserve("default")
+
+    adapter.fail("default", job_id, reason="boom")
+
+    assert redis.llen("queue:default:dlq") == 1
+    assert redis.zcard("queue:default:leases") == 0
+
+def test_blocking_reserve_wakes_on_enqueue(clock):
+    redis = FakeRedis()
+    adapter = make_adapter(redis, clock)
+    threading.Timer(0.05, adapter.enqueue, args=("default", {"id": "late", "payload": {}})).start()
+
+    started = time.monotonic()
+    jobs = adapter.reserve_many("default", 5, timeout=2)
+
+    assert [job["id"] for job in jobs] == ["late"]
+    assert time.monotonic() - started < 1
+    assert redis.zcard("queue:default:leases") == 1
+
+def test_reserve_serves_higher_priority_classes_first(clock):
+    redis = FakeRedis()
+    adapter = make_adapter(redis, clock)
+    adapter.enqueue_many("default", [
+        {"id": "bulk", "payload": {"priority": "batch"}},
+        {"id": "plain", "payload": {}},
+        {"id": "chat", "payload": {"priority": "interactive"}},
+    ])
+
+    assert [job["id"] for job in adapter.reserve_many("default", 5, priorities=["interactive", "standard"])] == ["chat", "plain"]
+    assert adapter.inspect_queue_length("default") == 1
+    assert [job["id"] for job in adapter.reserve_many("default", 5)] == ["bulk"]
+
+def test_blocking_reserve_waits_only_for_allowed_classes(clock):
+    redis = FakeRedis()
+    adapter = make_adapter(redis, clock)
+    adapter.enqueue("default", {"id": "bulk", "payload": {"priority": "batch"}})
+    threading.Timer(0.1, adapter.enqueue, args=("default", {"id": "chat", "payload": {"priority": "interactive"}})).start()
+
+    jobs = adapter.reserve_many("default", 5, timeout=2, priorities=["interactive"])
+
+    assert [job["id"] for job in jobs] == ["chat"]
+    # Blocked on the interactive wake list instead of spinning on the batch job
+    assert redis.script_calls <= 3
+    assert redis.llen("queue:default:batch") == 1
+
+def test_retries_and_reaped_jobs_return_to_their_class(clock):
+    redis = FakeRedis()
+    adapter = make_adapter(redis, clock)
+    adapter.enqueue("default", {"id": "chat", "payload": {"priority": "interactive"}})
+    adapter.enqueue("default", {"id": "bulk", "payload": {"priority": "batch"}})
+    [chat, bulk] = adapter.reserve_many("default", 2)
+    adapter.requeue("default", bulk, delay_seconds=4)
+
+    clock.now += 31
+    assert adapter.run_maintenance("default") == {"reaped": 1, "promoted": 1, "dead_lettered": 0}
+
+    assert redis.llen("queue:default:interactive") == 1
+    assert redis.llen("queue:default:batch") == 1
+    assert adapter.reserve("default")["id"] == "chat"
+
+def test_deferred_job_does_not_count_an_attempt(clock):
+    redis = FakeRedis()
+    adapter = make_adapter(redis, clock)
+    adapter.enqueue("default", {"id": "bulk", "payload": {"priority": "batch"}})
+
+    adapter.defer("default", adapter.reserve("default"))
+
+    assert adapter.reserve("default")["attempts"] == 1
+
+def test_scheduling_stats_report_depth_and_oldest_wait_per_class(clock):
+    redis = FakeRedis()
+    adapter = make_adapter(redis, clock)
+    adapter.enqueue("default", {"payload": {"priority": "batch"}})
+    clock.now += 5
+    adapter.enqueue("default", {"payload": {"priority": "interactive"}})
+    clock.now += 2
+    pusher = FakeMetricsPusher()
+
+    publish_queue_metrics(adapter, pusher)
+
+    assert pusher.metrics["QueueDepth"] == [2.0]
+    assert pusher.metrics["OldestMessageAge"] == [7.0]
+    assert pusher.metrics["QueueDepth.batch"] == [1.0]
+    assert pusher.metrics["QueueDepth.standard"] == [0.0]
+    assert pusher.metrics["OldestWait.interactive"] == [2.0]
+    assert pusher.metrics["OldestWait.standard"] == [0.0]
+    assert "TenantFairnessIndex" not in pusher.metrics
+
+class FailingWorker:
+    async def process_request(self, *args, **kwargs):
+        raise ValueError("Boom")
+        yield
+
+def test_always_failing_job_ends_in_dlq(clock):
+    redis = FakeRedis()
+    adapter = make_adapter(redis, clock)
+    repo = FakeRequestRepo()
+    repo.create_request("req-poison", prompt="x")
+    adapter.enqueue("default", {"payload": {"request_id": "req-poison"}})
+    runner = WorkerRunner(adapter, FakeBroker(), repo, FailingWorker, FakeCancellationCoordinator(), Settings(QUEUE_MAX_ATTEMPTS=3))
+
+    outcomes = []
+    for _ in range(10):
+        clock.now += 60
+        adapter.run_maintenance("default")
+        result = runner.run_once("default")
+        if result is None:
+            break
+        outcomes.append((result["status"], result["attempts"]))
+
+    assert outcomes == [("retried", 1), ("retried", 2), ("failed", 3)]
+    assert redis.llen("queue:default:dlq") == 1
+    assert repo.get_request_status("req-poison")["status"] == "failed"
+    assert redis.hashes["queue:default:attempts"] == {}
+
+def test_job_that_keeps_crashing_its_worker_is_dead_lettered_by_the_reaper(clock):
+    redis = FakeRedis()
+    adapter = RedisAdapter(client=redis, worker_id="w", visibility_timeout=30, max_attempts=2, clock=clock)
+    adapter.enqueue("default", {"id": "crasher", "payload": {}})
+
+    for expected in [{"reaped": 1, "dead_lettered": 0}, {"reaped": 1, "dead_lettered": 1}]:
+        assert adapter.reserve("default")["id"] == "crasher"  # worker dies without acking
+        clock.now += 31
+        result = adapter.run_maintenance("default")
+        assert {k: result[k] for k in expected} == expected
+
+    assert adapter.reserve("default") is None
+    assert redis.llen("queue:default:dlq") == 1
+
+def test_extended_lease_is_not_reaped(clock):
+    redis = FakeRedis()
+    adapter = make_adapter(redis, clock)
+    job_id = adapter.enqueue("default", {"payload": {}})
+    adapter.reserve("default")
+
+    clock.now += 20
+    assert adapter.extend_leases("default", [job_id, "unknown"]) == 1
+    clock.now += 20
+    assert adapter.run_maintenance("default")["reaped"] == 0
+    clock.now += 11
+    assert adapter.run_maintenance("default")["reaped"] == 1
+
+def test_runner_renews_leases_of_long_running_jobs():
+    redis = FakeRedis()
+    adapter = RedisAdapter(client=redis, worker_id="w", visibility_timeout=0.15)
+    repo = FakeRequestRepo()
+    repo.create_request("req-long", prompt="x")
+    adapter.enqueue("default", {"payload": {"request_id": "req-long"}})
+
+    class LongWorker:
+        async def process_request(self, *args, **kwargs):
+            await asyncio.sleep(0.5)
+            yield "done"
+
+    settings = Settings(WORKER_RESERVE_TIMEOUT_SECONDS=0.05, WORKER_MAINTENANCE_INTERVAL_SECONDS=0.02)
+    runner = WorkerRunner(adapter, FakeBroker(), repo, LongWorker, FakeCancellationCoordinator(), settings, concurrency=1)
+
+    async def main():
+        run = asyncio.ensure_future(runner.run("default"))
+        while repo.get_request_status("req-long")["status"] != "done":
+            await asyncio.sleep(0.01)
+        runner.request_stop()
+        await run
+
+    asyncio.run(main())
+    # The lease outlived visibility_timeout several times over without being reaped
+    assert adapter.inspect_queue_length("default") == 0
+    assert redis.hashes["queue:default:attempts"] == {}
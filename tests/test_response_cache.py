@@ -0,0 +1,94 @@
+import pytest
+from fastapi.testclient import TestClient
+from src.app.main import app
+from src.app.api import unified
+from src.app.dependencies import get_anthropic_client, get_response_cache
+from src.app.queue.fake_redis import FakeRedis
+from src.app.services.response_cache import ResponseCache, InMemoryLRUTier, RedisCacheTier, make_cache_key
+
+@pytest.fixture
+def cache_events(fake_counter):
+    return fake_counter("RESPONSE_CACHE_EVENTS")
+
+def test_cache_key_depends_on_all_inputs():
+    base = make_cache_key("m", "p", 100, 0.0, [{"name": "t"}])
+    assert base == make_cache_key("m", "p", 100, 0.0, [{"name": "t"}])
+    assert base != make_cache_key("m2", "p", 100, 0.0, [{"name": "t"}])
+    assert base != make_cache_key("m", "p", 200, 0.0, [{"name": "t"}])
+    assert base != make_cache_key("m", "p", 100, 0.0, [{"name": "u"}])
+
+def test_lru_tier_evicts_by_bytes_and_ttl(cache_events, clock):
+    tier = InMemoryLRUTier(max_entries=10, max_bytes=10, ttl_seconds=5, clock=clock)
+
+    tier.set("a", b"12345")
+    tier.set("b", b"12345")
+    tier.get("a")  # a is now most recently used
+    tier.set("c", b"12345")
+
+    assert tier.get("b") is None
+    assert tier.get("a") == b"12345"
+    assert tier.size_bytes == 10
+    assert cache_events.data[(("event", "eviction"), ("tier", "memory"))] == 1
+
+    clock.now += 6
+    assert tier.get("a") is None
+    assert cache_events.data[(("event", "expired"), ("tier", "memory"))] == 1
+
+def test_redis_tier_backfills_local(cache_events):
+    redis = FakeRedis()
+    shared = RedisCacheTier(client=redis)
+    writer = ResponseCache(InMemoryLRUTier(), shared)
+    reader = ResponseCache(InMemoryLRUTier(), shared)
+
+    writer.set("k", {"output": "hi", "model": "m", "tool_calls": None})
+    assert reader.get("k")["output"] == "hi"
+    assert reader.get("k")["output"] == "hi"
+
+    assert cache_events.data[(("event", "hit"), ("tier", "redis"))] == 1
+    assert cache_events.data[(("event", "hit"), ("tier", "memory"))] == 1
+
+def test_results_with_tool_calls_are_not_cached():
+    cache = ResponseCache(InMemoryLRUTier())
+    cache.set("k", {"output": "", "tool_calls": [object()]})
+    assert cache.get("k") is None
+
+class CountingClient:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_text(self, prompt, model, max_tokens, temperature, tools=None):
+        self.calls += 1
+        return {"request_id": f"req-{self.calls}", "output": "deterministic", "model": model, "usage": {}}
+
+def test_generate_endpoint_uses_cache(monkeypatch):
+    class FakeDb:
+        def create_request(self, **kwargs):
+            return {}
+
+    monkeypatch.setattr(unified, "get_db_client", lambda settings: FakeDb())
+    fake_client = CountingClient()
+    cache = ResponseCache(InMemoryLRUTier())
+    app.dependency_overrides[get_anthropic_client] = lambda: fake_client
+    app.dependency_overrides[get_response_cache] = lambda: cache
+    client = TestClient(app)
+
+    try:
+        payload = {"prompt": "review this", "stream": False, "temperature": 0}
+        first = client.post("/api/generate", json=payload).json()
+        second = client.post("/api/generate", json=payload).json()
+        third = client.post("/api/generate", json=payload).json()
+        assert first["output"] == second["output"] == third["output"] == "deterministic"
+        assert fake_client.calls == 1
+        # Every hit is its own request
+        assert first["request_id"] == "req-1"
+        assert len({first["request_id"], second["request_id"], third["request_id"]}) == 3
+
+        # Non-zero temperature bypasses the cache unless the caller opts in
+        payload["temperature"] = 0.7
+        client.post("/api/generate", json=payload)
+        assert fake_client.calls == 2
+        client.post("/api/generate", json=payload, headers={"X-Response-Cache": "allow"})
+        client.post("/api/generate", json=payload, headers={"X-Response-Cache": "allow"})
+        assert fake_client.calls == 3
+    finally:
+        app.dependency_overrides = {}
@@ -8,7 +8,8 @@ from src.app.config import Settings
 from src.app.middleware.security_middleware import SecurityMiddleware
 from src.app.security.rate_limiter import InMemoryRateLimiter
 
-from src.app.security import rate_limiter
+from src.app.security import rate_limiter, audit
+from src.app.security.audit import get_audit_sink
 
 # ------------------------------------------------------------------------
 # Test App Setup
@@ -88,14 +89,18 @@ def test_audit_logging():
     
     # Mock file writing to avoid disk I/O
     mock_open = MagicMock()
-    mock_file = MagicMock()
-    mock_open.return_value.__enter__.return_value = mock_file
+    mock_file = mock_open.return_value
     
+    audit._SINKS.pop(settings.AUDIT_LOG_PATH, None)
     with patch("builtins.open", mock_open):
         app = create_test_app(settings)
         client = TestClient(app)
         
         client.get("/secure")
+        # Written by the background sink
+        sink = get_audit_sink(settings)
+        assert sink.flush()
+        sink.close()
         
         # Verify write called
         mock_file.write.assert_called_once()
@@ -0,0 +1,119 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.app.api import agentic, unified
+from src.app.config import Settings
+from src.app.dependencies import get_session_store, get_settings
+from src.app.queue.fake_redis import FakeRedis
+from src.app.services.session_store import InMemorySessionStore, RedisSessionStore
+
+@pytest.fixture
+def session_events(fake_counter):
+    return fake_counter("SESSION_EVENTS")
+
+def event_count(counter, store, event):
+    return counter.data.get((("event", event), ("store", store)), 0)
+
+def test_memory_store_expires_sessions_after_last_use(session_events):
+    now = [0.0]
+    store = InMemorySessionStore(ttl_seconds=10, clock=lambda: now[0])
+    store.set("a", {"prompt": "x"})
+
+    now[0] = 8.0
+    assert store.get("a") == {"prompt": "x"}  # pushes expiry to 18
+    now[0] = 17.0
+    assert store.get("a") is not None
+    now[0] = 30.0
+    assert store.get("a") is None
+    assert len(store) == 0
+    assert event_count(session_events, "memory", "expired") == 1
+
+def test_memory_store_sweeps_abandoned_sessions_on_write(session_events):
+    now = [0.0]
+    store = InMemorySessionStore(ttl_seconds=10, clock=lambda: now[0])
+    for i in range(100):
+        store.set(f"abandoned-{i}", {"i": i})
+
+    now[0] = 11.0
+    store.set("fresh", {})
+    assert len(store) == 1
+    assert event_count(session_events, "memory", "expired") == 100
+
+def test_memory_store_evicts_least_recently_used(session_events):
+    store = InMemorySessionStore(max_entries=2)
+    store.set("a", {})
+    store.set("b", {})
+    store.get("a")
+    store.set("c", {})
+
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+    assert event_count(session_events, "memory", "evicted") == 1
+    assert event_count(session_events, "memory", "created") == 3
+
+def test_stores_hand_out_copies():
+    for store in (InMemorySessionStore(), RedisSessionStore(client=FakeRedis())):
+        store.set("s", {"results": []})
+        store.get("s")["results"].append("changed")
+        assert store.get("s") == {"results": []}
+
+def test_pop_consumes_a_session_once():
+    for store in (InMemorySessionStore(), RedisSessionStore(client=FakeRedis())):
+        store.set("s", {"pending_actions": [1]})
+        assert store.pop("s") == {"pending_actions": [1]}
+        assert store.pop("s") is None
+        assert store.delete("s") is False
+
+def test_redis_store_is_shared_between_workers(session_events):
+    redis = FakeRedis()
+    worker_a = RedisSessionStore(client=redis, ttl_seconds=60)
+    worker_b = RedisSessionStore(client=redis, ttl_seconds=60)
+
+    worker_a.set("s", {"prompt": "hello"})
+    assert redis.strings["session:s"] == b'{"prompt":"hello"}'
+    assert worker_b.get("s") == {"prompt": "hello"}
+    assert worker_b.pop("s") == {"prompt": "hello"}
+    assert worker_a.get("s") is None
+    assert event_count(session_events, "redis", "miss") == 1
+
+class FakeDb:
+    def create_request(self, **kwargs):
+        return {"id": "fake-id"}
+
+@pytest.fixture
+def redis_sessions():
+    return RedisSessionStore(client=FakeRedis())
+
+def test_unified_confirmation_is_consumed_once(redis_sessions, monkeypatch):
+    monkeypatch.setattr(unified, "get_db_client", lambda settings: FakeDb())
+    app = FastAPI()
+    app.include_router(unified.router, prefix="/api")
+    app.dependency_overrides[get_session_store] = lambda: redis_sessions
+    client = TestClient(app)
+
+    redis_sessions.set("s1", {"prompt": "make a file", "pending_actions": [
+        {"tool_id": "t1", "tool_type": "create_file", "description": "Create file: a.py", "parameters": {}, "risk_level": "medium"}
+    ]})
+    body = {"prompt": "", "session_id": "s1", "confirm": True, "approvals": [{"tool_id": "t1", "approved": False}]}
+
+    response = client.post("/api/generate", json=body)
+    assert response.status_code == 200
+    assert response.json()["action_results"][0]["error"] == "Rejected by user"
+    assert client.post("/api/generate", json=body).status_code == 404
+
+def test_agentic_router_uses_session_store(redis_sessions):
+    app = FastAPI()
+    app.include_router(agentic.router)
+    app.dependency_overrides[get_session_store] = lambda: redis_sessions
+    app.dependency_overrides[get_settings] = lambda: Settings(USE_MOCK_CLIENT=True)
+    client = TestClient(app)
+
+    session_id = client.post("/api/agent/chat", json={"prompt": "run a command"}).json()["session_id"]
+    proposal = redis_sessions.get(session_id)["tool_proposals"][0]
+
+    response = client.post("/api/agent/confirm", json={"session_id": session_id, "approvals": [{"tool_id": proposal["tool_id"], "approved": False}]})
+    assert response.status_code == 200
+    assert client.get(f"/api/agent/session/{session_id}").json()["results"][0]["error"] == "Rejected by user"
+
+    assert client.delete(f"/api/agent/session/{session_id}").json() == {"status": "deleted"}
+    assert client.delete(f"/api/agent/session/{session_id}").status_code == 404
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from src.app.services.single_flight import SingleFlight
+
+@pytest.fixture
+def flight_calls(fake_counter):
+    return fake_counter("SINGLE_FLIGHT_CALLS")
+
+def test_concurrent_identical_calls_share_one_upstream_call(flight_calls):
+    flight = SingleFlight()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"output": "shared"}
+
+    async def main():
+        return await asyncio.gather(*[flight.do("key", upstream) for _ in range(5)])
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert all(r == {"output": "shared"} for r in results)
+    assert flight.in_flight() == 0
+    assert flight_calls.data[(("kind", "generate"), ("role", "follower"))] == 4
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight()
+
+    async def upstream():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main():
+        return await asyncio.gather(flight.do("key", upstream), flight.do("key", upstream), return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+def test_stream_followers_replay_leader_tokens():
+    flight = SingleFlight()
+    upstream_calls = []
+
+    async def upstream():
+        upstream_calls.append(1)
+        for token in ["a", "b", "c"]:
+            await asyncio.sleep(0.01)
+            yield {"type": "text", "text": token}
+
+    async def collect(events):
+        return [e["text"] async for e in events]
+
+    async def main():
+        leader = asyncio.ensure_future(collect(flight.stream("key", upstream)))
+        await asyncio.sleep(0.015)  # join after the first token
+        follower = asyncio.ensure_future(collect(flight.stream("key", upstream)))
+        return await leader, await follower
+
+    leader_tokens, follower_tokens = asyncio.run(main())
+
+    assert len(upstream_calls) == 1
+    assert leader_tokens == follower_tokens == ["a", "b", "c"]
+    assert flight.in_flight() == 0
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.app.streaming.broker import Broker
+from src.app.streaming.worker import StreamingWorker
+from src.app.streaming.backpressure import CoalescingBuffer
+from src.app.streaming.sse_endpoint import sse_stream, sse_events, get_broker, format_sse
+from src.app.streaming.fakes import FakeBroker, FakeAnthropicStreamer
+
+def make_broker(backend, idle_timeout=0.05):
+    return Broker(client=backend, use_streams=True, idle_timeout=idle_timeout, poll_interval=0.005)
+
+@pytest.fixture
+def backpressure_events(fake_counter):
+    return fake_counter("SSE_BACKPRESSURE_EVENTS")
+
+def test_sse_resumes_after_last_event_id():
+    broker = make_broker(FakeBroker())
+    StreamingWorker(broker, FakeAnthropicStreamer(tokens=["a", "b", "c"]), flush_bytes=1).handle_request("req-resume", "prompt")
+
+    app = FastAPI()
+    app.dependency_overrides[get_broker] = lambda: broker
+    app.get("/stream/{request_id}")(sse_stream)
+    client = TestClient(app)
+
+    response = client.get("/stream/req-resume", headers={"Last-Event-ID": "2"})
+
+    ids = [line for line in response.text.splitlines() if line.startswith("id: ")]
+    assert ids == ["id: 3", "id: 4"]
+    assert '"type": "done"' in response.text
+
+def test_heartbeat_sent_while_idle():
+    backend = FakeBroker()
+    broker = make_broker(backend, idle_timeout=1.0)
+
+    async def main():
+        frames = []
+        async for frame in sse_events(broker, "request:idle", heartbeat_interval=0.02):
+            frames.append(frame)
+            if frame.startswith(": heartbeat") and len(frames) == 2:
+                broker.publish("request:idle", {"type": "done", "seq": 1})
+        return frames
+
+    frames = asyncio.run(asyncio.wait_for(main(), 2))
+
+    assert frames[0] == ": heartbeat\n\n"
+    assert frames[-1].startswith("id: 1\ndata: ")
+
+def test_full_buffer_coalesces_chunks(backpressure_events):
+    async def main():
+        buffer = CoalescingBuffer(max_size=2)
+        for seq, token in enumerate(["a", "b", "c", "d"], start=1):
+            buffer.put({"type": "chunk", "token": token, "seq": seq})
+        buffer.put({"type": "done", "seq": 5})
+        buffer.close()
+        items = []
+        while (item := await buffer.get()) is not None:
+            items.append(item)
+        return items
+
+    items = asyncio.run(main())
+
+    assert [(i["type"], i.get("token"), i["seq"]) for i in items] == [
+        ("chunk", "a", 1),
+        ("chunk", "bcd", 4),
+        ("done", None, 5),
+    ]
+    assert backpressure_events.data[(("action", "coalesced"),)] == 2
+
+def test_event_id_is_the_stream_id_of_a_retried_attempt():
+    assert format_sse({"type": "chunk", "seq": 3}).startswith("id: 3\n")
+    assert format_sse({"type": "chunk", "seq": 3, "attempt": 2}).startswith("id: 2-3\n")
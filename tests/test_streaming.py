@@ -15,7 +15,7 @@ def test_streaming_worker_flow():
     fake_backend = FakeBroker()
     broker = Broker(client=fake_backend)
     streamer = FakeAnthropicStreamer(tokens=["Hello", " ", "World"])
-    worker = StreamingWorker(broker, streamer)
+    worker = StreamingWorker(broker, streamer, flush_bytes=1)  # one chunk per token
     
     # Run worker
     request_id = "req-123"
@@ -0,0 +1,205 @@
+import asyncio
+import io
+import json
+import logging
+import queue
+import pytest
+from fastapi.testclient import TestClient
+from src.app import graceful_shutdown, main
+from src.app.config import Settings
+from src.app.logging import structured_logger
+from src.app.logging.structured_logger import (
+    BatchingQueueListener,
+    BatchingStreamHandler,
+    OverflowQueueHandler,
+    StructuredFormatter,
+    configure_logging,
+    setup_logging,
+    stop_logging,
+)
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+def make_record(level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord("test", level, __file__, 10, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+@pytest.fixture
+def dropped_counter(fake_counter):
+    return fake_counter("LOG_RECORDS_DROPPED")
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield
+    stop_logging()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+def test_formatter_includes_context_fields_and_extra_data():
+    record = make_record(request_id="r1", status=200, extra_data={"method": "GET"})
+    entry = json.loads(StructuredFormatter().format(record))
+
+    assert entry["message"] == "hello world"
+    assert entry["request_id"] == "r1"
+    assert entry["status"] == 200
+    assert entry["method"] == "GET"
+    assert "trace_id" not in entry
+    assert entry["service"] == "claude-proxy"
+
+def test_batching_handler_writes_once_per_batch():
+    stream = CountingStream()
+    handler = BatchingStreamHandler(stream, batch_size=10)
+    handler.setFormatter(StructuredFormatter())
+
+    for i in range(25):
+        handler.handle(make_record(msg=f"line {i}", args=None))
+    assert stream.writes == 2
+    handler.flush()
+    assert stream.writes == 3
+
+    lines = stream.getvalue().splitlines()
+    assert [json.loads(line)["message"] for line in lines] == [f"line {i}" for i in range(25)]
+
+def test_listener_flushes_when_queue_drains():
+    log_queue = queue.Queue()
+    stream = CountingStream()
+    handler = BatchingStreamHandler(stream, batch_size=1000)
+    for i in range(50):
+        log_queue.put(make_record(msg=f"line {i}", args=None))
+    listener = BatchingQueueListener(log_queue, handler)
+    listener.start()
+    listener.stop()
+
+    # Everything was queued up front, so it went out as one write
+    assert stream.writes == 1
+    assert len(stream.getvalue().splitlines()) == 50
+
+def test_drop_debug_policy_drops_only_below_warning(dropped_counter):
+    log_queue = queue.Queue(maxsize=2)
+    handler = OverflowQueueHandler(log_queue, overflow="drop-debug")
+
+    for _ in range(5):
+        handler.handle(make_record(level=logging.DEBUG))
+    handler.handle(make_record(level=logging.INFO))
+    assert log_queue.qsize() == 2
+    assert handler.dropped == 4
+    assert dropped_counter.data[(("level", "DEBUG"),)] == 3
+    assert dropped_counter.data[(("level", "INFO"),)] == 1
+
+    # Only the overflow is dropped; records still go in once there is space
+    log_queue.get_nowait()
+    handler.handle(make_record(level=logging.WARNING))
+    assert log_queue.qsize() == 2
+    assert handler.dropped == 4
+
+class FullQueue(queue.Queue):
+    """Always full; records that would wait for space are collected instead."""
+    def __init__(self):
+        super().__init__(maxsize=1)
+        self.waited = []
+
+    def put_nowait(self, item):
+        raise queue.Full
+
+    def put(self, item, block=True, timeout=None):
+        self.waited.append(item)
+
+def test_sample_policy_keeps_one_in_n():
+    log_queue = FullQueue()
+    handler = OverflowQueueHandler(log_queue, overflow="sample", sample_every=3)
+
+    for i in range(9):
+        handler.handle(make_record(msg=f"overflow {i}", args=None))
+    handler.handle(make_record(level=logging.ERROR, msg="error", args=None))
+
+    assert handler.dropped == 6
+    assert [record.msg for record in log_queue.waited] == ["overflow 2", "overflow 5", "overflow 8", "error"]
+
+def test_block_policy_never_drops():
+    log_queue = FullQueue()
+    handler = OverflowQueueHandler(log_queue, overflow="block")
+
+    for _ in range(5):
+        handler.handle(make_record(level=logging.DEBUG))
+    assert handler.dropped == 0
+    assert len(log_queue.waited) == 5
+
+def test_unknown_overflow_policy_is_rejected():
+    with pytest.raises(ValueError):
+        OverflowQueueHandler(queue.Queue(), overflow="discard")
+
+def test_queued_records_are_preformatted():
+    log_queue = queue.Queue()
+    handler = OverflowQueueHandler(log_queue)
+    try:
+        raise ValueError("Simulated error")
+    except ValueError:
+        logger = logging.getLogger("test_queued_records")
+        logger.propagate = False
+        logger.addHandler(handler)
+        logger.exception("failed for %s", "client-1")
+        logger.removeHandler(handler)
+
+    record = log_queue.get_nowait()
+    assert record.getMessage() == "failed for client-1"
+    assert record.args is None
+    assert record.exc_info is None
+    assert "Simulated error" in record.exc_text
+
+def test_configure_logging_writes_through_listener(monkeypatch, restore_root_logger):
+    stream = io.StringIO()
+    monkeypatch.setattr(structured_logger.sys, "stdout", stream)
+    configure_logging(json_format=True, batch_size=10)
+
+    root = logging.getLogger()
+    assert len(root.handlers) == 1
+    assert isinstance(root.handlers[0], OverflowQueueHandler)
+
+    logging.getLogger("app.test").info("processed %d", 7, extra={"request_id": "abc"})
+    stop_logging()
+
+    entry = json.loads(stream.getvalue().splitlines()[-1])
+    assert entry["message"] == "processed 7"
+    assert entry["request_id"] == "abc"
+
+def test_shutdown_handlers_stop_logging_and_later_records_are_written_directly(monkeypatch, restore_root_logger):
+    stream = io.StringIO()
+    monkeypatch.setattr(structured_logger.sys, "stdout", stream)
+    monkeypatch.setattr(graceful_shutdown, "_shutdown_handlers", [])
+    monkeypatch.setattr(structured_logger, "_STOP_REGISTERED", False)
+    setup_logging(Settings(LOG_LEVEL="WARNING", LOG_QUEUE_SIZE=50, LOG_OVERFLOW="block", LOG_BATCH_SIZE=10))
+
+    root = logging.getLogger()
+    assert root.level == logging.WARNING
+    assert root.handlers[0].overflow == "block"
+    assert graceful_shutdown._shutdown_handlers == [stop_logging]
+
+    logging.getLogger("app.test").warning("before shutdown")
+    asyncio.run(graceful_shutdown._run_shutdown_handlers())
+    logging.getLogger("app.test").warning("after shutdown")
+
+    messages = [json.loads(line)["message"] for line in stream.getvalue().splitlines()]
+    assert messages == ["before shutdown", "after shutdown"]
+
+def test_app_startup_configures_logging(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, "setup_logging", calls.append)
+    monkeypatch.setattr(main, "_run_shutdown_handlers", lambda: asyncio.sleep(0))
+
+    with TestClient(main.app):
+        pass
+
+    assert len(calls) == 1 and isinstance(calls[0], Settings)
@@ -0,0 +1,122 @@
+import pytest
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from src.app.main import app
+from src.app.api import unified
+from src.app.dependencies import get_anthropic_client
+from src.app.security.token_limiter import TokenRateLimiter, get_token_limiter, parse_plan_limits, usage_tokens
+
+class FakeDb:
+    def create_request(self, **kwargs):
+        return {}
+
+class UsageReportingClient:
+    """Uses the whole max_tokens budget and reports it as usage."""
+    def generate_text(self, prompt, model, max_tokens, temperature, tools=None):
+        return {"request_id": "req", "output": "ok", "model": model, "usage": {"input_tokens": 10, "output_tokens": max_tokens}}
+
+def test_cost_scales_with_max_tokens(clock):
+    limiter = TokenRateLimiter({"free": 10000}, clock=clock)
+
+    assert limiter.reserve("c", "free", 8000).allowed
+    denied = limiter.reserve("c", "free", 8000)
+    assert not denied.allowed
+    assert denied.retry_after == 36  # 6000 tokens at 10000/min
+    assert limiter.reserve("c", "free", 50).allowed
+
+def test_settle_refunds_unused_reservation(clock):
+    limiter = TokenRateLimiter({"free": 10000}, clock=clock)
+
+    reservation = limiter.reserve("c", "free", 8000)
+    reservation.settle(30)
+    reservation.settle(30)  # idempotent
+
+    assert limiter.reserve("c", "free", 8000).allowed
+
+def test_settle_charges_overrun(clock):
+    limiter = TokenRateLimiter({"free": 10000}, clock=clock)
+
+    limiter.reserve("c", "free", 100).settle(9000)
+
+    assert not limiter.reserve("c", "free", 2000).allowed
+
+def test_limits_follow_plan(clock):
+    limiter = TokenRateLimiter(parse_plan_limits("free:100, premium:1000, enterprise:0"), clock=clock)
+
+    assert limiter.limit_for("premium") == 1000
+    assert limiter.limit_for("mystery") == 100
+    assert limiter.reserve("big", "enterprise", 10**9).allowed
+    assert usage_tokens({"input_tokens": 10, "output_tokens": 20}) == 30
+    assert usage_tokens({}) is None
+
+def test_generate_endpoint_enforces_token_budget(monkeypatch):
+    monkeypatch.setattr(unified, "get_db_client", lambda settings: FakeDb())
+    limiter = TokenRateLimiter({"free": 10000})
+    app.dependency_overrides[get_anthropic_client] = lambda: UsageReportingClient()
+    app.dependency_overrides[get_token_limiter] = lambda: limiter
+    client = TestClient(app)
+
+    try:
+        payload = {"prompt": "hi", "stream": False, "user_id": "eval-user"}
+        assert client.post("/api/generate", json={**payload, "max_tokens": 8000}).status_code == 200
+
+        rejected = client.post("/api/generate", json={**payload, "max_tokens": 8000})
+        assert rejected.status_code == 429
+        assert "Retry-After" in rejected.headers
+
+        assert client.post("/api/generate", json={**payload, "max_tokens": 50}).status_code == 200
+    finally:
+        app.dependency_overrides = {}
+
+class NoUsageClient:
+    """Reports no usage, like some OpenRouter models."""
+    def generate_text(self, prompt, model, max_tokens, temperature, tools=None):
+        return {"output": "short answer", "model": model, "usage": None}
+
+class ToolStreamer:
+    def __init__(self, events):
+        self.events = events
+
+    def generate_text(self, *args, **kwargs):
+        raise AssertionError("should stream")
+
+    def stream_with_tools(self, prompt, model, max_tokens, temperature, tools=None):
+        yield from self.events
+
+def _tool_call(name, arguments):
+    return SimpleNamespace(id="call-1", function=SimpleNamespace(name=name, arguments=arguments))
+
+@pytest.fixture
+def budgeted(monkeypatch, clock):
+    monkeypatch.setattr(unified, "get_db_client", lambda settings: FakeDb())
+    limiter = TokenRateLimiter({"free": 10000}, clock=clock)
+
+    def _make(upstream):
+        app.dependency_overrides[get_anthropic_client] = lambda: upstream
+        app.dependency_overrides[get_token_limiter] = lambda: limiter
+        return TestClient(app)
+
+    yield _make
+    app.dependency_overrides = {}
+
+def test_body_user_id_does_not_pick_the_budget(budgeted):
+    client = budgeted(UsageReportingClient())
+    payload = {"prompt": "hi", "stream": False, "max_tokens": 8000}
+
+    assert client.post("/api/generate", json={**payload, "user_id": "a"}).status_code == 200
+    # A fresh user_id is the same anonymous caller (same IP), not a fresh budget
+    assert client.post("/api/generate", json={**payload, "user_id": "b"}).status_code == 429
+
+@pytest.mark.parametrize("upstream, stream", [
+    (NoUsageClient(), False),
+    (ToolStreamer([]), True),
+    (ToolStreamer([{"type": "tool_calls", "tool_calls": [_tool_call("create_file", '{"path": "a.py", "content": ""}')]}]), True),
+    (ToolStreamer([{"type": "text", "text": "Sure."}, {"type": "tool_calls", "tool_calls": [_tool_call("run_command", '{"command": "ls"}')]}]), True),
+])
+def test_reservation_is_settled_without_reported_usage(budgeted, upstream, stream):
+    client = budgeted(upstream)
+    payload = {"prompt": "hi", "stream": stream, "max_tokens": 8000}
+
+    # Without settling, the first 8000-token reservation would block the second
+    assert client.post("/api/generate", json=payload).status_code == 200
+    assert client.post("/api/generate", json=payload).status_code == 200
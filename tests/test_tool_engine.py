@@ -0,0 +1,172 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.app.api import unified
+from src.app.dependencies import get_session_store, get_tool_engine
+from src.app.services.session_store import InMemorySessionStore
+from src.app.tools.engine import ToolEngine, build_dependencies
+
+def action(tool_id, tool_type, path=None, **params):
+    if path is not None:
+        params["path"] = path
+    return {"tool_id": tool_id, "tool_type": tool_type, "description": f"{tool_type} {path}", "parameters": params}
+
+def approve(actions):
+    return [{"tool_id": a["tool_id"], "approved": True} for a in actions]
+
+class SlowS3:
+    """Records the order operations start and finish in; every call takes `latency`."""
+    def __init__(self, latency=0.2):
+        self.latency = latency
+        self.log = []
+        self.lock = threading.Lock()
+
+    def _call(self, name, path, result):
+        with self.lock:
+            self.log.append(("start", name, path))
+        time.sleep(self.latency)
+        with self.lock:
+            self.log.append(("end", name, path))
+        return result
+
+    def upload_content(self, content, user_id, project_name, path):
+        return self._call("put", path, {"success": True, "s3_key": f"users/{user_id}/{project_name}/{path}"})
+
+    def download_file(self, user_id, project_name, path):
+        return self._call("get", path, {"success": True, "content": "body"})
+
+    def list_objects(self, user_id, project_name, path):
+        return self._call("list", path, {"success": True, "objects": []})
+
+def test_dependency_graph_orders_conflicting_actions_only():
+    actions = [
+        action("0", "create_file", "a.py"),
+        action("1", "read_file", "b.py"),
+        action("2", "read_file", "./a.py"),
+        action("3", "edit_file", "a.py"),
+        action("4", "list_directory", "src"),
+        action("5", "create_file", "src/x.py"),
+        action("6", "run_command", command="pytest"),
+        action("7", "read_file", "c.py"),
+    ]
+    assert build_dependencies(actions) == [[], [], [0], [0, 2], [], [4], [0, 1, 2, 3, 4, 5], [6]]
+
+def test_twenty_creates_take_about_one_put(monkeypatch):
+    s3 = SlowS3(latency=0.2)
+    monkeypatch.setattr(unified, "get_s3_service", lambda: s3)
+    actions = [action(str(i), "create_file", f"file_{i}.py", content="x") for i in range(20)]
+
+    started = time.monotonic()
+    results = asyncio.run(ToolEngine(max_workers=20).run(actions, approve(actions), unified.s3_tool_runner("proj", "u1")))
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.2 * 4
+    assert [r["tool_id"] for r in results] == [str(i) for i in range(20)]
+    assert all(r["success"] for r in results)
+
+def test_same_path_actions_keep_their_order(monkeypatch):
+    s3 = SlowS3(latency=0.05)
+    monkeypatch.setattr(unified, "get_s3_service", lambda: s3)
+    actions = [
+        action("w1", "create_file", "a.py", content="1"),
+        action("r1", "read_file", "a.py"),
+        action("w2", "create_file", "a.py", content="2"),
+        action("other", "read_file", "b.py"),
+    ]
+    asyncio.run(ToolEngine().run(actions, approve(actions), unified.s3_tool_runner("proj", "u1")))
+
+    on_a = [(event, name) for event, name, path in s3.log if path == "a.py"]
+    assert on_a == [("start", "put"), ("end", "put"), ("start", "get"), ("end", "get"), ("start", "put"), ("end", "put")]
+    # The unrelated read overlapped with the first write instead of queueing behind it
+    assert s3.log.index(("start", "get", "b.py")) < s3.log.index(("end", "put", "a.py"))
+
+def test_results_stream_in_completion_order_and_rejections_come_first():
+    def execute(a):
+        time.sleep(a["parameters"]["delay"])
+        return {"success": True, "output": a["tool_id"]}
+
+    actions = [action("slow", "read_file", "a", delay=0.2), action("fast", "read_file", "b", delay=0.0), action("no", "delete_file", "c")]
+    approvals = [{"tool_id": "slow", "approved": True}, {"tool_id": "fast", "approved": True}]
+
+    async def collect():
+        return [(e["index"], e["result"]["tool_id"]) async for e in ToolEngine().stream(actions, approvals, execute)]
+
+    assert asyncio.run(collect()) == [(2, "no"), (1, "fast"), (0, "slow")]
+
+def test_failing_action_does_not_stop_the_batch():
+    def execute(a):
+        if a["tool_id"] == "bad":
+            raise RuntimeError("boom")
+        return {"success": True, "output": "ok"}
+
+    actions = [action("bad", "create_file", "a"), action("good", "read_file", "a")]
+    results = asyncio.run(ToolEngine().run(actions, approve(actions), execute))
+
+    assert results[0]["success"] is False and results[0]["error"] == "boom"
+    assert results[1]["success"] is True
+
+def test_execute_approved_tools_runs_locally(tmp_path):
+    actions = [action("c", "create_file", "pkg/a.txt", content="hi"), action("r", "read_file", "pkg/a.txt"), action("x", "delete_file", "pkg/a.txt")]
+    approvals = [{"tool_id": "c", "approved": True}, {"tool_id": "r", "approved": True}]
+
+    results = asyncio.run(unified.execute_approved_tools(ToolEngine(), approvals, actions, working_directory=str(tmp_path)))
+
+    assert [r["success"] for r in results] == [True, True, False]
+    assert results[1]["output"] == "hi"
+    assert results[2]["error"] == "Rejected by user"
+    assert (tmp_path / "pkg" / "a.txt").exists()
+
+class FakeDb:
+    def create_request(self, **kwargs):
+        return {"id": "fake-id"}
+
+@pytest.fixture
+def confirm_client(monkeypatch):
+    s3 = SlowS3(latency=0.01)
+    monkeypatch.setattr(unified, "get_s3_service", lambda: s3)
+    monkeypatch.setattr(unified, "get_db_client", lambda settings: FakeDb())
+    sessions = InMemorySessionStore()
+    app = FastAPI()
+    app.include_router(unified.router, prefix="/api")
+    app.dependency_overrides[get_session_store] = lambda: sessions
+    app.dependency_overrides[get_tool_engine] = lambda: ToolEngine(max_workers=4)
+    return TestClient(app), sessions
+
+def test_unified_confirm_streams_action_results(confirm_client):
+    client, sessions = confirm_client
+    actions = [action(str(i), "create_file", f"f{i}.py", content="x") for i in range(3)]
+    sessions.set("s1", {"prompt": "make files", "pending_actions": actions})
+    body = {"prompt": "", "session_id": "s1", "confirm": True, "approvals": approve(actions), "project_name": "proj"}
+
+    response = client.post("/api/generate", json=body, headers={"Accept": "text/event-stream"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+
+    assert [e["type"] for e in events] == ["action_result"] * 3 + ["done"]
+    assert sorted(e["index"] for e in events[:3]) == [0, 1, 2]
+    assert [r["tool_id"] for r in events[-1]["action_results"]] == ["0", "1", "2"]
+    assert events[-1]["output"].startswith("Executed 3/3 actions")
+
+def test_unified_confirm_returns_json_by_default(confirm_client):
+    client, sessions = confirm_client
+    actions = [action("a", "create_file", "a.py", content="x"), action("b", "read_file", "a.py")]
+    sessions.set("s2", {"prompt": "make a file", "pending_actions": actions})
+    body = {"prompt": "", "session_id": "s2", "confirm": True, "approvals": approve(actions), "project_name": "proj"}
+
+    data = client.post("/api/generate", json=body).json()
+    assert [r["tool_id"] for r in data["action_results"]] == ["a", "b"]
+    assert data["output"].startswith("Executed 2/2 actions")
+
+def test_tool_proposals_tolerate_malformed_arguments():
+    def call(arguments):
+        return SimpleNamespace(id="call-1", function=SimpleNamespace(name="create_file", arguments=arguments))
+
+    proposals = unified.build_tool_proposals([call('{"path": "a.txt"}'), call("{not json"), call(None)])
+
+    assert [p["parameters"] for p in proposals] == [{"path": "a.txt"}, {}, {}]
+    assert proposals[1]["description"] == "Create file: unknown"
@@ -0,0 +1,102 @@
+import pytest
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from src.app.main import app
+from src.app.api import unified
+from src.app.dependencies import get_anthropic_client, get_session_store, get_settings
+
+class FakeDb:
+    def create_request(self, **kwargs):
+        return {"id": "fake-id"}
+
+class FakeToolStreamer:
+    """
+    Fake client that replays a fixed list of stream_with_tools events.
+    """
+    def __init__(self, events):
+        self.events = events
+        self.generate_calls = 0
+
+    def generate_text(self, *args, **kwargs):
+        self.generate_calls += 1
+        return {"output": "should not be called"}
+
+    def stream_with_tools(self, prompt, model, max_tokens, temperature, tools=None):
+        for event in self.events:
+            yield event
+
+def _tool_call(name, arguments):
+    return SimpleNamespace(id="call-1", function=SimpleNamespace(name=name, arguments=arguments))
+
+@pytest.fixture
+def client_with(monkeypatch):
+    monkeypatch.setattr(unified, "get_db_client", lambda settings: FakeDb())
+
+    def _make(streamer):
+        app.dependency_overrides[get_anthropic_client] = lambda: streamer
+        return TestClient(app)
+
+    yield _make
+    app.dependency_overrides = {}
+
+def test_stream_relays_upstream_text(client_with):
+    streamer = FakeToolStreamer([
+        {"type": "text", "text": "Hello"},
+        {"type": "text", "text": " world"},
+    ])
+    client = client_with(streamer)
+
+    response = client.post("/api/generate", json={"prompt": "hi", "stream": True})
+
+    assert response.status_code == 200
+    assert response.text == "Hello world"
+    assert streamer.generate_calls == 0
+
+def test_stream_tool_call_first_returns_confirmation(client_with):
+    streamer = FakeToolStreamer([
+        {"type": "tool_call_delta"},
+        {"type": "tool_calls", "tool_calls": [_tool_call("create_file", '{"path": "a.py", "content": ""}')]},
+    ])
+    client = client_with(streamer)
+
+    response = client.post("/api/generate", json={"prompt": "make a file", "stream": True})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["action_required"] is True
+    assert data["pending_actions"][0]["description"] == "Create file: a.py"
+    assert get_session_store(get_settings()).get(data["session_id"]) is not None
+
+def test_stream_tool_call_after_text_appends_session(client_with):
+    streamer = FakeToolStreamer([
+        {"type": "text", "text": "Sure."},
+        {"type": "tool_call_delta"},
+        {"type": "tool_calls", "tool_calls": [_tool_call("run_command", '{"command": "ls"}')]},
+    ])
+    client = client_with(streamer)
+
+    response = client.post("/api/generate", json={"prompt": "list", "stream": True})
+
+    assert response.text.startswith("Sure.")
+    assert "Run command: ls" in response.text
+    assert "[session_id: " in response.text
+
+class FakeAsyncClient:
+    """
+    Fake async provider client (same surface as AsyncRealAnthropicClient).
+    """
+    async def generate_text(self, prompt, model, max_tokens, temperature, tools=None):
+        return {"request_id": "async-req", "output": "async output", "model": model, "usage": {}}
+
+    async def stream_with_tools(self, prompt, model, max_tokens, temperature, tools=None):
+        yield {"type": "text", "text": "async "}
+        yield {"type": "text", "text": "stream"}
+
+def test_async_client_json_and_stream(client_with):
+    client = client_with(FakeAsyncClient())
+
+    response = client.post("/api/generate", json={"prompt": "hi", "stream": False})
+    assert response.json()["output"] == "async output"
+
+    response = client.post("/api/generate", json={"prompt": "hi", "stream": True})
+    assert response.text == "async stream"